@@ -1,46 +1,36 @@
 """Analytics service for generating financial insights and reports."""
 from typing import Dict, Tuple, List, Optional, Any
 from datetime import datetime, timedelta
-from models import db, Expense
-from sqlalchemy import func
+from services.rollup_service import RollupService, month_key, month_keys, shift_month
+from services.stats_service import StatsService
+from services.daily_index_service import DailyIndexService
 import json
 
+# Longest monthly trend window served (5 years)
+MAX_TREND_MONTHS = 60
+
 
 def get_monthly_trends(user_id: int, months: int = 12) -> Dict[str, float]:
     """
-    Get monthly spending trends for the past N months.
+    Get monthly spending trends for the past N calendar months.
+    
+    The window ends with the current month and uses exact month boundaries.
+    Totals come from one GROUP BY over the monthly rollup; months without
+    spending are filled with zero.
     
     Args:
         user_id: User ID
-        months: Number of months to retrieve (default 12)
+        months: Number of months to retrieve (default 12, max MAX_TREND_MONTHS)
     
     Returns:
-        Dictionary mapping month strings (YYYY-MM) to spending amounts
+        Dictionary mapping month strings (YYYY-MM) to spending amounts, oldest first
     """
-    today = datetime.now().date()
-    trends = {}
-    
-    for i in range(months, 0, -1):
-        # Calculate first and last day of month
-        target_date = today - timedelta(days=today.day + (i-1) * 30)
-        first_day = target_date.replace(day=1)
-        
-        if first_day.month == 12:
-            last_day = first_day.replace(year=first_day.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            last_day = first_day.replace(month=first_day.month + 1, day=1) - timedelta(days=1)
-        
-        month_key = first_day.strftime("%Y-%m")
-        
-        total = db.session.query(func.sum(Expense.amount)).filter(
-            Expense.user_id == user_id,
-            Expense.date >= first_day,
-            Expense.date <= last_day
-        ).scalar() or 0
-        
-        trends[month_key] = float(total)
-    
-    return trends
+    months = min(max(months, 1), MAX_TREND_MONTHS)
+    keys = month_keys(datetime.now().date(), months)
+    
+    totals = RollupService.get_monthly_range(user_id, keys[0], keys[-1])
+    
+    return {key: float(totals.get(key, 0)) for key in keys}
 
 
 def get_category_breakdown(user_id: int, months: int = 1) -> Tuple[Dict[str, Dict[str, Any]], float]:
@@ -57,21 +47,14 @@ def get_category_breakdown(user_id: int, months: int = 1) -> Tuple[Dict[str, Dic
             total_spent: Total amount spent across all categories
     """
     today = datetime.now().date()
-    first_day = today.replace(day=1) - timedelta(days=(months-1) * 30)
+    first_month = month_key(shift_month(today, -(months - 1)))
     
-    categories = db.session.query(
-        Expense.category,
-        func.sum(Expense.amount).label('total'),
-        func.count(Expense.id).label('count')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.date >= first_day
-    ).group_by(Expense.category).all()
+    categories = RollupService.get_category_totals(user_id, month_from=first_month)
     
     breakdown = {}
     total_all = 0
     
-    for cat, total, count in categories:
+    for cat, (total, count) in categories.items():
         breakdown[cat] = {
             'amount': float(total),
             'count': count,
@@ -111,6 +94,8 @@ def get_daily_breakdown(user_id: int, month: Optional[str] = None) -> Dict[str,
     """
     Get daily spending breakdown for a specific month.
     
+    Served from the daily spending index (one row per day with spending).
+    
     Args:
         user_id: User ID
         month: Month string in format 'YYYY-MM' (default: current month)
@@ -125,31 +110,18 @@ def get_daily_breakdown(user_id: int, month: Optional[str] = None) -> Dict[str,
     else:
         today = datetime.now().date()
         first_day = today.replace(day=1)
-        if first_day.month == 12:
-            last_day = first_day.replace(year=first_day.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            last_day = first_day.replace(month=first_day.month + 1, day=1) - timedelta(days=1)
-    
-    expenses = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= first_day,
-        Expense.date <= last_day
-    ).order_by(Expense.date).all()
-    
-    daily = {}
-    for exp in expenses:
-        date_key = exp.date.isoformat()
-        if date_key not in daily:
-            daily[date_key] = 0
-        daily[date_key] += exp.amount
-    
-    return daily
+        last_day = shift_month(today, 1) - timedelta(days=1)
+    
+    daily = DailyIndexService.daily_totals(user_id, first_day, last_day)
+    return {day.isoformat(): float(total) for day, total in daily.items()}
 
 
 def get_spending_statistics(user_id: int, months: int = 1) -> Dict[str, float]:
     """
     Get comprehensive spending statistics.
     
+    Computed with a single SUM/MIN/MAX/COUNT query (see StatsService.spending).
+    
     Args:
         user_id: User ID
         months: Number of months to analyze (default 1)
@@ -164,30 +136,7 @@ def get_spending_statistics(user_id: int, months: int = 1) -> Dict[str, float]:
     """
     today = datetime.now().date()
     first_day = today.replace(day=1) - timedelta(days=(months-1) * 30)
-    
-    expenses = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= first_day
-    ).all()
-    
-    if not expenses:
-        return {
-            'total': 0,
-            'average': 0,
-            'highest': 0,
-            'lowest': 0,
-            'count': 0
-        }
-    
-    amounts = [e.amount for e in expenses]
-    
-    return {
-        'total': float(sum(amounts)),
-        'average': float(sum(amounts) / len(amounts)) if amounts else 0,
-        'highest': float(max(amounts)),
-        'lowest': float(min(amounts)),
-        'count': len(amounts)
-    }
+    return StatsService.spending(user_id, first_day).as_dict()
 
 
 def get_month_comparison(user_id: int) -> Dict[str, Any]:
@@ -208,31 +157,15 @@ def get_month_comparison(user_id: int) -> Dict[str, Any]:
     """
     today = datetime.now().date()
     
-    # Current month
     current_first = today.replace(day=1)
-    if current_first.month == 12:
-        current_last = current_first.replace(year=current_first.year + 1, month=1, day=1) - timedelta(days=1)
-    else:
-        current_last = current_first.replace(month=current_first.month + 1, day=1) - timedelta(days=1)
-    
-    current_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= current_first,
-        Expense.date <= current_last
-    ).scalar() or 0
-    
-    # Previous month
-    prev_first = (current_first - timedelta(days=1)).replace(day=1)
-    if prev_first.month == 12:
-        prev_last = prev_first.replace(year=prev_first.year + 1, month=1, day=1) - timedelta(days=1)
-    else:
-        prev_last = prev_first.replace(month=prev_first.month + 1, day=1) - timedelta(days=1)
-    
-    prev_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= prev_first,
-        Expense.date <= prev_last
-    ).scalar() or 0
+    current_last = shift_month(today, 1) - timedelta(days=1)
+    prev_first = shift_month(today, -1)
+    prev_last = current_first - timedelta(days=1)
+    
+    # Both totals from the daily prefix-sum index in one query
+    current_total, prev_total = DailyIndexService.range_totals(
+        user_id, [(current_first, current_last), (prev_first, prev_last)]
+    )
     
     current_total = float(current_total)
     prev_total = float(prev_total)
@@ -1,17 +1,32 @@
 """API routes with JWT authentication for InsightFlow AI platform."""
 from typing import Callable, Optional, Dict, Any, Tuple
-from flask import Blueprint, request, jsonify, current_app, Response
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from functools import wraps
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import check_password_hash, generate_password_hash
 from models import db, User, Expense, Alert, Setting
-from utils import calculate_today_total, calculate_month_total, get_monthly_budget, check_budget_and_create_alerts, get_active_alerts
+from utils import (
+    calculate_today_total, calculate_month_total, get_monthly_budget, check_budget_and_create_alerts,
+    check_unusual_expense, get_active_alerts
+)
 from analytics_service import (
     get_monthly_trends, get_category_breakdown, get_highest_spending_categories,
-    get_daily_breakdown, get_spending_statistics, get_month_comparison
+    get_daily_breakdown, get_spending_statistics, get_month_comparison,
+    MAX_TREND_MONTHS
 )
 from file_upload_service import save_upload_file, delete_upload_file, get_file_url
+from pydantic import ValidationError
+from schemas import PaginationParams, PaginatedResponse, BatchExpenseCreate, BatchExpenseItem
+from services.expense_service import ExpenseService
+from services.dashboard_service import DashboardSnapshot
+from services.daily_index_service import DailyIndexService
+from services.password_service import PasswordService
+from services.forecast_service import ForecastService
+from services.anomaly_service import AnomalyService
+from repositories import user_repo
+from http_cache import conditional_response, etag_exempt
+from response_cache import cached_response, cache_stats
+from principal_cache import load_principal
 
 api_bp: Blueprint = Blueprint('api', __name__, url_prefix='/api')
 
@@ -36,7 +51,12 @@ def token_required(f: Callable) -> Callable:
     Decorator to require valid JWT token for API endpoints.
     
     Validates JWT token from Authorization header and sets request.current_user_id
-    and request.current_user. Returns 401 error if token is missing, invalid, or expired.
+    and request.current_user (a cached Principal, see principal_cache.py).
+    Returns 401 error if token is missing, invalid, expired, or revoked.
+    
+    GET responses carry a weak ETag derived from the user's data version; a
+    matching If-None-Match is answered with 304 before the route runs (see
+    http_cache.py, opt out with @etag_exempt).
     
     Args:
         f: Flask route function to decorate
@@ -68,12 +88,16 @@ def token_required(f: Callable) -> Callable:
             return jsonify({'message': 'Invalid token'}), 401
         
         request.current_user_id = current_user_id
-        request.current_user = db.session.get(User, current_user_id)
+        request.current_user = load_principal(current_user_id)
         
         if not request.current_user:
             return jsonify({'message': 'User not found'}), 401
         
-        return f(*args, **kwargs)
+        # Tokens issued before the last password change are revoked
+        if data.get('tv', 0) != request.current_user.token_version:
+            return jsonify({'message': 'Token has been revoked'}), 401
+        
+        return conditional_response(request.current_user, f, *args, **kwargs)
     
     return decorated
 
@@ -92,6 +116,7 @@ def register() -> Tuple[Dict[str, str], int]:
         Tuple of (response_dict, status_code):
             201: User created successfully
             400: Missing required fields or username already exists
+            503: Password hashing queue full (retry after Retry-After)
     """
     data = request.get_json()
     
@@ -103,7 +128,7 @@ def register() -> Tuple[Dict[str, str], int]:
     
     user = User(
         username=data['username'],
-        password=generate_password_hash(data['password'])
+        password=PasswordService.hash(data['password'])
     )
     db.session.add(user)
     db.session.commit()
@@ -125,6 +150,7 @@ def login() -> Tuple[Dict[str, Any], int]:
             200: Login successful, returns JWT token
             400: Missing required fields
             401: Invalid credentials
+            503: Password hashing queue full (retry after Retry-After)
     """
     data = request.get_json()
     
@@ -133,12 +159,13 @@ def login() -> Tuple[Dict[str, Any], int]:
     
     user = User.query.filter_by(username=data['username']).first()
     
-    if not user or not check_password_hash(user.password, data['password']):
+    if not user or not PasswordService.verify_and_update(user, data['password']):
         return jsonify({'message': 'Invalid credentials'}), 401
     
     # Generate JWT token
     token = jwt.encode({
         'user_id': user.id,
+        'tv': user.token_version,
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     }, JWT_SECRET, algorithm='HS256')
     
@@ -155,24 +182,59 @@ def login() -> Tuple[Dict[str, Any], int]:
 @token_required
 def get_expenses() -> Tuple[Dict[str, Any], int]:
     """
-    Get all expenses for authenticated user.
+    Get one page of expenses for authenticated user, newest first.
     
     Requires: Valid JWT token in Authorization header
     
+    Query Parameters:
+        cursor: str - Opaque next_cursor from the previous page (optional)
+        limit: int - Page size, 1-100 (default: 50)
+        date_from, date_to: str - Date range filter, YYYY-MM-DD (optional)
+        category: str - Category filter (optional)
+        month: str - Month filter, YYYY-MM (optional)
+    
     Returns:
-        Tuple of (response_list, status_code):
-            200: List of expenses as JSON
+        Tuple of (response_dict, status_code):
+            200: {"items": [...], "count": int, "total_amount": float,
+                  "limit": int, "next_cursor": str or null}
+            400: Invalid cursor or filter values
     """
-    expenses = Expense.query.filter_by(user_id=request.current_user_id).order_by(Expense.date.desc()).all()
+    try:
+        params = PaginationParams(
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit')
+        )
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        result = ExpenseService.list_expenses(
+            user_id=request.current_user_id,
+            date_from=datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+            date_to=datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None,
+            category=request.args.get('category'),
+            month=request.args.get('month'),
+            cursor=params.cursor,
+            limit=params.limit,
+            include_breakdown=False
+        )
+    except (ValidationError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    
+    page = PaginatedResponse(
+        items=[{
+            'id': e['id'],
+            'date': e['date'],
+            'title': e['title'],
+            'category': e['category'],
+            'amount': e['amount'],
+            'description': e['description']
+        } for e in result['expenses']],
+        count=result['count'],
+        total_amount=round(result['total'], 2),
+        limit=params.limit,
+        next_cursor=result['next_cursor']
+    )
     
-    return jsonify([{
-        'id': e.id,
-        'date': e.date.isoformat(),
-        'title': e.title,
-        'category': e.category,
-        'amount': float(e.amount),
-        'description': e.description
-    } for e in expenses]), 200
+    return jsonify(page.model_dump()), 200
 
 
 @api_bp.route('/expenses', methods=['POST'])
@@ -216,6 +278,7 @@ def create_expense() -> Tuple[Dict[str, Any], int]:
     
     db.session.add(expense)
     db.session.commit()
+    check_unusual_expense(expense)
     
     return jsonify({
         'id': expense.id,
@@ -223,6 +286,147 @@ def create_expense() -> Tuple[Dict[str, Any], int]:
     }), 201
 
 
+def _validate_expense_batch(data: Any) -> Tuple[list, Dict[int, str]]:
+    """
+    Validate a batch payload against BatchExpenseCreate in one pass.
+    
+    Args:
+        data: Parsed request JSON
+    
+    Returns:
+        Tuple of (items, errors): items holds a dict per valid expense and
+        None for invalid ones, errors maps item index -> error message
+    
+    Raises:
+        ValidationError: If the envelope itself is invalid (missing list,
+            wrong size) rather than individual items
+    """
+    try:
+        batch = BatchExpenseCreate.model_validate(data)
+        return [item.model_dump() for item in batch.expenses], {}
+    except ValidationError as e:
+        errors: Dict[int, str] = {}
+        for error in e.errors():
+            loc = error['loc']
+            if len(loc) < 2 or loc[0] != 'expenses' or not isinstance(loc[1], int):
+                raise
+            field = '.'.join(str(part) for part in loc[2:]) or 'expense'
+            errors.setdefault(loc[1], f"{field}: {error['msg']}")
+    
+    # Only reached when some items failed: keep the ones that did not
+    items = [
+        None if index in errors else BatchExpenseItem.model_validate(raw).model_dump()
+        for index, raw in enumerate(data['expenses'])
+    ]
+    return items, errors
+
+
+@api_bp.route('/expenses/batch', methods=['POST'])
+@token_required
+def create_expenses_batch() -> Tuple[Dict[str, Any], int]:
+    """
+    Create up to 100 expenses for authenticated user in one request.
+    
+    The batch is validated in one pass, valid items are inserted with a
+    single multi-row INSERT in one transaction, and the budget check runs
+    once for the whole batch.
+    
+    Request JSON:
+        expenses: list - Expense objects (see BatchExpenseCreate)
+    
+    Returns:
+        Tuple of (response_dict, status_code):
+            201: All expenses created
+            207: Some expenses created, see per-item results
+            400: Invalid batch or no expense could be created
+    """
+    data = request.get_json(silent=True)
+    
+    try:
+        items, errors = _validate_expense_batch(data)
+    except ValidationError as e:
+        return jsonify({'message': 'Invalid batch', 'errors': e.errors(include_url=False, include_context=False)}), 400
+    
+    result = ExpenseService.create_expenses_bulk(request.current_user_id, items)
+    for index, message in errors.items():
+        result['results'][index]['error'] = message
+    
+    if result['created']:
+        check_budget_and_create_alerts(request.current_user_id)
+    
+    if result['failed'] == 0:
+        status = 201
+    elif result['created']:
+        status = 207
+    else:
+        status = 400
+    
+    return jsonify({
+        'created': result['created'],
+        'failed': result['failed'],
+        'results': result['results'],
+        'message': f"Created {result['created']} of {len(items)} expenses"
+    }), status
+
+
+@api_bp.route('/expenses/export', methods=['GET'])
+@token_required
+def export_expenses() -> Response:
+    """
+    Stream authenticated user's expenses as CSV, Parquet or Arrow IPC.
+    
+    Query Parameters:
+        format: str - csv (default), parquet or arrow
+        date_from, date_to: str - Date range (YYYY-MM-DD)
+        category: str - Category filter
+        month: str - Month filter (YYYY-MM)
+    
+    Returns:
+        Streamed file download, or 400 for an invalid format or filter
+    """
+    try:
+        filters = {
+            'date_from': datetime.strptime(request.args['date_from'], '%Y-%m-%d').date() if request.args.get('date_from') else None,
+            'date_to': datetime.strptime(request.args['date_to'], '%Y-%m-%d').date() if request.args.get('date_to') else None,
+            'category': request.args.get('category'),
+            'month': request.args.get('month')
+        }
+        stream, mimetype, filename = ExpenseService.export_stream(
+            request.current_user_id, filters, request.args.get('format', 'csv')
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    resp = Response(stream_with_context(stream), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return resp
+
+
+@api_bp.route('/expenses/import', methods=['POST'])
+@token_required
+def import_expenses() -> Tuple[Dict[str, Any], int]:
+    """
+    Bulk import expenses from a Parquet or Arrow IPC file.
+    
+    Accepts the file as multipart field 'file' or as the raw request body.
+    The import is all-or-nothing.
+    
+    Returns:
+        Tuple of (response_dict, status_code):
+            201: Expenses imported
+            400: Missing, unreadable or invalid file
+    """
+    upload = request.files.get('file')
+    source = upload.stream if upload else request.stream
+    
+    try:
+        result = ExpenseService.import_columnar(request.current_user_id, source)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'imported': result['imported'], 'message': result['message']}), 201
+
+
 @api_bp.route('/expenses/<int:expense_id>', methods=['GET'])
 @token_required
 def get_expense(expense_id: int) -> Tuple[Dict[str, Any], int]:
@@ -336,49 +540,20 @@ def dashboard_stats() -> Tuple[Dict[str, Any], int]:
     
     Returns:
         Tuple of (response_dict, status_code):
-            200: Dashboard statistics including today total, month total, budget, and warnings
-    """
-    # Note: These functions use Flask's current_user which won't work with JWT
-    # So we need to set a temporary context
-    from flask_login import current_user
-    
-    # For API endpoints with JWT, we calculate stats based on request.current_user_id
-    today_expenses = Expense.query.filter(
-        Expense.user_id == request.current_user_id,
-        Expense.date == datetime.utcnow().date()
-    ).all()
-    today_total = sum(float(e.amount) for e in today_expenses)
-    
-    from datetime import date
-    import calendar
-    today = date.today()
-    month_expenses = Expense.query.filter(
-        Expense.user_id == request.current_user_id,
-        Expense.date >= date(today.year, today.month, 1),
-        Expense.date <= date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
-    ).all()
-    month_total = sum(float(e.amount) for e in month_expenses)
-    
-    # Get budget from settings (simplified approach)
-    from models import Setting
-    budget_setting = Setting.query.filter_by(user_id=request.current_user_id, key='monthly_budget').first()
-    budget = 0
-    budget_warning = False
-    
-    if budget_setting:
-        try:
-            budget = float(budget_setting.value)
-            if month_total > budget:
-                budget_warning = True
-        except ValueError:
-            pass
+            200: Dashboard statistics including today total, month total, budget,
+                 warnings, this month's category breakdown and unread alert count
+    """
+    snapshot = DashboardSnapshot.load(request.current_user_id)
     
     return jsonify({
-        'today_total': round(today_total, 2),
-        'month_total': round(month_total, 2),
-        'budget': round(budget, 2),
-        'budget_warning': budget_warning,
-        'remaining_budget': round(budget - month_total, 2) if budget > 0 else 0
+        'today_total': round(snapshot['today_total'], 2),
+        'month_total': round(snapshot['month_total'], 2),
+        'budget': round(snapshot['budget'], 2),
+        'budget_warning': snapshot['budget_warning'],
+        'remaining_budget': round(snapshot['remaining_budget'], 2) if snapshot['remaining_budget'] is not None else 0,
+        'category_breakdown': snapshot['category_breakdown'],
+        'categories': snapshot['categories'],
+        'unread_alerts': snapshot['unread_alerts']
     }), 200
 
 # ============================================================================
@@ -491,15 +666,17 @@ def check_budget_status():
 
 @api_bp.route('/analytics/trends', methods=['GET'])
 @token_required
+@cached_response
 def api_trends():
     """Get monthly spending trends."""
     months = request.args.get('months', 12, type=int)
-    trends = get_monthly_trends(request.current_user_id, min(months, 24))
+    trends = get_monthly_trends(request.current_user_id, min(months, MAX_TREND_MONTHS))
     return jsonify(trends), 200
 
 
 @api_bp.route('/analytics/categories', methods=['GET'])
 @token_required
+@cached_response
 def api_categories():
     """Get category breakdown."""
     months = request.args.get('months', 1, type=int)
@@ -509,6 +686,7 @@ def api_categories():
 
 @api_bp.route('/analytics/top-categories', methods=['GET'])
 @token_required
+@cached_response
 def api_top_categories():
     """Get top spending categories."""
     limit = request.args.get('limit', 5, type=int)
@@ -519,6 +697,7 @@ def api_top_categories():
 
 @api_bp.route('/analytics/daily', methods=['GET'])
 @token_required
+@cached_response
 def api_daily():
     """Get daily spending breakdown."""
     month = request.args.get('month', None)
@@ -528,6 +707,7 @@ def api_daily():
 
 @api_bp.route('/analytics/stats', methods=['GET'])
 @token_required
+@cached_response
 def api_stats():
     """Get spending statistics."""
     months = request.args.get('months', 1, type=int)
@@ -537,12 +717,57 @@ def api_stats():
 
 @api_bp.route('/analytics/comparison', methods=['GET'])
 @token_required
+@cached_response
 def api_comparison():
     """Get month-over-month comparison."""
     comparison = get_month_comparison(request.current_user_id)
     return jsonify(comparison), 200
 
 
+@api_bp.route('/analytics/heatmap', methods=['GET'])
+@token_required
+@cached_response
+def api_heatmap():
+    """
+    Get calendar heatmap data (daily totals) for up to a year.
+    
+    Query Parameters:
+        days: int - Window length in days, max 366 (default: 365)
+        end: str - Last day shown, YYYY-MM-DD (default: today)
+    
+    Returns:
+        200: {"start", "end", "days": {"YYYY-MM-DD": float}, "total", "max", "active_days"}
+        400: Invalid end date
+    """
+    end = request.args.get('end')
+    try:
+        end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        return jsonify({'message': 'end must be in YYYY-MM-DD format'}), 400
+    
+    days = request.args.get('days', 365, type=int)
+    return jsonify(DailyIndexService.heatmap(request.current_user_id, end_date, days)), 200
+
+
+@api_bp.route('/analytics/forecast', methods=['GET'])
+@token_required
+@etag_exempt
+def api_forecast():
+    """
+    Get next month's spending forecast.
+    
+    Served from the stored fit when the user's monthly series is unchanged;
+    otherwise a closed-form estimate is returned while the fit runs, so the
+    response is not cached or ETagged.
+    
+    Returns:
+        200: {"forecast", "lower_bound", "upper_bound", "confidence", "month",
+              "method", "series_version", "cached", "pending", "status"}
+             or {"forecast": null, "status": "insufficient_data"}
+    """
+    return jsonify(ForecastService.get_forecast(request.current_user_id)), 200
+
+
 # ============ FILE UPLOAD API ENDPOINTS ============
 
 @api_bp.route('/upload/receipt', methods=['POST'])
@@ -781,6 +1006,7 @@ def api_spending_pace():
 
 @api_bp.route('/admin/users')
 @token_required
+@etag_exempt
 def api_admin_users():
     """Get all users for admin."""
     if not request.current_user.is_admin():
@@ -810,6 +1036,7 @@ def api_admin_users():
 
 @api_bp.route('/admin/stats')
 @token_required
+@etag_exempt
 def api_admin_stats():
     """Get system-wide statistics."""
     if not request.current_user.is_admin():
@@ -841,6 +1068,50 @@ def api_admin_stats():
     })
 
 
+@api_bp.route('/admin/cache-stats')
+@token_required
+@etag_exempt
+def api_admin_cache_stats():
+    """Get response cache hit/miss counters for this worker process."""
+    if not request.current_user.is_admin():
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    return jsonify(cache_stats())
+
+
+@api_bp.route('/admin/hash-stats')
+@token_required
+@etag_exempt
+def api_admin_hash_stats():
+    """Get password hashing latency and queue depth for this worker process."""
+    if not request.current_user.is_admin():
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    return jsonify(PasswordService.stats())
+
+
+@api_bp.route('/admin/forecast-stats')
+@token_required
+@etag_exempt
+def api_admin_forecast_stats():
+    """Get forecast cache hits, fit latency and queue depth for this worker process."""
+    if not request.current_user.is_admin():
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    return jsonify(ForecastService.stats())
+
+
+@api_bp.route('/admin/anomaly-stats')
+@token_required
+@etag_exempt
+def api_admin_anomaly_stats():
+    """Get anomaly scoring latency and model refit cost for this worker process."""
+    if not request.current_user.is_admin():
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    return jsonify(AnomalyService.stats())
+
+
 @api_bp.route('/admin/promote-admin/<int:user_id>', methods=['POST'])
 @token_required
 def api_promote_admin(user_id):
@@ -894,10 +1165,7 @@ def api_delete_user(user_id):
     if user.id == request.current_user_id:
         return jsonify({'error': 'Cannot delete yourself'}), 400
     
-    username = user.username
-    
-    # Delete related data (cascade will handle it)
-    db.session.delete(user)
-    db.session.commit()
+    # Set-based delete of the user's data, then the user row
+    deleted = user_repo.delete_with_data(user.id)
     
-    return jsonify({'success': True}), 200
\ No newline at end of file
+    return jsonify({'success': True, 'deleted': deleted}), 200
\ No newline at end of file
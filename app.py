@@ -5,9 +5,8 @@ has been refactored into the factory.py module using the application
 factory pattern for better testability, modularity, and configuration management.
 """
 from typing import Optional
-from flask import render_template, request, redirect, url_for, flash, Response, jsonify, send_from_directory, current_app
+from flask import render_template, request, redirect, url_for, flash, Response, jsonify, send_from_directory, current_app, stream_with_context
 from flask_login import login_required, current_user, login_user, logout_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime, date, timezone, timedelta
 from sqlalchemy import func
@@ -24,7 +23,8 @@ from config import Config
 
 # Export JWT_SECRET for tests and other modules
 JWT_SECRET = Config.JWT_SECRET
-from services import ExpenseService
+from services import ExpenseService, DashboardSnapshot, PasswordService
+from repositories import user_repo
 from services.validators import (
     ExpenseCreateRequest, ExpenseUpdateRequest, ExpenseFilterRequest
 )
@@ -32,13 +32,14 @@ from utils import (
     get_setting, set_setting, parse_month,
     calculate_today_total, calculate_month_total,
     get_monthly_budget, calculate_category_spending,
-    check_budget_and_create_alerts, get_active_alerts
+    check_budget_and_create_alerts, check_unusual_expense, get_active_alerts
 )
 from sentry_config import add_breadcrumb
 from email_service import send_username_recovery_email, send_alert_email, send_welcome_email
 from analytics_service import (
     get_monthly_trends, get_category_breakdown, get_highest_spending_categories,
-    get_daily_breakdown, get_spending_statistics, get_month_comparison
+    get_daily_breakdown, get_spending_statistics, get_month_comparison,
+    MAX_TREND_MONTHS
 )
 from file_upload_service import (
     save_upload_file, delete_upload_file, get_file_url, allowed_file,
@@ -74,7 +75,7 @@ def delete(id):
 @app.route('/export')
 @login_required
 def export_csv():
-    """Export expenses to CSV file."""
+    """Export expenses to a CSV (default), Parquet or Arrow file."""
     try:
         # Build filters dict
         filters = {
@@ -84,14 +85,15 @@ def export_csv():
             'month': request.args.get('month')
         }
         
-        # Call ExpenseService
-        csv_data = ExpenseService.export_to_csv(
+        # Stream rows from ExpenseService in chunks (csv, parquet or arrow)
+        stream, mimetype, filename = ExpenseService.export_stream(
             user_id=current_user.id,
-            filters=filters
+            filters=filters,
+            fmt=request.args.get('format', 'csv')
         )
         
-        resp = Response(csv_data, mimetype='text/csv')
-        resp.headers["Content-Disposition"] = "attachment; filename=expenses.csv"
+        resp = Response(stream_with_context(stream), mimetype=mimetype)
+        resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
         return resp
     
     except Exception as e:
@@ -137,6 +139,9 @@ def index():
     date_to = request.args.get('date_to')
     category = request.args.get('category', 'all')
     month = request.args.get('month')
+    cursor = request.args.get('cursor') or None
+    next_cursor = None
+    expense_count = 0
 
     try:
         # Validate filters with Pydantic
@@ -153,12 +158,17 @@ def index():
             date_from=filters.date_from,
             date_to=filters.date_to,
             category=filters.category,
-            month=filters.month
+            month=filters.month,
+            cursor=cursor,
+            limit=10,
+            include_breakdown=False
         )
         
         if result['success']:
             expenses = result.get('expenses', [])
             total_spent = result.get('total', 0)
+            expense_count = result.get('count', 0)
+            next_cursor = result.get('next_cursor')
         else:
             expenses = []
             total_spent = 0
@@ -173,7 +183,8 @@ def index():
         total_spent = 0
         flash(f"Error: {str(e)}", 'danger')
     
-    all_categories = [c[0] for c in db.session.query(Expense.category).filter_by(user_id=current_user.id).distinct().all()]
+    # Headline numbers (today, month, budget, categories, alerts) in two queries
+    snapshot = DashboardSnapshot.load(current_user.id)
     
     filters_display = {
         'date_from': date_from or '',
@@ -181,38 +192,26 @@ def index():
         'category': category,
         'month': month or ''
     }
-
-    # Calculate statistics via service
-    today_result = ExpenseService.get_today_total(current_user.id)
-    today_total = today_result.get('today_total', 0)
-    
-    month_result = ExpenseService.get_month_total(current_user.id)
-    month_total = month_result.get('month_total', 0)
-    
-    budget, budget_warning = get_monthly_budget()
-    
-    # Category spending breakdown via service
-    category_result = ExpenseService.get_category_breakdown(current_user.id)
-    if category_result['success']:
-        breakdown = category_result.get('breakdown', {})
-    else:
-        breakdown = {}
     
+    breakdown = snapshot['category_breakdown']
     category_labels = list(breakdown.keys())
     category_values = list(breakdown.values())
     
-    # Get active alerts
-    active_alerts = get_active_alerts(current_user.id)
+    # Only fetch alert rows when there is something to show
+    active_alerts = get_active_alerts(current_user.id) if snapshot['unread_alerts'] else []
 
     return render_template('index.html', 
                          expenses=expenses, 
-                         all_categories=all_categories, 
+                         expense_count=expense_count,
+                         next_cursor=next_cursor,
+                         cursor=cursor,
+                         all_categories=snapshot['categories'], 
                          filters=filters_display,
                          total_spent=total_spent,
-                         today_total=today_total,
-                         month_total=month_total,
-                         budget=budget,
-                         budget_warning=budget_warning,
+                         today_total=snapshot['today_total'],
+                         month_total=snapshot['month_total'],
+                         budget=snapshot['budget'],
+                         budget_warning=snapshot['budget_warning'],
                          category_labels=category_labels,
                          category_values=category_values,
                          active_alerts=active_alerts)
@@ -234,7 +233,7 @@ def login():
             flash('Username not found. Please register first.', 'warning')
             return render_template('login.html')
         
-        if not check_password_hash(user.password, password):
+        if not PasswordService.verify_and_update(user, password):
             flash('Invalid password. Please try again.', 'danger')
             return render_template('login.html')
         
@@ -277,7 +276,7 @@ def register():
         user = User(
             username=username,
             email=email,
-            password=generate_password_hash(password)
+            password=PasswordService.hash(password)
         )
         db.session.add(user)
         db.session.commit()
@@ -355,6 +354,9 @@ def add():
                 if alert:
                     severity = 'danger' if alert.severity == 'danger' else 'warning'
                     flash(f'⚠️ {alert.title}: {alert.message}', severity)
+                unusual = check_unusual_expense(db.session.get(Expense, result['expense']['id']))
+                if unusual:
+                    flash(f'🔍 {unusual.title}: {unusual.message}', 'warning')
                 
                 flash(result['message'], 'success')
                 return redirect(url_for('index'))
@@ -453,7 +455,7 @@ def analytics():
 def api_analytics_trends():
     """Get monthly spending trends."""
     months = request.args.get('months', 12, type=int)
-    trends = get_monthly_trends(current_user.id, min(months, 24))
+    trends = get_monthly_trends(current_user.id, min(months, MAX_TREND_MONTHS))
     return jsonify(trends)
 
 
@@ -723,12 +725,11 @@ def api_delete_user(user_id):
     
     username = user.username
     
-    # Delete related data (cascade will handle it)
-    db.session.delete(user)
-    db.session.commit()
+    # Set-based delete of the user's data, then the user row
+    deleted = user_repo.delete_with_data(user.id)
     
-    flash(f'User {username} and all their data deleted', 'success')
-    return jsonify({'success': True}), 200
+    flash(f'User {username} and all their data deleted ({deleted["expenses"]} expenses)', 'success')
+    return jsonify({'success': True, 'deleted': deleted}), 200
 
 
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+"""Ingestion benchmark: batch endpoint vs one POST per expense.
+
+Creates a throwaway SQLite database, then posts the same expenses through
+POST /api/expenses one at a time and through POST /api/expenses/batch in
+batches of ``--batch-size``, and reports rows per second for each - the
+"how much faster is an offline sync through the batch endpoint" number.
+Rate limiting is disabled for the run.
+
+Usage:
+    python benchmark_batch.py --rows 1000
+    python benchmark_batch.py --rows 5000 --batch-size 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+
+def main() -> int:
+    """Time single vs batch ingestion and print the rates."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000, help='expenses per scenario')
+    parser.add_argument('--batch-size', type=int, default=100, help='expenses per batch request (max 100)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    import jwt
+    from factory import create_app
+    from models import db, User
+    from rate_limit import limiter
+
+    app = create_app()
+    limiter.enabled = False
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com',
+                            password='pbkdf2:sha256:1$' + 'x' * 64))
+        db.session.commit()
+        token = jwt.encode({'user_id': 1, 'exp': int(time.time()) + 3600},
+                           app.config['JWT_SECRET'], algorithm='HS256')
+
+    headers = {'Authorization': f'Bearer {token}'}
+    items = [
+        {'title': f'Synced {i}', 'amount': '12.34', 'category': 'Food', 'date': date.today().isoformat()}
+        for i in range(args.rows)
+    ]
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for item in items:
+        client.post('/api/expenses', headers=headers, json=item)
+    single_rate = args.rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, args.rows, args.batch_size):
+        client.post('/api/expenses/batch', headers=headers,
+                    json={'expenses': items[offset:offset + args.batch_size]})
+    batch_rate = args.rows / (time.perf_counter() - start)
+
+    print(f"{args.rows} expenses per scenario, batches of {args.batch_size}")
+    print(f"single inserts {single_rate:,.0f} rows/s")
+    print(f"batch inserts  {batch_rate:,.0f} rows/s ({batch_rate / single_rate:.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Throughput benchmark for the batch category forecast kernel.
+
+Generates synthetic monthly category totals (trend, yearly seasonality and
+noise, with series starting at random months) and times
+``smooth_forecasts`` over them in chunks the size the nightly job uses -
+the "how long does the fitting part of the nightly run take" number. The
+database side of the job (loading rollups, writing forecasts) is not
+included.
+
+Usage:
+    python benchmark_forecasts.py --users 100000 --categories 10
+    python benchmark_forecasts.py --users 20000 --batch-size 1000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+
+def synthetic_series(series: int, months: int, seed: int = 0):
+    """Return (values, start) for ``series`` random monthly spending series."""
+    rng = np.random.default_rng(seed)
+    base = rng.gamma(2.0, 100.0, size=(series, 1))
+    slope = rng.normal(0.0, 0.02, size=(series, 1)) * base
+    season = np.sin(np.arange(months) * 2 * np.pi / 12) * rng.uniform(0, 0.3, size=(series, 1)) * base
+    values = base + slope * np.arange(months) + season + rng.normal(0, 0.15, size=(series, months)) * base
+    values = np.maximum(values, 0.0).round(2)
+
+    start = rng.integers(0, months - 3, size=series)
+    values[np.arange(months) < start[:, None]] = 0.0
+    return values, start
+
+
+def main() -> int:
+    """Time the forecast kernel over users x categories series."""
+    from services.category_forecast_service import BATCH_SIZE, HISTORY_MONTHS, smooth_forecasts
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=100000, help='users to forecast')
+    parser.add_argument('--categories', type=int, default=10, help='category series per user')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='users per chunk')
+    args = parser.parse_args()
+
+    chunk_series = args.batch_size * args.categories
+    values, start = synthetic_series(chunk_series, HISTORY_MONTHS)
+
+    chunks = -(-args.users // args.batch_size)
+    started = time.perf_counter()
+    for _ in range(chunks):
+        fitted = smooth_forecasts(values, start)
+    elapsed = time.perf_counter() - started
+
+    series = chunks * chunk_series
+    print(f"{series} series ({args.users} users x {args.categories} categories, "
+          f"{HISTORY_MONTHS} months) in {chunks} chunks of {chunk_series}")
+    print(f"fit time {elapsed:.1f}s, {series / elapsed:,.0f} series/s, "
+          f"{elapsed / chunks * 1000:.0f} ms per chunk")
+    print(f"mean forecast {fitted['forecast'].mean():.2f}, "
+          f"mean interval width {(fitted['upper_bound'] - fitted['lower_bound']).mean():.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Login throughput benchmark for the password hashing admission limit.
+
+Simulates a login storm in-process: ``--clients`` threads post to
+/api/auth/login as fast as they can while one probe thread keeps calling a
+cheap authenticated route (/api/alerts) - the situation of a gthread worker.
+Each scenario is run with unlimited inline hashing and with the admission
+limit, and reports login
+throughput and latency, shed (503) logins and the probe's latency - the
+"does a login storm stall everything else" number.
+
+Usage:
+    python benchmark_login.py --clients 16 --seconds 10
+    python benchmark_login.py --method pbkdf2:sha256:600000 --workers 4 --queue-limit 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """Return a percentile of latency samples (seconds) in milliseconds."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+
+def run_scenario(app, label: str, clients: int, seconds: float, usernames: List[str], token: str) -> Dict:
+    """
+    Run one login storm against ``app`` and collect its numbers.
+
+    Args:
+        app: Flask app (already configured for the scenario)
+        label: Scenario name for the report
+        clients: Concurrent login threads
+        seconds: Storm duration
+        usernames: Accounts to log in as (round-robin)
+        token: JWT used by the probe thread
+
+    Returns:
+        {"scenario", "logins_per_s", "shed", "login_p50_ms", "login_p95_ms",
+         "probe_p95_ms", "probe_max_ms", "hashing": PasswordService.stats()}
+    """
+    from services.password_service import PasswordService
+
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    login_latency: List[float] = []
+    probe_latency: List[float] = []
+    counts = {'ok': 0, 'shed': 0, 'failed': 0}
+
+    def storm(index: int) -> None:
+        client = app.test_client()
+        username = usernames[index % len(usernames)]
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.post('/api/auth/login', json={
+                'username': username, 'password': 'Benchmark-Pass-123'
+            })
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code == 200:
+                    counts['ok'] += 1
+                    login_latency.append(elapsed)
+                elif response.status_code == 503:
+                    counts['shed'] += 1
+                else:
+                    counts['failed'] += 1
+            if response.status_code == 503:
+                time.sleep(0.1)  # shed clients back off instead of spinning
+
+    def probe() -> None:
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get('/api/alerts', headers=headers)
+            probe_latency.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=storm, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'scenario': label,
+        'logins_per_s': round(counts['ok'] / seconds, 1),
+        'shed': counts['shed'],
+        'failed': counts['failed'],
+        'login_p50_ms': _percentile(login_latency, 0.50),
+        'login_p95_ms': _percentile(login_latency, 0.95),
+        'probe_p95_ms': _percentile(probe_latency, 0.95),
+        'probe_max_ms': _percentile(probe_latency, 1.0),
+        'hashing': PasswordService.stats(),
+    }
+
+
+def main() -> int:
+    """Run the unlimited vs admission-limited login storm and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent login threads')
+    parser.add_argument('--seconds', type=float, default=10.0, help='storm duration per scenario')
+    parser.add_argument('--users', type=int, default=8, help='accounts logging in')
+    parser.add_argument('--method', default='pbkdf2:sha256', help='PASSWORD_HASH_METHOD')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--queue-limit', type=int, default=8, help='PASSWORD_HASH_QUEUE_LIMIT')
+    parser.add_argument('--executor', default='thread', choices=['thread', 'process'])
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    import jwt
+    from factory import create_app
+    from models import db, User
+    from rate_limit import limiter
+    from services.password_service import PasswordService
+
+    app = create_app()
+    limiter.enabled = False
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        PasswordService.configure(method=args.method)
+        usernames = [f'bench{i}' for i in range(args.users)]
+        password_hash = PasswordService.hash('Benchmark-Pass-123')
+        for username in usernames:
+            db.session.add(User(username=username, email=f'{username}@example.com', password=password_hash))
+        db.session.commit()
+        token = jwt.encode({'user_id': 1, 'exp': int(time.time()) + 3600},
+                           app.config['JWT_SECRET'], algorithm='HS256')
+
+        results = []
+        for label, workers in (('inline', 0), (f'limited ({args.executor})', args.workers)):
+            PasswordService.configure(
+                method=args.method, workers=workers,
+                queue_limit=args.queue_limit, executor=args.executor
+            )
+            results.append(run_scenario(app, label, args.clients, args.seconds, usernames, token))
+
+    print(f"{args.clients} clients, {args.seconds:g}s per scenario, method {args.method}")
+    print(f"{'scenario':<18}{'logins/s':>10}{'shed':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'probe p95':>11}{'probe max':>11}{'hash p95':>10}{'peak':>6}")
+    for result in results:
+        hashing = result['hashing']
+        print(f"{result['scenario']:<18}{result['logins_per_s']:>10}{result['shed']:>8}"
+              f"{result['login_p50_ms']:>9}{result['login_p95_ms']:>9}"
+              f"{result['probe_p95_ms']:>11}{result['probe_max_ms']:>11}"
+              f"{hashing['hash_ms']['p95']:>10}{hashing['peak_in_flight']:>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -66,6 +66,7 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@expensetracker.com')
+    MAIL_WORKER_CONCURRENCY = int(os.getenv('MAIL_WORKER_CONCURRENCY', 1))  # parallel SMTP connections
     
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -73,8 +74,46 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = os.getenv('REDIS_URL')
+    # Rate limiting (see rate_limit.py). Production must share counters across
+    # workers: 'local+redis://...' (Redis with a per-worker fast path) or
+    # 'redis://...'. Defaults to local+REDIS_URL when REDIS_URL is set.
+    _redis_url = os.getenv('REDIS_URL')
+    RATELIMIT_STORAGE_URI = os.getenv(
+        'RATELIMIT_STORAGE_URI',
+        f'local+{_redis_url}' if _redis_url else 'memory://'
+    )
+    RATELIMIT_STORAGE_OPTIONS = {
+        'sync_interval': float(os.getenv('RATELIMIT_SYNC_INTERVAL', 1.0)),  # seconds
+        'max_pending': int(os.getenv('RATELIMIT_MAX_PENDING', 5)),  # hits buffered per key
+    } if RATELIMIT_STORAGE_URI.startswith('local+') else {}
+    
+    # Response cache (see response_cache.py): in-process LRU by default,
+    # 'RedisCache' to share entries across workers, 'NullCache' to disable
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'response_cache.LRUCache')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', os.getenv('REDIS_URL'))
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))  # seconds
+    CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 5000))  # max in-process entries
+    CACHE_KEY_PREFIX = 'expense-tracker:'
+    
+    # Authenticated principals (see principal_cache.py) live in the same cache;
+    # 0 disables principal caching
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 30))  # seconds
+    
+    # Password hashing (see services/password_service.py). The method string
+    # carries the work factor; hashes made with another one are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')  # thread, process
+    # Concurrent hashes per process; only engages with gthread/gevent workers
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # 0 = no limit
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 8))  # waiting jobs
+    
+    # Spending forecasts (see services/forecast_service.py). Lookups without a
+    # stored fit wait this long for one, then serve a closed-form estimate
+    FORECAST_FIT_WORKERS = int(os.getenv('FORECAST_FIT_WORKERS', 1))  # 0 = fit inline
+    FORECAST_LATENCY_BUDGET_MS = float(os.getenv('FORECAST_LATENCY_BUDGET_MS', 50))
+    
+    # Nightly activity scan (see services/activity_service.py)
+    ACTIVITY_SCAN_WORKERS = int(os.getenv('ACTIVITY_SCAN_WORKERS', 0))  # 0 = one per CPU core, 1 = inline
     
     # Security
     FORCE_HTTPS = os.getenv('FORCE_HTTPS', 'False') == 'True'
@@ -1,10 +1,29 @@
-"""Email service for sending notifications."""
-from typing import Optional
+"""Email service for sending notifications.
+
+Notification emails are not sent from request handlers: the send_* helpers
+render the message and queue it in the ``email_outbox`` table, and the email
+worker (``flask email-worker``) delivers due messages in batches over one
+SMTP connection, retrying failures with exponential backoff. A slow or
+unreachable SMTP server therefore never stalls registration or password
+reset, and messages survive restarts until delivered.
+
+Month-end summaries are queued for every user by a resumable batch job
+(``flask monthly-summaries``): users are summarized a chunk at a time with
+set-based queries, rendered from a precompiled template and bulk-inserted
+into the outbox, with a checkpoint committed alongside each chunk.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from flask_mail import Mail, Message
 from flask import render_template_string, current_app
-from models import db, Alert, User, Expense
+from jinja2 import Environment, Template
+from sqlalchemy import insert
+from models import db, Alert, User, EmailOutbox
 import os
-from datetime import datetime
+import smtplib
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,7 +47,7 @@ def is_email_configured() -> bool:
 
 def send_email_with_fallback(msg: Message) -> bool:
     """
-    Send email with fallback handling.
+    Send email immediately with fallback handling, bypassing the outbox.
     
     Logs warnings/errors if email fails to send rather than raising exceptions.
     This allows the application to continue functioning without a configured email server.
@@ -68,6 +87,237 @@ def send_email_with_fallback(msg: Message) -> bool:
         logger.error(f"Failed to send email: {str(e)}")
         return False
 
+# Outbox delivery policy
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE_SECONDS = 30  # doubled after every failed attempt
+OUTBOX_RETRY_MAX_SECONDS = 3600
+
+
+def queue_email(msg: Message, kind: str, alert_id: Optional[int] = None) -> bool:
+    """
+    Queue an email in the outbox for the background worker.
+    
+    Args:
+        msg: Flask-Mail Message (subject, single recipient, html body)
+        kind: Message type, e.g. 'welcome' or 'password_reset'
+        alert_id: Alert to mark as sent once the message is delivered
+    
+    Returns:
+        True if the message was queued, False if it could not be stored (logged)
+    """
+    try:
+        for recipient in msg.recipients:
+            db.session.add(EmailOutbox(
+                kind=kind,
+                recipient=recipient,
+                subject=msg.subject,
+                html=msg.html or msg.body or '',
+                alert_id=alert_id
+            ))
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to queue {kind} email: {str(e)}")
+        return False
+
+
+def outbox_retry_delay(attempts: int) -> timedelta:
+    """
+    Get the backoff before the next delivery attempt.
+    
+    Args:
+        attempts: Failed attempts so far (>= 1)
+    
+    Returns:
+        OUTBOX_RETRY_BASE_SECONDS doubled per earlier failure, capped at
+        OUTBOX_RETRY_MAX_SECONDS
+    """
+    seconds = OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, OUTBOX_RETRY_MAX_SECONDS))
+
+
+def _outbox_failed(row: EmailOutbox, error: Exception, now: datetime) -> str:
+    """Record a failed attempt; returns the row's new status."""
+    row.attempts += 1
+    row.last_error = str(error)[:1000]
+    if row.attempts >= OUTBOX_MAX_ATTEMPTS:
+        row.status = 'failed'
+        logger.error(f"Giving up on {row.kind} email to {row.recipient} after {row.attempts} attempts: {error}")
+    else:
+        row.next_attempt_at = now + outbox_retry_delay(row.attempts)
+    return row.status
+
+
+def deliver_outbox(
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+    partition: Optional[Tuple[int, int]] = None
+) -> Dict[str, int]:
+    """
+    Deliver one batch of due outbox messages over a single SMTP connection.
+    
+    Due rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+    database supports it, so several workers can drain the same outbox.
+    Delivery is at-least-once: a worker dying mid-batch resends the batch.
+    
+    Args:
+        batch_size: Maximum messages to deliver (default OUTBOX_BATCH_SIZE)
+        now: Reference time (defaults to the current UTC time)
+        partition: (index, count) to only deliver rows whose ID modulo count
+            is index - lets concurrent senders split the outbox on databases
+            without SKIP LOCKED (SQLite)
+    
+    Returns:
+        {"sent": int, "retrying": int, "failed": int}
+    """
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    now = now or datetime.now(timezone.utc)
+    counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+    
+    query = EmailOutbox.query.filter(
+        EmailOutbox.status == 'pending',
+        EmailOutbox.next_attempt_at <= now
+    )
+    if partition is not None:
+        index, count = partition
+        query = query.filter(EmailOutbox.id % count == index)
+    
+    rows: List[EmailOutbox] = query.order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(batch_size).with_for_update(
+        skip_locked=True
+    ).all()
+    
+    if not rows:
+        db.session.commit()
+        return counts
+    
+    if not is_email_configured():
+        db.session.commit()
+        logger.warning(
+            f"Email not configured; {len(rows)} queued emails are waiting. Set MAIL_SERVER, "
+            f"MAIL_USERNAME and MAIL_PASSWORD environment variables."
+        )
+        return counts
+    
+    sent_alert_ids = []
+    attempted = set()
+    
+    def record_failure(row: EmailOutbox, error: Exception) -> None:
+        attempted.add(row.id)
+        counts['retrying' if _outbox_failed(row, error, now) == 'pending' else 'failed'] += 1
+    
+    try:
+        with mail.connect() as connection:
+            for row in rows:
+                try:
+                    connection.send(Message(
+                        subject=row.subject,
+                        recipients=[row.recipient],
+                        html=row.html
+                    ))
+                except (smtplib.SMTPException, OSError) as e:
+                    record_failure(row, e)
+                    continue
+                
+                attempted.add(row.id)
+                row.status = 'sent'
+                row.attempts += 1
+                row.sent_at = now
+                counts['sent'] += 1
+                if row.alert_id:
+                    sent_alert_ids.append(row.alert_id)
+    except (smtplib.SMTPException, OSError) as e:
+        # Connection could not be opened (or dropped): retry everything not attempted
+        logger.error(f"Email connection failed: {str(e)}. "
+                     f"MAIL_SERVER={current_app.config.get('MAIL_SERVER')}, "
+                     f"MAIL_PORT={current_app.config.get('MAIL_PORT')}")
+        for row in rows:
+            if row.id not in attempted:
+                record_failure(row, e)
+    
+    if sent_alert_ids:
+        for alert in Alert.query.filter(Alert.id.in_(sent_alert_ids)).all():
+            alert.is_sent = True
+    
+    db.session.commit()
+    return counts
+
+
+def _drain_outbox(
+    batch_size: int,
+    poll_interval: float,
+    once: bool,
+    drain: bool,
+    partition: Optional[Tuple[int, int]] = None
+) -> Dict[str, int]:
+    """Delivery loop of one sender; returns its totals."""
+    totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+    while True:
+        counts = deliver_outbox(batch_size, partition=partition)
+        for key, value in counts.items():
+            totals[key] += value
+        if once:
+            return totals
+        if sum(counts.values()) < batch_size:
+            if drain:
+                return totals
+            time.sleep(poll_interval)
+
+
+def run_email_worker(
+    batch_size: Optional[int] = None,
+    poll_interval: float = 5.0,
+    once: bool = False,
+    concurrency: int = 1,
+    drain: bool = False
+) -> Dict[str, int]:
+    """
+    Drain the outbox until interrupted (or once).
+    
+    Full batches are followed immediately by the next one; otherwise the
+    worker sleeps ``poll_interval`` seconds before polling again.
+    
+    With ``concurrency`` > 1 the outbox is split into that many partitions,
+    each delivered by its own thread over its own SMTP connection, so a
+    month-end burst is not limited by one connection's round trips.
+    
+    Args:
+        batch_size: Messages per batch (default OUTBOX_BATCH_SIZE)
+        poll_interval: Seconds to sleep when the outbox is drained
+        once: Deliver a single batch (per sender) and return (for cron/tests)
+        concurrency: Parallel senders (SMTP connections)
+        drain: Return once no due messages are left instead of polling
+    
+    Returns:
+        Totals {"sent", "retrying", "failed"} over all batches
+    """
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    if concurrency <= 1:
+        return _drain_outbox(batch_size, poll_interval, once, drain)
+    
+    app = current_app._get_current_object()
+    totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+    lock = threading.Lock()
+    
+    def sender(index: int) -> None:
+        with app.app_context():
+            counts = _drain_outbox(batch_size, poll_interval, once, drain, (index, concurrency))
+        with lock:
+            for key, value in counts.items():
+                totals[key] += value
+    
+    threads = [
+        threading.Thread(target=sender, args=(index,), name=f'email-sender-{index}', daemon=True)
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
+
+
 # Email templates
 ALERT_EMAIL_TEMPLATE = """
 <html>
@@ -131,7 +381,7 @@ def send_alert_email(user_id: int, alert_id: int) -> bool:
         alert_id: ID of the alert to send
     
     Returns:
-        True if email sent successfully, False otherwise
+        True if email queued successfully, False otherwise
     """
     try:
         user = User.query.get(user_id)
@@ -181,15 +431,8 @@ def send_alert_email(user_id: int, alert_id: int) -> bool:
             html=html_body
         )
         
-        # Send email with fallback
-        success: bool = send_email_with_fallback(msg)
-        
-        # Mark alert as sent only if email was sent
-        if success:
-            alert.is_sent = True
-            db.session.commit()
-        
-        return success
+        # Queue for the worker, which marks the alert as sent on delivery
+        return queue_email(msg, 'alert', alert_id=alert.id)
         
     except Exception as e:
         logger.error(f"Error processing alert email: {str(e)}")
@@ -205,7 +448,7 @@ def send_welcome_email(user_email: str, username: str) -> bool:
         username: Username of new user
     
     Returns:
-        True if email sent successfully, False otherwise
+        True if email queued successfully, False otherwise
     """
     try:
         welcome_template = """
@@ -249,103 +492,189 @@ def send_welcome_email(user_email: str, username: str) -> bool:
             html=welcome_template.replace("{{ username }}", username)
         )
         
-        return send_email_with_fallback(msg)
+        return queue_email(msg, 'welcome')
         
     except Exception as e:
         logger.error(f"Error processing welcome email: {str(e)}")
         return False
 
 
-def send_monthly_summary_email(user_id: int) -> bool:
+MONTHLY_SUMMARY_TEMPLATE = """
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; background-color: #f5f5f5; }
+        .container { max-width: 600px; margin: 20px auto; background-color: white; padding: 20px; border-radius: 8px; }
+        .stat { display: inline-block; width: 45%; margin: 10px 2.5%; background-color: #f0f0f0; padding: 15px; border-radius: 4px; text-align: center; }
+        .stat-value { font-size: 24px; font-weight: bold; color: #3498db; }
+        .stat-label { font-size: 12px; color: #666; margin-top: 5px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h2>Your {{ month }} Spending Summary</h2>
+        <p>Hi {{ username }},</p>
+        <p>Here's a summary of your spending for {{ month }}:</p>
+        
+        <div class="stat">
+            <div class="stat-value">${{ '%.2f' | format(total) }}</div>
+            <div class="stat-label">Total Spent</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value">${{ '%.2f' | format(budget) }}</div>
+            <div class="stat-label">Budget</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value">{{ percentage }}%</div>
+            <div class="stat-label">Budget Used</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value">{{ top_category or 'N/A' }}</div>
+            <div class="stat-label">Top Category</div>
+        </div>
+        
+        <p style="margin-top: 20px;">Keep tracking your expenses to better manage your finances!</p>
+    </div>
+</body>
+</html>
+"""
+
+# Month-end summary job
+SUMMARY_BATCH_SIZE = 1000
+
+# Standalone environment for email templates: they need no request, app
+# globals or url_for, and autoescape like Flask's string templates
+_email_env = Environment(autoescape=True)
+
+
+@lru_cache(maxsize=32)
+def compiled_template(source: str) -> Template:
+    """
+    Get an email template compiled once per process.
+    
+    Args:
+        source: Jinja template source (one of the *_TEMPLATE constants)
+    
+    Returns:
+        Compiled jinja2 Template
+    """
+    return _email_env.from_string(source)
+
+
+def render_monthly_summary(summary, month_label: str) -> str:
+    """
+    Render the monthly summary email body.
+    
+    Args:
+        summary: MonthlySummary of the user
+        month_label: Month shown in the email, e.g. 'September 2026'
+    
+    Returns:
+        HTML body
+    """
+    return compiled_template(MONTHLY_SUMMARY_TEMPLATE).render(month=month_label, **summary.as_dict())
+
+
+def send_monthly_summary_email(user_id: int, month: Optional[str] = None) -> bool:
     """
     Send monthly spending summary email to user.
     
     Args:
         user_id: ID of the user to send summary to
+        month: Month in YYYY-MM format (defaults to the current month)
     
     Returns:
-        True if email sent successfully, False otherwise
+        True if email queued successfully, False otherwise
     """
     try:
-        user = User.query.get(user_id)
+        from services.summary_service import MonthlySummaryService
+        from services.rollup_service import month_key
         
-        if not user or not user.email:
+        month = month or month_key(date.today())
+        summaries = MonthlySummaryService.summaries(month, user_id, user_id)
+        if not summaries:
             return False
+        summary = summaries[0]
         
-        from utils import calculate_month_total, get_monthly_budget, calculate_category_spending
-        from datetime import datetime
-        
-        month_total: float = calculate_month_total(user_id)
-        budget: float = get_monthly_budget(user_id)
-        expenses = Expense.query.filter_by(user_id=user_id).all()
-        category_spending: dict = calculate_category_spending(expenses)
-        
-        # Find top category
-        top_category: str = max(category_spending.items(), key=lambda x: x[1])[0] if category_spending else "N/A"
-        top_amount: float = float(max(category_spending.values())) if category_spending else 0
-        
-        current_month: str = datetime.now().strftime("%B %Y")
-        
-        summary_template = """
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; background-color: #f5f5f5; }
-                .container { max-width: 600px; margin: 20px auto; background-color: white; padding: 20px; border-radius: 8px; }
-                .stat { display: inline-block; width: 45%; margin: 10px 2.5%; background-color: #f0f0f0; padding: 15px; border-radius: 4px; text-align: center; }
-                .stat-value { font-size: 24px; font-weight: bold; color: #3498db; }
-                .stat-label { font-size: 12px; color: #666; margin-top: 5px; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h2>Your {{ month }} Spending Summary</h2>
-                <p>Hi {{ username }},</p>
-                <p>Here's a summary of your spending for {{ month }}:</p>
-                
-                <div class="stat">
-                    <div class="stat-value">${{ total_spent }}</div>
-                    <div class="stat-label">Total Spent</div>
-                </div>
-                <div class="stat">
-                    <div class="stat-value">${{ budget }}</div>
-                    <div class="stat-label">Budget</div>
-                </div>
-                <div class="stat">
-                    <div class="stat-value">{{ percentage }}%</div>
-                    <div class="stat-label">Budget Used</div>
-                </div>
-                <div class="stat">
-                    <div class="stat-value">{{ top_category }}</div>
-                    <div class="stat-label">Top Category</div>
-                </div>
-                
-                <p style="margin-top: 20px;">Keep tracking your expenses to better manage your finances!</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        percentage: float = round((month_total / budget * 100), 1) if budget > 0 else 0
-        
+        month_label: str = datetime.strptime(month, '%Y-%m').strftime("%B %Y")
         msg: Message = Message(
-            subject=f"Your {current_month} Spending Summary",
-            recipients=[user.email],
-            html=summary_template.replace("{{ month }}", current_month)
-                                  .replace("{{ username }}", user.username)
-                                  .replace("{{ total_spent }}", f"{month_total:.2f}")
-                                  .replace("{{ budget }}", f"{budget:.2f}")
-                                  .replace("{{ percentage }}", str(percentage))
-                                  .replace("{{ top_category }}", top_category)
+            subject=f"Your {month_label} Spending Summary",
+            recipients=[summary.email],
+            html=render_monthly_summary(summary, month_label)
         )
         
-        return send_email_with_fallback(msg)
+        return queue_email(msg, 'monthly_summary')
         
     except Exception as e:
         logger.error(f"Error processing monthly summary email: {str(e)}")
         return False
 
 
+def queue_monthly_summaries(
+    month: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    restart: bool = False
+) -> Dict[str, int]:
+    """
+    Queue the monthly summary email of every user (month-end job).
+    
+    Users are processed in ID chunks: each chunk is summarized with two
+    set-based queries, rendered and bulk-inserted into the outbox in the
+    same transaction as the job checkpoint. An interrupted run resumes after
+    its last committed chunk, and a finished run is not repeated unless
+    ``restart`` is set.
+    
+    Args:
+        month: Month in YYYY-MM format (defaults to the previous month)
+        batch_size: Users per chunk (default SUMMARY_BATCH_SIZE)
+        restart: Start over even if the month was already (partly) queued
+    
+    Returns:
+        {"users": users processed by this call, "queued": emails queued by
+         this call, "resumed_from": user ID the call started after,
+         "completed": 1 if the month is done}
+    """
+    from services.checkpoint_service import CheckpointService
+    from services.summary_service import MonthlySummaryService
+    from services.rollup_service import month_key, shift_month
+    
+    month = month or month_key(shift_month(date.today(), -1))
+    month_label = datetime.strptime(month, '%Y-%m').strftime("%B %Y")
+    subject = f"Your {month_label} Spending Summary"
+    
+    checkpoint = CheckpointService.start(f'monthly-summary:{month}', restart=restart)
+    counts = {'users': 0, 'queued': 0, 'resumed_from': checkpoint.last_user_id, 'completed': 0}
+    if checkpoint.completed_at is not None:
+        counts['completed'] = 1
+        return counts
+    
+    for user_ids in CheckpointService.user_chunks(checkpoint, batch_size or SUMMARY_BATCH_SIZE):
+        rows = [
+            {
+                'kind': 'monthly_summary',
+                'recipient': summary.email,
+                'subject': subject,
+                'html': render_monthly_summary(summary, month_label),
+            }
+            for summary in MonthlySummaryService.summaries(month, user_ids[0], user_ids[-1])
+        ]
+        try:
+            if rows:
+                db.session.execute(insert(EmailOutbox), rows)
+            CheckpointService.advance(checkpoint, user_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error(f"Monthly summaries for {month} stopped after user {checkpoint.last_user_id}")
+            raise
+        counts['users'] += len(user_ids)
+        counts['queued'] += len(rows)
+    
+    CheckpointService.complete(checkpoint)
+    counts['completed'] = 1
+    return counts
+
+
 def send_password_reset_email(user_email: str, reset_url: str) -> bool:
     """
     Send password reset email.
@@ -355,7 +684,7 @@ def send_password_reset_email(user_email: str, reset_url: str) -> bool:
         reset_url: URL link for password reset (usually expires in 1 hour)
     
     Returns:
-        True if email sent successfully, False otherwise
+        True if email queued successfully, False otherwise
     """
     try:
         reset_template = """
@@ -400,7 +729,7 @@ def send_password_reset_email(user_email: str, reset_url: str) -> bool:
             html=reset_template.replace("{{ reset_url }}", reset_url)
         )
         
-        return send_email_with_fallback(msg)
+        return queue_email(msg, 'password_reset')
         
     except Exception as e:
         logger.error(f"Error processing password reset email: {str(e)}")
@@ -416,7 +745,7 @@ def send_username_recovery_email(user_email: str, username: str) -> bool:
         username: Username to send in email
     
     Returns:
-        True if email sent successfully, False otherwise
+        True if email queued successfully, False otherwise
     """
     try:
         recovery_template = """
@@ -459,7 +788,7 @@ def send_username_recovery_email(user_email: str, username: str) -> bool:
             html=recovery_template.replace("{{ username }}", username)
         )
         
-        return send_email_with_fallback(msg)
+        return queue_email(msg, 'username_recovery')
         
     except Exception as e:
         logger.error(f"Error processing username recovery email: {str(e)}")
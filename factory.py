@@ -1,12 +1,17 @@
 """Flask application factory for creating and configuring app instances."""
 from typing import Optional
-from flask import Flask
+from flask import Flask, jsonify
 from flask_login import LoginManager
 
 from config import get_config
-from models import db, User
+from models import db
 from rate_limit import limiter, handle_rate_limit_error
+from response_cache import cache
+import principal_cache
+from services.password_service import PasswordService, HashingBusyError
+from services.forecast_service import ForecastService
 from sentry_config import init_sentry
+from email_service import mail
 from file_upload_service import init_upload_folder
 
 try:
@@ -55,11 +60,15 @@ def create_app(config_name: Optional[str] = None) -> Flask:
     # Register blueprints
     _register_blueprints(app)
     
+    # Register CLI commands
+    _register_commands(app)
+    
     # Initialize upload folder
     init_upload_folder()
     
     # Setup error handlers
     app.errorhandler(429)(lambda e: handle_rate_limit_error(e))
+    app.errorhandler(HashingBusyError)(_handle_hashing_busy)
     
     # Setup request/response logging for debugging
     _setup_request_logging(app, config_name)
@@ -67,6 +76,17 @@ def create_app(config_name: Optional[str] = None) -> Flask:
     return app
 
 
+def _handle_hashing_busy(e: HashingBusyError):
+    """Shed logins/registrations while the password hashing queue is full."""
+    response = jsonify({
+        'error': 'Service busy',
+        'message': str(e),
+        'retry_after': 1
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 def _init_extensions(app: Flask) -> None:
     """
     Initialize all Flask extensions with the app instance.
@@ -76,6 +96,7 @@ def _init_extensions(app: Flask) -> None:
     - Flask-Mail (Email)
     - Flask-WTF/CSRFProtect (CSRF protection)
     - Flask-Limiter (Rate limiting)
+    - Flask-Caching (Versioned response cache)
     - Flask-Login (Session management)
     - Flask-Migrate (Database migrations)
     - Sentry (Error tracking)
@@ -83,6 +104,21 @@ def _init_extensions(app: Flask) -> None:
     # Database
     db.init_app(app)
     
+    # Spending rollups are maintained on every flush that touches expenses
+    from services.rollup_service import RollupService
+    RollupService.register_listeners()
+    
+    # New expenses are flagged against streaming per-category baselines
+    from services.baseline_service import BaselineService
+    BaselineService.register_listeners()
+    
+    # Per-user data versions (ETags) are bumped on every flush touching user data
+    from services.version_service import DataVersionService
+    DataVersionService.register_listeners()
+    
+    # Cached principals are evicted when a commit changes the user or their data
+    principal_cache.register_listeners()
+    
     # CSRF Protection - CRITICAL SECURITY FIX
     # Must be initialized before routes/blueprints
     # Configure to skip API endpoints (they use JWT instead)
@@ -109,6 +145,27 @@ def _init_extensions(app: Flask) -> None:
     # Rate Limiting
     limiter.init_app(app)
     
+    # Email (delivered from the outbox by `flask email-worker`)
+    mail.init_app(app)
+    
+    # Response cache for analytics/insights endpoints
+    cache.init_app(app)
+    
+    # Password hashing passes a per-process admission limit (503 when saturated)
+    PasswordService.configure(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 0),
+        queue_limit=app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 0),
+        executor=app.config.get('PASSWORD_HASH_EXECUTOR', 'thread')
+    )
+    
+    # Forecast fits run in the background, each in its own app context
+    ForecastService.configure(
+        workers=app.config.get('FORECAST_FIT_WORKERS', 0),
+        latency_budget_ms=app.config.get('FORECAST_LATENCY_BUDGET_MS', 0),
+        context=app.app_context
+    )
+    
     # Database Migrations
     if HAS_MIGRATE:
         migrate = Migrate(app, db)
@@ -121,10 +178,10 @@ def _init_extensions(app: Flask) -> None:
     login_manager.login_message_category = 'info'
     
     @login_manager.user_loader
-    def load_user(user_id: str) -> Optional[User]:
-        """Load user by ID for Flask-Login."""
+    def load_user(user_id: str) -> Optional[principal_cache.Principal]:
+        """Load user by ID for Flask-Login (served from the principal cache)."""
         try:
-            return db.session.get(User, int(user_id))
+            return principal_cache.load_principal(int(user_id))
         except (ValueError, TypeError):
             return None
     
@@ -165,6 +222,142 @@ def _register_blueprints(app: Flask) -> None:
         set_jwt_secret(jwt_secret)
 
 
+def _register_commands(app: Flask) -> None:
+    """
+    Register Flask CLI maintenance commands.
+    
+    Commands:
+    - rebuild-rollups: Recompute spending rollups and the daily index from raw expenses
+    - resume-deletions: Finish user deletions that failed midway
+    - email-worker: Deliver queued emails from the outbox
+    - monthly-summaries: Queue (and optionally deliver) every user's monthly summary
+    - budget-sweep: Raise missing budget alerts for every user
+    - refresh-forecasts: Refit stored spending forecasts whose series changed
+    - category-forecasts: Batch-fit every user's per-category forecasts
+    - activity-scan: Score every user's recent activity on a process pool
+    """
+    import click
+    
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+    def rebuild_rollups(user_id: Optional[int]) -> None:
+        """Backfill or repair the spending rollup and daily index tables."""
+        from services.rollup_service import RollupService
+        from services.daily_index_service import DailyIndexService
+        
+        rows = RollupService.rebuild(user_id=user_id)
+        click.echo(f"Rebuilt {rows} rollup rows")
+        days = DailyIndexService.rebuild(user_id=user_id)
+        click.echo(f"Rebuilt {days} daily index rows")
+    
+    @app.cli.command('resume-deletions')
+    def resume_deletions() -> None:
+        """Finish account deletions interrupted after their expenses were deleted."""
+        from repositories import user_repo
+        
+        user_ids = user_repo.resume_deletions()
+        click.echo(f"Finished deleting {len(user_ids)} users")
+    
+    @app.cli.command('email-worker')
+    @click.option('--batch-size', type=int, default=None, help='Emails per SMTP connection.')
+    @click.option('--interval', type=float, default=5.0, help='Seconds between polls when idle.')
+    @click.option('--once', is_flag=True, help='Deliver one batch and exit.')
+    @click.option('--concurrency', type=int, default=None,
+                  help='Parallel SMTP connections (default MAIL_WORKER_CONCURRENCY).')
+    def email_worker(batch_size: Optional[int], interval: float, once: bool,
+                     concurrency: Optional[int]) -> None:
+        """Deliver queued emails in batches, retrying failures with backoff."""
+        from email_service import run_email_worker
+        
+        try:
+            totals = run_email_worker(
+                batch_size=batch_size, poll_interval=interval, once=once,
+                concurrency=concurrency or app.config.get('MAIL_WORKER_CONCURRENCY', 1)
+            )
+        except KeyboardInterrupt:
+            return
+        click.echo(f"Sent {totals['sent']}, retrying {totals['retrying']}, failed {totals['failed']}")
+    
+    @app.cli.command('monthly-summaries')
+    @click.option('--month', default=None, help='Month as YYYY-MM (default: last month).')
+    @click.option('--batch-size', type=int, default=None, help='Users per checkpointed chunk.')
+    @click.option('--restart', is_flag=True, help='Ignore earlier progress for the month.')
+    @click.option('--deliver', is_flag=True, help='Drain the outbox after queueing.')
+    @click.option('--concurrency', type=int, default=None,
+                  help='Parallel SMTP connections when delivering (default MAIL_WORKER_CONCURRENCY).')
+    def monthly_summaries(month: Optional[str], batch_size: Optional[int], restart: bool,
+                          deliver: bool, concurrency: Optional[int]) -> None:
+        """Queue every user's monthly summary email; resumes an interrupted run."""
+        from email_service import queue_monthly_summaries, run_email_worker
+        
+        counts = queue_monthly_summaries(month=month, batch_size=batch_size, restart=restart)
+        if counts['resumed_from']:
+            click.echo(f"Resumed after user {counts['resumed_from']}")
+        click.echo(f"Queued {counts['queued']} summaries for {counts['users']} users")
+        
+        if deliver:
+            totals = run_email_worker(
+                concurrency=concurrency or app.config.get('MAIL_WORKER_CONCURRENCY', 1),
+                drain=True
+            )
+            click.echo(f"Sent {totals['sent']}, retrying {totals['retrying']}, failed {totals['failed']}")
+    
+    @app.cli.command('budget-sweep')
+    @click.option('--month', default=None, help='Month as YYYY-MM (default: this month).')
+    def budget_sweep(month: Optional[str]) -> None:
+        """Re-evaluate every user's budget and raise missing alerts (run nightly)."""
+        from services.budget_service import BudgetService
+        
+        result = BudgetService.sweep_alerts(month=month)
+        click.echo(
+            f"Scanned {result['scanned']} budgets for {result['month']}: raised {result['raised']} alerts "
+            f"({result['warnings']} warnings, {result['exceeded']} exceeded)"
+        )
+    
+    @app.cli.command('refresh-forecasts')
+    def refresh_forecasts() -> None:
+        """Refit forecasts after month rollover or edits to past months (run nightly)."""
+        from services.forecast_service import ForecastService
+        
+        counts = ForecastService.refresh()
+        click.echo(f"Checked {counts['checked']} forecasts, refitted {counts['refitted']}")
+    
+    @app.cli.command('category-forecasts')
+    @click.option('--batch-size', type=int, default=None, help='Users per checkpointed chunk.')
+    @click.option('--restart', is_flag=True, help="Ignore earlier progress of today's run.")
+    def category_forecasts(batch_size: Optional[int], restart: bool) -> None:
+        """Forecast every user's spending per category (run nightly); resumes an interrupted run."""
+        from services.category_forecast_service import CategoryForecastService
+        
+        counts = CategoryForecastService.refresh_all(batch_size=batch_size, restart=restart)
+        if counts['resumed_from']:
+            click.echo(f"Resumed after user {counts['resumed_from']}")
+        click.echo(
+            f"Forecast {counts['series']} category series of {counts['users']} users "
+            f"for {counts['month']} in {counts['seconds']}s"
+        )
+    
+    @app.cli.command('activity-scan')
+    @click.option('--workers', type=int, default=None, help='Scoring processes (1 = inline).')
+    @click.option('--batch-size', type=int, default=None, help='Users per checkpointed chunk.')
+    @click.option('--restart', is_flag=True, help="Ignore earlier progress of today's run.")
+    def activity_scan(workers: Optional[int], batch_size: Optional[int], restart: bool) -> None:
+        """Score every user's unusual activity and insights (run nightly); resumes an interrupted run."""
+        from services.activity_service import ActivityScanService
+        
+        counts = ActivityScanService.run(
+            workers=workers or app.config.get('ACTIVITY_SCAN_WORKERS', 0),
+            batch_size=batch_size,
+            restart=restart
+        )
+        if counts['resumed_from']:
+            click.echo(f"Resumed after user {counts['resumed_from']}")
+        click.echo(
+            f"Scored {counts['scored']} of {counts['users']} users for {counts['date']} "
+            f"({counts['unusual']} with unusual expenses) on {counts['workers']} workers in {counts['seconds']}s"
+        )
+
+
 def _setup_request_logging(app: Flask, config_name: str) -> None:
     """
     Setup request/response logging for debugging.
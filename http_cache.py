@@ -0,0 +1,90 @@
+"""Conditional GET support - weak ETags from the per-user data version.
+
+Every GET of per-user data is tagged with a weak ETag derived from
+``User.data_version`` (see services/version_service.py). When a client sends
+the tag back in ``If-None-Match`` and nothing changed, the request is
+answered with 304 Not Modified before the view runs, so polling clients
+cost one primary-key lookup of the user instead of the view's queries.
+
+Example usage:
+    from http_cache import etag_cached
+
+    @analytics_bp.route('/api/stats')
+    @login_required
+    @etag_cached
+    def api_stats():
+        ...
+
+JWT routes get the same behaviour from ``api.token_required``; views whose
+output does not depend only on the caller's own data (e.g. admin listings)
+opt out with ``@etag_exempt``.
+"""
+from functools import wraps
+from typing import Callable
+
+from flask import Response, make_response, request
+from flask_login import current_user
+
+from models import User
+from services.version_service import DataVersionService
+
+# Methods that may be answered with 304 Not Modified
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def etag_exempt(f: Callable) -> Callable:
+    """
+    Mark a view as never ETag-tagged or answered with 304.
+
+    Apply below the auth decorator so it marks the view itself.
+    """
+    f.etag_exempt = True
+    return f
+
+
+def user_etag(user: User) -> str:
+    """Return the weak ETag value for a user's current data version."""
+    return DataVersionService.etag(user.id, user.data_version)
+
+
+def conditional_response(user: User, view: Callable, *args, **kwargs) -> Response:
+    """
+    Run a view for ``user`` with If-None-Match / ETag handling.
+
+    Args:
+        user: Authenticated user whose data the view returns
+        view: Flask view function
+        *args, **kwargs: View arguments
+
+    Returns:
+        304 response if the client's ETag is current, otherwise the view's
+        response (tagged with the ETag when it is a 200)
+    """
+    if request.method not in CONDITIONAL_METHODS or getattr(view, 'etag_exempt', False):
+        return view(*args, **kwargs)
+
+    etag = user_etag(user)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def etag_cached(f: Callable) -> Callable:
+    """
+    Decorator adding ETag / 304 support to a Flask-Login protected view.
+
+    Must be applied below ``@login_required``.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        return conditional_response(current_user, f, *args, **kwargs)
+
+    return decorated
@@ -1,109 +1,209 @@
 """AI-powered expense insights engine."""
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, date, timedelta
 from decimal import Decimal
-from sqlalchemy import func
+import calendar
 from models import db, Expense
 from utils import parse_month
+from services.stats_service import StatsService
+from services.daily_index_service import DailyIndexService
+from services.category_forecast_service import CategoryForecastService
+from services.baseline_service import BaselineService
+from services.activity_service import ActivityScanService
 
 
-def get_week_over_week_comparison(user_id: int) -> Dict[str, Any]:
+# Days of history loaded for one insights pass (covers this/last week
+# and the current month)
+INSIGHT_WINDOW_DAYS = 60
+
+# Days of stored unusual-expense flags shown as anomalies
+ANOMALY_WINDOW_DAYS = 30
+
+# Compact insight row: (date, category, amount)
+InsightRow = Tuple[date, str, Decimal]
+
+
+def load_insight_rows(user_id: int, today: Optional[date] = None) -> List[InsightRow]:
     """
-    Compare this week vs last week spending.
+    Load the insight window as compact tuples in one query.
+    
+    Only three columns are selected, so no Expense objects are hydrated.
     
     Args:
         user_id: User ID
+        today: Reference date (defaults to today)
     
     Returns:
-        Dictionary with:
-            - this_week: float - This week's total
-            - last_week: float - Last week's total
-            - percent_change: float - Percentage change
-            - direction: str - 'up', 'down', or 'same'
-            - amount_diff: float - Absolute difference
+        List of (date, category, amount) tuples for the last
+        INSIGHT_WINDOW_DAYS days
     """
-    today = datetime.now().date()
-    
-    # This week (Mon-Sun)
-    days_since_monday = today.weekday()
-    this_week_start = today - timedelta(days=days_since_monday)
-    this_week_end = this_week_start + timedelta(days=6)
-    
-    # Last week
-    last_week_start = this_week_start - timedelta(days=7)
-    last_week_end = this_week_start - timedelta(days=1)
-    
-    this_week_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= this_week_start,
-        Expense.date <= this_week_end
-    ).scalar() or 0
-    
-    last_week_total = db.session.query(func.sum(Expense.amount)).filter(
+    today = today or datetime.now().date()
+    rows = db.session.query(
+        Expense.date, Expense.category, Expense.amount
+    ).filter(
         Expense.user_id == user_id,
-        Expense.date >= last_week_start,
-        Expense.date <= last_week_end
-    ).scalar() or 0
-    
-    if last_week_total == 0:
+        Expense.date >= today - timedelta(days=INSIGHT_WINDOW_DAYS),
+        Expense.date <= today
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def week_ranges(today: date) -> Tuple[Tuple[date, date], Tuple[date, date]]:
+    """Return ((this_week_start, this_week_end), (last_week_start, last_week_end)), weeks starting Monday."""
+    this_week_start = today - timedelta(days=today.weekday())
+    return (
+        (this_week_start, this_week_start + timedelta(days=6)),
+        (this_week_start - timedelta(days=7), this_week_start - timedelta(days=1))
+    )
+
+
+def _week_comparison(this_week: Decimal, last_week: Decimal) -> Dict[str, Any]:
+    """Format this/last week totals as the week_comparison dict."""
+    if last_week == 0:
         percent_change = 0
     else:
-        percent_change = ((this_week_total - last_week_total) / last_week_total) * 100
-    
+        percent_change = float((this_week - last_week) / last_week * 100)
     return {
-        'this_week': round(this_week_total, 2),
-        'last_week': round(last_week_total, 2),
+        'this_week': round(float(this_week), 2),
+        'last_week': round(float(last_week), 2),
         'percent_change': round(percent_change, 1),
         'direction': 'up' if percent_change > 0 else 'down' if percent_change < 0 else 'same',
-        'amount_diff': round(abs(this_week_total - last_week_total), 2)
+        'amount_diff': round(float(abs(this_week - last_week)), 2)
     }
 
 
-def get_spending_anomalies(user_id: int) -> List[Dict[str, Any]]:
+def compute_insights(rows: List[InsightRow], today: date) -> Dict[str, Any]:
+    """
+    Compute every insight from the loaded window in a single pass.
+    
+    Args:
+        rows: Tuples from load_insight_rows()
+        today: Reference date the rows were loaded for
+    
+    Returns:
+        Dictionary with:
+            - week_comparison: dict - see get_week_over_week_comparison()
+            - categories: dict - see get_category_insights()
+            - forecast: dict - see get_spending_forecast()
     """
-    Detect unusual spending patterns.
+    (this_week_start, this_week_end), (last_week_start, _) = week_ranges(today)
+    month_start = today.replace(day=1)
+    
+    this_week = last_week = month_spent = Decimal(0)
+    month_by_category: Dict[str, Decimal] = {}
+    
+    for day, category, amount in rows:
+        if this_week_start <= day <= this_week_end:
+            this_week += amount
+        elif last_week_start <= day < this_week_start:
+            last_week += amount
+        
+        if day >= month_start:
+            month_spent += amount
+            month_by_category[category] = month_by_category.get(category, Decimal(0)) + amount
+    
+    week_comparison = _week_comparison(this_week, last_week)
+    
+    # Category insights for this month
+    categories = {}
+    ranked = sorted(month_by_category.items(), key=lambda item: item[1], reverse=True)
+    for rank, (category, amount) in enumerate(ranked, 1):
+        percentage = float(amount / month_spent * 100) if month_spent > 0 else 0
+        categories[category] = {
+            'amount': round(float(amount), 2),
+            'percentage': round(percentage, 1),
+            'rank': rank
+        }
     
-    Identifies expenses significantly higher than average (>2x) in past 30 days.
+    # Month-end forecast at the current daily pace
+    days_into_month = today.day
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    daily_average = month_spent / days_into_month
+    forecast = {
+        'spent_so_far': round(float(month_spent), 2),
+        'projected_total': round(float(daily_average * days_in_month), 2),
+        'days_into_month': days_into_month,
+        'days_in_month': days_in_month,
+        'daily_average': round(float(daily_average), 2)
+    }
+    
+    return {
+        'week_comparison': week_comparison,
+        'categories': categories,
+        'forecast': forecast
+    }
+
+
+def get_insights(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Load the insight window once and compute all insights from it.
+    
+    This is the shared entry point for the insights page and every
+    /api/insights/* endpoint.
     
     Args:
         user_id: User ID
+        today: Reference date (defaults to today)
     
     Returns:
-        List of dicts with anomaly details, sorted by amount (descending)
+        compute_insights() result plus the stored anomalies (see
+        get_spending_anomalies()) and the human-readable messages under
+        'insights'
     """
-    today = datetime.now().date()
-    this_month_start = today.replace(day=1)
+    today = today or datetime.now().date()
+    result = compute_insights(load_insight_rows(user_id, today), today)
+    result['anomalies'] = _recent_anomalies(user_id, today)
+    result['insights'] = generate_ai_insights(user_id, result)
+    return result
+
+
+def _recent_anomalies(user_id: int, today: date) -> List[Dict[str, Any]]:
+    """Read the largest unusual-expense flags of the anomaly window."""
+    return BaselineService.recent_flags(
+        user_id, today - timedelta(days=ANOMALY_WINDOW_DAYS), today
+    )
+
+
+def get_week_over_week_comparison(user_id: int) -> Dict[str, Any]:
+    """
+    Compare this week vs last week spending.
     
-    # Get last 30 days of data
-    thirty_days_ago = today - timedelta(days=30)
-    expenses_30d = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= thirty_days_ago,
-        Expense.date <= today
-    ).all()
+    Both totals come from the daily prefix-sum index in one query.
     
-    if len(expenses_30d) == 0:
-        return []
-    
-    # Calculate average daily spending (convert Decimal to float for calculations)
-    days_with_spending = len(set(e.date for e in expenses_30d))
-    total_spending = sum((e.amount for e in expenses_30d), Decimal(0))
-    avg_daily = float(total_spending) / max(days_with_spending, 1)
-    
-    # Find anomalies (expenses > 2x average)
-    anomalies = []
-    for expense in expenses_30d:
-        if expense.amount > avg_daily * 2:
-            anomalies.append({
-                'date': expense.date.isoformat(),
-                'title': expense.title,
-                'category': expense.category,
-                'amount': round(expense.amount, 2),
-                'vs_average': round((expense.amount / avg_daily), 1),
-                'severity': 'high' if expense.amount > avg_daily * 3 else 'medium'
-            })
+    Args:
+        user_id: User ID
     
-    return sorted(anomalies, key=lambda x: x['amount'], reverse=True)[:5]
+    Returns:
+        Dictionary with:
+            - this_week: float - This week's total
+            - last_week: float - Last week's total
+            - percent_change: float - Percentage change
+            - direction: str - 'up', 'down', or 'same'
+            - amount_diff: float - Absolute difference
+    """
+    this_week, last_week = DailyIndexService.range_totals(
+        user_id, week_ranges(datetime.now().date())
+    )
+    return _week_comparison(this_week, last_week)
+
+
+def get_spending_anomalies(user_id: int) -> List[Dict[str, Any]]:
+    """
+    Get unusual expenses of the past 30 days.
+    
+    Expenses are flagged when they are written, against running statistics
+    of their category (see services/baseline_service.py); this only reads
+    the stored flags.
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        Up to 5 dicts (title, date, category, amount, vs_average,
+        severity), sorted by amount (descending); vs_average is the amount
+        over the category's typical amount
+    """
+    return _recent_anomalies(user_id, datetime.now().date())
 
 
 def get_category_insights(user_id: int) -> Dict[str, Dict[str, Any]]:
@@ -117,33 +217,7 @@ def get_category_insights(user_id: int) -> Dict[str, Dict[str, Any]]:
         Dict mapping category names to {'amount': float, 'percentage': float, 'rank': int}
     """
     today = datetime.now().date()
-    this_month_start = today.replace(day=1)
-    
-    # This month spending by category
-    category_spending = db.session.query(
-        Expense.category,
-        func.sum(Expense.amount).label('total')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.date >= this_month_start,
-        Expense.date <= today
-    ).group_by(Expense.category).order_by(func.sum(Expense.amount).desc()).all()
-    
-    if not category_spending:
-        return {}
-    
-    total_spending = sum(cat[1] for cat in category_spending)
-    
-    insights = {}
-    for i, (category, amount) in enumerate(category_spending):
-        percentage = (amount / total_spending * 100) if total_spending > 0 else 0
-        insights[category] = {
-            'amount': round(amount, 2),
-            'percentage': round(percentage, 1),
-            'rank': i + 1
-        }
-    
-    return insights
+    return compute_insights(load_insight_rows(user_id, today), today)['categories']
 
 
 def get_spending_forecast(user_id: int) -> Dict[str, Any]:
@@ -164,49 +238,76 @@ def get_spending_forecast(user_id: int) -> Dict[str, Any]:
             - daily_average: float - Average daily spending
     """
     today = datetime.now().date()
-    this_month_start = today.replace(day=1)
+    return compute_insights(load_insight_rows(user_id, today), today)['forecast']
+
+
+def get_category_forecasts(user_id: int) -> Dict[str, Any]:
+    """
+    Forecast this month's spending per category.
     
-    # Get spending so far this month
-    month_spent = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= this_month_start,
-        Expense.date <= today
-    ).scalar() or 0
+    Served from the nightly batch forecasts (exponential smoothing over the
+    last two years of monthly totals), fitted live if the batch has not
+    run for the month yet.
     
-    # Days into month
-    days_into_month = (today - this_month_start).days + 1
-    days_in_month = (this_month_start.replace(month=this_month_start.month % 12 + 1, day=1) - timedelta(days=1)).day
+    Args:
+        user_id: User ID
     
-    # Project to end of month
-    if days_into_month > 0:
-        daily_average = month_spent / days_into_month
-        projected_total = daily_average * days_in_month
-    else:
-        projected_total = 0
+    Returns:
+        Dict with:
+            - month: str - Forecast month (YYYY-MM)
+            - source: str - 'batch' or 'live'
+            - total: dict - forecast, lower_bound, upper_bound
+            - categories: dict - category -> forecast, lower_bound,
+              upper_bound, history_months (largest forecast first)
+    """
+    return CategoryForecastService.get_forecasts(user_id)
+
+
+def get_activity_scan(user_id: int) -> Dict[str, Any]:
+    """
+    Get the result of the nightly unusual-activity scan.
     
-    return {
-        'spent_so_far': round(month_spent, 2),
-        'projected_total': round(projected_total, 2),
-        'days_into_month': days_into_month,
-        'days_in_month': days_in_month,
-        'daily_average': round(month_spent / days_into_month, 2) if days_into_month > 0 else 0
-    }
+    Served as stored by the scan (see services/activity_service.py); users
+    without expenses in the last 90 days, or scanned before the first run,
+    get status 'pending'.
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        Dict with:
+            - status: str - 'ready' or 'pending'
+            - date: str - Scan date (ISO), when ready
+            - expense_count, spent, spent_previous, change_percent,
+              top_category, top_share, unusual_count: last 30 days
+            - unusual: list - Top unusual expenses (expense_id, date,
+              category, amount, zscore)
+            - insights: list - type, severity, message
+    """
+    activity = ActivityScanService.get_activity(user_id)
+    if activity is None:
+        return {'status': 'pending', 'unusual': [], 'insights': []}
+    return dict(activity, status='ready')
 
 
-def generate_ai_insights(user_id: int) -> List[str]:
+def generate_ai_insights(user_id: int, data: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
     """
     Generate human-readable AI insights about user spending patterns.
     
     Args:
         user_id: User ID
+        data: Precomputed get_insights() result (computed if omitted)
     
     Returns:
-        List of insight strings
+        List of insight dicts (type, emoji, title, message, action)
     """
+    if data is None:
+        return get_insights(user_id)['insights']
+    
     insights = []
     
     # Week-over-week insight
-    wow = get_week_over_week_comparison(user_id)
+    wow = data['week_comparison']
     if wow['last_week'] > 0:
         if wow['percent_change'] > 10:
             insights.append({
@@ -226,19 +327,19 @@ def generate_ai_insights(user_id: int) -> List[str]:
             })
     
     # Anomaly detection
-    anomalies = get_spending_anomalies(user_id)
+    anomalies = data['anomalies']
     if anomalies:
         highest = anomalies[0]
         insights.append({
             'type': 'info',
             'emoji': '🔍',
             'title': 'Large Expense Detected',
-            'message': f"${highest['amount']:.2f} spent on {highest['title']} ({highest['category']}) - about {highest['vs_average']}x your daily average.",
+            'message': f"${highest['amount']:.2f} spent on {highest['title']} ({highest['category']}) - about {highest['vs_average']}x your usual {highest['category']} expense.",
             'action': 'Was this expected?'
         })
     
     # Category insight
-    category_data = get_category_insights(user_id)
+    category_data = data['categories']
     if category_data:
         top_category = max(category_data.items(), key=lambda x: x[1]['percentage'])
         insights.append({
@@ -250,7 +351,7 @@ def generate_ai_insights(user_id: int) -> List[str]:
         })
     
     # Spending forecast
-    forecast = get_spending_forecast(user_id)
+    forecast = data['forecast']
     if forecast['days_into_month'] > 0:
         insights.append({
             'type': 'forecast',
@@ -263,52 +364,6 @@ def generate_ai_insights(user_id: int) -> List[str]:
     return insights
 
 
-def get_quick_stats(user_id):
-    """Get quick statistics for dashboard."""
-    today = datetime.now().date()
-    this_month_start = today.replace(day=1)
-    
-    # Today
-    today_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date == today
-    ).scalar() or 0
-    
-    # This month
-    month_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= this_month_start,
-        Expense.date <= today
-    ).scalar() or 0
-    
-    # This year
-    year_start = today.replace(month=1, day=1)
-    year_total = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= year_start,
-        Expense.date <= today
-    ).scalar() or 0
-    
-    # Average daily (last 30 days)
-    thirty_days_ago = today - timedelta(days=30)
-    last_30_days = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= thirty_days_ago,
-        Expense.date <= today
-    ).scalar() or 0
-    daily_avg = last_30_days / 30
-    
-    # Count transactions
-    expense_count = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= this_month_start,
-        Expense.date <= today
-    ).count()
-    
-    return {
-        'today': round(today_total, 2),
-        'this_month': round(month_total, 2),
-        'this_year': round(year_total, 2),
-        'daily_average': round(daily_avg, 2),
-        'expense_count': expense_count
-    }
+def get_quick_stats(user_id, today: Optional[date] = None):
+    """Get quick statistics for dashboard (one conditional-aggregate query)."""
+    return StatsService.quick(user_id, today).as_dict()
@@ -0,0 +1,45 @@
+"""Add email_outbox table for background email delivery
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 17:00:00.000000
+
+Deliver queued mail with:
+    flask email-worker
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=40), nullable=False),
+        sa.Column('recipient', sa.String(length=120), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('html', sa.Text(), nullable=False),
+        sa.Column('alert_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['alert_id'], ['alert.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_outbox_due', 'email_outbox', ['status', 'next_attempt_at'])
+    op.create_index('ix_email_outbox_alert_id', 'email_outbox', ['alert_id'])
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_alert_id', table_name='email_outbox')
+    op.drop_index('idx_outbox_due', table_name='email_outbox')
+    op.drop_table('email_outbox')
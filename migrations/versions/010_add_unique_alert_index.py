@@ -0,0 +1,35 @@
+"""Add unique index on alert (user_id, triggered_month, alert_type)
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 19:00:00.000000
+
+Budget alerts are now inserted idempotently against this index. Duplicate
+alerts created by earlier concurrent writes are removed first, keeping the
+oldest alert of each (user, month, type).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text(
+        "DELETE FROM alert WHERE triggered_month IS NOT NULL AND id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM alert "
+        "GROUP BY user_id, triggered_month, alert_type) AS keep)"
+    ))
+    op.create_index(
+        'uq_alert_user_month_type', 'alert',
+        ['user_id', 'triggered_month', 'alert_type'], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_alert_user_month_type', table_name='alert')
@@ -0,0 +1,40 @@
+"""Add spending_forecast table for stored next-month forecasts
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 20:00:00.000000
+
+Refit forecasts whose series changed with:
+    flask refresh-forecasts
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('spending_forecast',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('series_version', sa.String(length=40), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('method', sa.String(length=20), nullable=False),
+        sa.Column('forecast', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('lower_bound', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('upper_bound', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=False, server_default='0.95'),
+        sa.Column('history_months', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fit_ms', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('fitted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('spending_forecast')
@@ -0,0 +1,39 @@
+"""Add category_forecast table for batch per-category forecasts
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 20:00:00.000000
+
+Fill it with:
+    flask category-forecasts
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('category_forecast',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('forecast', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('lower_bound', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('upper_bound', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('alpha', sa.Float(), nullable=False),
+        sa.Column('beta', sa.Float(), nullable=False),
+        sa.Column('history_months', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fitted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'category')
+    )
+
+
+def downgrade():
+    op.drop_table('category_forecast')
@@ -0,0 +1,39 @@
+"""Add anomaly_model table for per-user anomaly models
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-20 20:00:00.000000
+
+Models are created and refitted as expenses are added.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('anomaly_model',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('log_median', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('log_mad', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('weekday_counts', sa.String(length=80), nullable=False, server_default='0,0,0,0,0,0,0'),
+        sa.Column('gap_median', sa.Float(), nullable=True),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('fit_ms', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('fitted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'category')
+    )
+
+
+def downgrade():
+    op.drop_table('anomaly_model')
@@ -0,0 +1,54 @@
+"""Add spending_baseline and expense_flag tables for streaming anomaly flags
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-21 20:00:00.000000
+
+Baselines start empty and are built up as expenses are written; expenses
+written before this migration are not replayed into them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('spending_baseline',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('variance', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('sketch', sa.Text(), nullable=False, server_default='{}'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'category')
+    )
+    op.create_table('expense_flag',
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('zscore', sa.Float(), nullable=False),
+        sa.Column('percentile', sa.Float(), nullable=False),
+        sa.Column('vs_typical', sa.Float(), nullable=False),
+        sa.Column('severity', sa.String(length=10), nullable=False, server_default='medium'),
+        sa.Column('flagged_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['expense_id'], ['expense.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('expense_id')
+    )
+    op.create_index('idx_expense_flag_user_date', 'expense_flag', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_expense_flag_user_date', table_name='expense_flag')
+    op.drop_table('expense_flag')
+    op.drop_table('spending_baseline')
@@ -0,0 +1,40 @@
+"""Add user_activity table for the nightly activity scan
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-22 20:00:00.000000
+
+Rows are written by ``flask activity-scan``; users appear after its first run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_activity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('spent', sa.Numeric(precision=12, scale=2), nullable=False, server_default='0'),
+        sa.Column('spent_previous', sa.Numeric(precision=12, scale=2), nullable=False, server_default='0'),
+        sa.Column('change_percent', sa.Float(), nullable=True),
+        sa.Column('top_category', sa.String(length=50), nullable=True),
+        sa.Column('top_share', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('unusual_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('unusual', sa.Text(), nullable=False, server_default='[]'),
+        sa.Column('insights', sa.Text(), nullable=False, server_default='[]'),
+        sa.Column('scored_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_activity')
@@ -21,9 +21,13 @@ class User(UserMixin, db.Model):
         reset_token_expires: Expiration time for reset token
         role: User role ('user' or 'admin')
         created_at: Account creation timestamp
+        data_version: Counter bumped on every expense/setting/alert write (ETags)
+        token_version: Counter bumped on password change; older JWTs are rejected
         expenses: Relationship to user's expenses
         settings: Relationship to user settings
         alerts: Relationship to user alerts
+        rollups: Relationship to monthly spending rollups
+        daily_totals: Relationship to the daily spending index
     """
     __allow_unmapped__ = True
     __table_args__ = (
@@ -39,6 +43,8 @@ class User(UserMixin, db.Model):
     reset_token_expires: Optional[datetime] = db.Column(db.DateTime)
     role: str = db.Column(db.String(20), default="user", nullable=False)  # user, admin
     created_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    data_version: int = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    token_version: int = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     expenses: List['Expense'] = db.relationship(
@@ -50,6 +56,12 @@ class User(UserMixin, db.Model):
     alerts: List['Alert'] = db.relationship(
         'Alert', backref='user', lazy=True, cascade='all, delete-orphan'
     )
+    rollups: List['SpendingRollup'] = db.relationship(
+        'SpendingRollup', backref='user', lazy=True, cascade='all, delete-orphan'
+    )
+    daily_totals: List['DailySpending'] = db.relationship(
+        'DailySpending', backref='user', lazy=True, cascade='all, delete-orphan'
+    )
 
     def __repr__(self) -> str:
         """Return string representation of User."""
@@ -132,6 +144,66 @@ class Expense(db.Model):
         return errors
 
 
+class SpendingRollup(db.Model):
+    """Per-user monthly spending totals by category.
+    
+    Maintained incrementally in the same transaction as every Expense write
+    (see services/rollup_service.py), so dashboard and analytics totals are
+    read from a handful of rows instead of scanning the expense history.
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        month: Month bucket in YYYY-MM format
+        category: Expense category
+        total: Sum of expense amounts in the bucket
+        count: Number of expenses in the bucket
+        user: Relationship to User object
+    """
+    __allow_unmapped__ = True
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month: str = db.Column(db.String(7), primary_key=True)  # YYYY-MM format
+    category: str = db.Column(db.String(50), primary_key=True)
+    total: Decimal = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count: int = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """Return string representation of SpendingRollup."""
+        return f'<SpendingRollup {self.user_id} {self.month} {self.category}={self.total}>'
+
+
+class DailySpending(db.Model):
+    """Per-user daily spending totals with running (prefix-sum) columns.
+    
+    One row per user per day with spending. ``running_total``/``running_count``
+    hold the user's cumulative spending up to and including ``day``, so the
+    total for any date range is the difference of two index lookups.
+    Maintained incrementally alongside the monthly rollup
+    (see services/daily_index_service.py).
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        day: Calendar day
+        total: Sum of expense amounts on the day
+        count: Number of expenses on the day
+        running_total: Sum of all the user's expenses up to and including day
+        running_count: Number of the user's expenses up to and including day
+        user: Relationship to User object
+    """
+    __allow_unmapped__ = True
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day: date_type = db.Column(db.Date, primary_key=True)
+    total: Decimal = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count: int = db.Column(db.Integer, nullable=False, default=0)
+    running_total: Decimal = db.Column(db.Numeric(16, 2))
+    running_count: int = db.Column(db.Integer)
+
+    def __repr__(self) -> str:
+        """Return string representation of DailySpending."""
+        return f'<DailySpending {self.user_id} {self.day}={self.total} (running {self.running_total})>'
+
+
 class Setting(db.Model):
     """Settings model for user-specific configuration.
     
@@ -172,8 +244,15 @@ class Alert(db.Model):
         created_at: Timestamp when alert was created
         triggered_month: Month that triggered the alert (YYYY-MM format)
         user: Relationship to User object
+    
+    At most one alert of each type exists per user and month; budget alerts
+    are inserted with ON CONFLICT DO NOTHING against this unique index
+    (see BudgetService.upsert_alert), so concurrent writes cannot duplicate them.
     """
     __allow_unmapped__ = True
+    __table_args__ = (
+        Index('uq_alert_user_month_type', 'user_id', 'triggered_month', 'alert_type', unique=True),
+    )
     
     id: int = db.Column(db.Integer, primary_key=True)
     user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
@@ -189,3 +268,313 @@ class Alert(db.Model):
     def __repr__(self) -> str:
         """Return string representation of Alert."""
         return f'<Alert {self.title} - {self.alert_type}>'
+
+
+class EmailOutbox(db.Model):
+    """Outgoing email waiting for (or done with) background delivery.
+    
+    Request handlers only insert rows; the email worker (see email_service.py)
+    drains due rows in batches over one SMTP connection, retrying failures
+    with exponential backoff.
+    
+    Attributes:
+        id: Unique message identifier
+        kind: Message type (welcome, password_reset, username_recovery, alert, ...)
+        recipient: Destination email address
+        subject: Message subject
+        html: Rendered HTML body
+        alert_id: Alert this message notifies about (marked is_sent on delivery)
+        status: Delivery status (pending, sent, failed)
+        attempts: Delivery attempts made so far
+        next_attempt_at: Earliest time of the next delivery attempt
+        last_error: Error of the last failed attempt
+        created_at: Timestamp when the message was queued
+        sent_at: Timestamp when the message was delivered
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        Index('idx_outbox_due', 'status', 'next_attempt_at'),  # Worker batch query
+    )
+    
+    id: int = db.Column(db.Integer, primary_key=True)
+    kind: str = db.Column(db.String(40), nullable=False)
+    recipient: str = db.Column(db.String(120), nullable=False)
+    subject: str = db.Column(db.String(255), nullable=False)
+    html: str = db.Column(db.Text, nullable=False)
+    alert_id: Optional[int] = db.Column(
+        db.Integer, db.ForeignKey('alert.id', ondelete='SET NULL'), index=True
+    )
+    status: str = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent, failed
+    attempts: int = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at: datetime = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error: Optional[str] = db.Column(db.Text)
+    created_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at: Optional[datetime] = db.Column(db.DateTime)
+
+    def __repr__(self) -> str:
+        """Return string representation of EmailOutbox."""
+        return f'<EmailOutbox {self.kind} to {self.recipient} ({self.status})>'
+
+
+class JobCheckpoint(db.Model):
+    """Progress of a resumable batch job over users.
+    
+    Batch jobs walk users in ID order and advance ``last_user_id`` in the
+    same transaction as each chunk's output, so a crashed or interrupted
+    run resumes after the last committed chunk without redoing it
+    (see services/checkpoint_service.py).
+    
+    Attributes:
+        name: Job run name, e.g. 'monthly-summary:2026-09'
+        last_user_id: Highest user ID fully processed (0 = not started)
+        processed: Users processed so far
+        started_at: Timestamp when the run started
+        updated_at: Timestamp of the last checkpoint
+        completed_at: Timestamp when the run finished (None while running)
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'job_checkpoint'
+    
+    name: str = db.Column(db.String(100), primary_key=True)
+    last_user_id: int = db.Column(db.Integer, nullable=False, default=0)
+    processed: int = db.Column(db.Integer, nullable=False, default=0)
+    started_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    completed_at: Optional[datetime] = db.Column(db.DateTime)
+
+    def __repr__(self) -> str:
+        """Return string representation of JobCheckpoint."""
+        return f'<JobCheckpoint {self.name} @ user {self.last_user_id}>'
+
+
+class SpendingForecast(db.Model):
+    """Stored next-month spending forecast of a user.
+    
+    Fitted in the background and keyed by the version of the series it was
+    fitted on - a hash of the user's completed monthly totals - so a lookup
+    only reuses it while those totals are unchanged
+    (see services/forecast_service.py).
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        series_version: Hash of the completed-month series that was fitted
+        month: Forecast month in YYYY-MM format
+        method: 'arima' or 'closed_form'
+        forecast: Forecast total for the month
+        lower_bound: Lower bound of the confidence interval
+        upper_bound: Upper bound of the confidence interval
+        confidence: Confidence level of the interval
+        history_months: Months of history the fit used
+        fit_ms: Time the fit took in milliseconds
+        fitted_at: Timestamp of the fit
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'spending_forecast'
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    series_version: str = db.Column(db.String(40), nullable=False)
+    month: str = db.Column(db.String(7), nullable=False)
+    method: str = db.Column(db.String(20), nullable=False)
+    forecast: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    lower_bound: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    upper_bound: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    confidence: float = db.Column(db.Float, nullable=False, default=0.95)
+    history_months: int = db.Column(db.Integer, nullable=False, default=0)
+    fit_ms: float = db.Column(db.Float, nullable=False, default=0.0)
+    fitted_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of SpendingForecast."""
+        return f'<SpendingForecast {self.user_id} {self.month}={self.forecast} ({self.method})>'
+
+
+class CategoryForecast(db.Model):
+    """Stored per-category spending forecast of a user for a month.
+    
+    Written in batches by the nightly category forecast job, which fits
+    every (user, category) series at once (see
+    services/category_forecast_service.py).
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        category: Expense category
+        month: Forecast month in YYYY-MM format
+        forecast: Forecast total of the category for the month
+        lower_bound: Lower bound of the 95% interval
+        upper_bound: Upper bound of the 95% interval
+        alpha: Fitted level smoothing parameter
+        beta: Fitted trend smoothing parameter
+        history_months: Months of history since the category's first spending
+        fitted_at: Timestamp of the batch that fitted it
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'category_forecast'
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    category: str = db.Column(db.String(50), primary_key=True)
+    month: str = db.Column(db.String(7), nullable=False)
+    forecast: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    lower_bound: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    upper_bound: Decimal = db.Column(db.Numeric(14, 2), nullable=False)
+    alpha: float = db.Column(db.Float, nullable=False)
+    beta: float = db.Column(db.Float, nullable=False)
+    history_months: int = db.Column(db.Integer, nullable=False, default=0)
+    fitted_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of CategoryForecast."""
+        return f'<CategoryForecast {self.user_id} {self.category} {self.month}={self.forecast}>'
+
+
+class AnomalyModel(db.Model):
+    """Stored anomaly model of a user's expenses in one category.
+    
+    Scored against at insert time and refitted only after enough new
+    expenses arrived (see services/anomaly_service.py). Category '*' holds
+    the model over all of the user's expenses.
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        category: Expense category, or '*' for all categories
+        samples: Expenses the model was fitted on
+        pending: Expenses added since the fit
+        log_median: Median of log(1 + amount)
+        log_mad: Median absolute deviation of log(1 + amount)
+        weekday_counts: Fitted expenses per weekday, Monday first ("3,0,...")
+        gap_median: Median days between expense dates (category models only)
+        last_date: Date of the latest expense
+        fit_ms: Time the fit took in milliseconds
+        fitted_at: Timestamp of the fit
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'anomaly_model'
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    category: str = db.Column(db.String(50), primary_key=True)
+    samples: int = db.Column(db.Integer, nullable=False, default=0)
+    pending: int = db.Column(db.Integer, nullable=False, default=0)
+    log_median: float = db.Column(db.Float, nullable=False, default=0.0)
+    log_mad: float = db.Column(db.Float, nullable=False, default=0.0)
+    weekday_counts: str = db.Column(db.String(80), nullable=False, default='0,0,0,0,0,0,0')
+    gap_median: Optional[float] = db.Column(db.Float)
+    last_date: Optional[date_type] = db.Column(db.Date)
+    fit_ms: float = db.Column(db.Float, nullable=False, default=0.0)
+    fitted_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of AnomalyModel."""
+        return f'<AnomalyModel {self.user_id} {self.category} n={self.samples}>'
+
+
+class SpendingBaseline(db.Model):
+    """Streaming spending statistics of a user's category.
+    
+    Updated in O(1) whenever an expense is added and used to flag unusual
+    expenses as they are written (see services/baseline_service.py).
+    Category '*' holds the statistics over all of the user's expenses.
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        category: Expense category, or '*' for all categories
+        count: Expenses absorbed
+        mean: EWMA mean of log(1 + amount)
+        variance: EWMA variance of log(1 + amount)
+        sketch: Quantile sketch as JSON {log bucket: count}
+        updated_at: Timestamp of the last update
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'spending_baseline'
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    category: str = db.Column(db.String(50), primary_key=True)
+    count: int = db.Column(db.Integer, nullable=False, default=0)
+    mean: float = db.Column(db.Float, nullable=False, default=0.0)
+    variance: float = db.Column(db.Float, nullable=False, default=0.0)
+    sketch: str = db.Column(db.Text, nullable=False, default='{}')
+    updated_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of SpendingBaseline."""
+        return f'<SpendingBaseline {self.user_id} {self.category} n={self.count}>'
+
+
+class ExpenseFlag(db.Model):
+    """Unusual-expense flag stored when the expense is written.
+    
+    Insights read these rows instead of rescanning recent expenses
+    (see services/baseline_service.py).
+    
+    Attributes:
+        expense_id: Foreign key reference to the flagged Expense
+        user_id: Foreign key reference to User
+        date: Expense date
+        category: Expense category
+        amount: Expense amount
+        zscore: Deviations above the category's running mean (log scale)
+        percentile: Share of the category's past amounts below this one
+        vs_typical: Amount over the category's typical amount
+        severity: 'medium' or 'high'
+        flagged_at: Timestamp of the flag
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'expense_flag'
+    __table_args__ = (
+        Index('idx_expense_flag_user_date', 'user_id', 'date'),
+    )
+    
+    expense_id: int = db.Column(db.Integer, db.ForeignKey('expense.id', ondelete='CASCADE'), primary_key=True)
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date: date_type = db.Column(db.Date, nullable=False)
+    category: str = db.Column(db.String(50), nullable=False)
+    amount: Decimal = db.Column(db.Numeric(12, 2), nullable=False)
+    zscore: float = db.Column(db.Float, nullable=False)
+    percentile: float = db.Column(db.Float, nullable=False)
+    vs_typical: float = db.Column(db.Float, nullable=False)
+    severity: str = db.Column(db.String(10), nullable=False, default='medium')
+    flagged_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of ExpenseFlag."""
+        return f'<ExpenseFlag {self.expense_id} {self.severity} z={self.zscore}>'
+
+
+class UserActivity(db.Model):
+    """Latest nightly activity scan result of a user.
+    
+    Written by the nightly scan (see services/activity_service.py) and read
+    as is by the web tier.
+    
+    Attributes:
+        user_id: Foreign key reference to User
+        day: Date of the scan
+        expense_count: Expenses in the last 30 days
+        spent: Spending in the last 30 days
+        spent_previous: Spending in the 30 days before
+        change_percent: Change of spending in percent (None without a previous period)
+        top_category: Category with the most spending in the last 30 days
+        top_share: Share of top_category in the last 30 days' spending (percent)
+        unusual_count: Unusual expenses in the last 30 days
+        unusual: Top unusual expenses as JSON list
+        insights: Insight messages as JSON list
+        scored_at: Timestamp of the scan
+    """
+    __allow_unmapped__ = True
+    __tablename__ = 'user_activity'
+    
+    user_id: int = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day: date_type = db.Column(db.Date, nullable=False)
+    expense_count: int = db.Column(db.Integer, nullable=False, default=0)
+    spent: Decimal = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    spent_previous: Decimal = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    change_percent: Optional[float] = db.Column(db.Float, nullable=True)
+    top_category: Optional[str] = db.Column(db.String(50), nullable=True)
+    top_share: float = db.Column(db.Float, nullable=False, default=0.0)
+    unusual_count: int = db.Column(db.Integer, nullable=False, default=0)
+    unusual: str = db.Column(db.Text, nullable=False, default='[]')
+    insights: str = db.Column(db.Text, nullable=False, default='[]')
+    scored_at: datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        """Return string representation of UserActivity."""
+        return f'<UserActivity {self.user_id} {self.day} unusual={self.unusual_count}>'
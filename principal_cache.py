@@ -0,0 +1,168 @@
+"""Authenticated-principal cache for JWT and Flask-Login requests.
+
+Every authenticated request used to start with a primary-key lookup of the
+user just to learn its id and role. The few columns request handling needs
+(id, username, role, token version, data version, creation time) are cached
+for ``PRINCIPAL_CACHE_TTL`` seconds in the shared Flask-Caching backend
+(see response_cache.py), so the common case skips the database and an
+eviction on one worker is seen by all of them when the backend is Redis.
+
+Entries are evicted after the commit of any transaction that
+    - modifies or deletes the User row (role change, password change, ...)
+    - bumps the user's data version (see services/version_service.py)
+so the cache never outlives a committed change by more than a lookup that
+raced with it, and never by more than the TTL.
+
+Example usage:
+    from principal_cache import load_principal
+
+    principal = load_principal(user_id)
+    if principal is None or principal.token_version != claims.get('tv', 0):
+        ...
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User
+from response_cache import cache
+from services.version_service import BUMPED_USERS_KEY
+
+# session.info key collecting users whose row changed in the current transaction
+STALE_USERS_KEY = 'stale_principal_ids'
+
+# Columns cached per principal, in Principal() argument order
+_PRINCIPAL_COLUMNS = (
+    User.id, User.username, User.role, User.token_version, User.data_version, User.created_at
+)
+
+
+class Principal(UserMixin):
+    """
+    Cached identity of an authenticated user.
+
+    Exposes the cached columns directly; any other User attribute (email,
+    relationships, ...) loads the full row on first access. Treat it as
+    read-only - load the User from the session to modify it.
+    """
+
+    def __init__(
+        self,
+        id: int,
+        username: str,
+        role: str,
+        token_version: int,
+        data_version: int,
+        created_at: Optional[datetime]
+    ):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.token_version = token_version or 0
+        self.data_version = data_version or 0
+        self.created_at = created_at
+        self._user = None
+
+    def __repr__(self) -> str:
+        """Return string representation of Principal."""
+        return f'<Principal {self.username} ({self.role})>'
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self.user
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+    def is_admin(self) -> bool:
+        """Check if the principal has the admin role."""
+        return self.role == 'admin'
+
+    @property
+    def user(self) -> Optional[User]:
+        """Full User row, loaded on first access."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+
+def principal_key(user_id: int) -> str:
+    """Return the cache key of a user's principal."""
+    return f"principal:{user_id}"
+
+
+def load_principal(user_id: int) -> Optional[Principal]:
+    """
+    Get a user's principal from the cache, loading it on a miss.
+
+    Args:
+        user_id: User ID (from a JWT or the Flask-Login session)
+
+    Returns:
+        Principal, or None if the user does not exist
+    """
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+    key = principal_key(user_id)
+
+    record = cache.get(key) if ttl > 0 else None
+    if record is None:
+        row = db.session.query(*_PRINCIPAL_COLUMNS).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        record = tuple(row)
+        if ttl > 0:
+            cache.set(key, record, timeout=ttl)
+
+    return Principal(*record)
+
+
+def invalidate_principals(user_ids: Iterable[int]) -> None:
+    """Evict the cached principals of the given users."""
+    keys = [principal_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache.delete_many(*keys)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    """Remember users whose row was modified or deleted in this flush."""
+    user_ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    user_ids.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and session.is_modified(obj)
+    )
+    if user_ids:
+        session.info.setdefault(STALE_USERS_KEY, set()).update(user_ids)
+
+
+def _after_commit(session: Session) -> None:
+    """Evict the principals changed by the committed transaction."""
+    user_ids = session.info.pop(STALE_USERS_KEY, set()) | session.info.pop(BUMPED_USERS_KEY, set())
+    if user_ids and has_app_context():
+        invalidate_principals(user_ids)
+
+
+def _after_rollback(session: Session) -> None:
+    """Forget pending evictions; the changes never happened."""
+    session.info.pop(STALE_USERS_KEY, None)
+    session.info.pop(BUMPED_USERS_KEY, None)
+
+
+def register_listeners() -> None:
+    """
+    Attach principal eviction to SQLAlchemy session commits.
+
+    Safe to call more than once (e.g. one call per app created in tests).
+    """
+    for name, listener in (
+        ('after_flush', _after_flush),
+        ('after_commit', _after_commit),
+        ('after_rollback', _after_rollback),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
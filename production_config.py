@@ -80,7 +80,15 @@ class Settings:
     PASSWORD_EXPIRY_DAYS = 90 if not DEBUG else 0  # No expiry in dev
     
     # Rate Limiting
-    RATELIMIT_STORAGE_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Shared Redis counters with a per-worker fast path (see rate_limit.py)
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        "local+" + os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    )
+    RATELIMIT_STORAGE_OPTIONS = {
+        "sync_interval": float(os.getenv("RATELIMIT_SYNC_INTERVAL", "1.0")),
+        "max_pending": int(os.getenv("RATELIMIT_MAX_PENDING", "5")),
+    }
     RATELIMIT_STRATEGY = "fixed-window"
     RATELIMIT_DEFAULT = "200 per day, 50 per hour"
     
@@ -1,7 +1,17 @@
 """Rate limiting configuration for Flask-Limiter.
 
-Provides centralized rate limiting rules for the application with
-memory-based storage (for development) and Redis (for production).
+Provides centralized rate limiting rules for the application. The storage
+backend comes from ``RATELIMIT_STORAGE_URI`` (see config.py):
+
+    - ``memory://``: per-process counters (development, tests)
+    - ``redis://host:6379/0``: counters shared by every worker
+    - ``local+redis://host:6379/0``: shared Redis counters with a per-worker
+      fast path (LocalFastPathStorage) - most checks are answered from
+      process memory and hits are flushed to Redis in small batches
+
+Authenticated requests are keyed by user (JWT subject or Flask-Login user),
+so users behind one NAT address get their own buckets; anonymous requests
+fall back to the client address.
 
 Example usage:
     from rate_limit import limiter
@@ -13,17 +23,210 @@ Example usage:
         ...
 """
 
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import jwt
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_limiter.errors import RateLimitExceeded
-from flask import jsonify
+from flask import current_app, jsonify, request
+from flask_login import current_user
+from limits.storage import Storage, storage_from_string
 import os
 
-# Initialize limiter with memory storage (use Redis in production)
+
+def _jwt_subject() -> Optional[str]:
+    """Return the user id from a valid Bearer token, or None."""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    try:
+        claims = jwt.decode(
+            auth_header[len('Bearer '):], current_app.config.get('JWT_SECRET'),
+            algorithms=['HS256']
+        )
+    except jwt.InvalidTokenError:
+        return None
+    subject = claims.get('sub', claims.get('user_id'))
+    return str(subject) if subject is not None else None
+
+
+def rate_limit_key() -> str:
+    """
+    Rate limit key for the current request.
+    
+    Returns:
+        "user:<id>" for a valid JWT or logged-in session user,
+        otherwise "ip:<remote address>"
+    """
+    user_id = _jwt_subject()
+    if user_id is None and current_user and current_user.is_authenticated:
+        user_id = current_user.get_id()
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address()}"
+
+
+class _Window:
+    """Per-worker view of one fixed-window counter."""
+    __slots__ = ('remote_count', 'pending', 'expires_at', 'synced_at')
+    
+    def __init__(self, remote_count: int, expires_at: float, synced_at: float):
+        self.remote_count = remote_count
+        self.pending = 0
+        self.expires_at = expires_at
+        self.synced_at = synced_at
+
+
+class LocalFastPathStorage(Storage):
+    """
+    Shared rate limit storage with a per-worker in-memory fast path.
+    
+    Wraps another ``limits`` storage (``local+redis://...`` wraps
+    ``redis://...``). The first hit on a key in a window goes to the shared
+    storage; later hits are counted locally on top of the last shared count
+    and flushed with one INCRBY once ``max_pending`` hits are buffered or
+    ``sync_interval`` seconds have passed. A limit may therefore be exceeded
+    by at most ``workers * (max_pending - 1)`` hits plus whatever other
+    workers buffered since the last sync.
+    
+    Expired windows and their locks are pruned at most once per
+    ``sync_interval``, so memory is bounded by the keys seen in the current
+    windows rather than every key ever seen.
+    
+    Only the fixed-window strategies are supported.
+    
+    Args:
+        uri: ``local+<shared storage uri>``
+        sync_interval: Max seconds between flushes of a key (default 1.0)
+        max_pending: Max locally buffered hits per key (default 5)
+        **options: Passed to the shared storage
+    """
+    
+    STORAGE_SCHEME = ['local+redis', 'local+rediss', 'local+redis+sentinel', 'local+memory']
+    
+    def __init__(self, uri: str, wrap_exceptions: bool = False,
+                 sync_interval: float = 1.0, max_pending: int = 5, **options):
+        self.shared = storage_from_string(uri.split('+', 1)[1], **options)
+        self.sync_interval = float(sync_interval)
+        self.max_pending = int(max_pending)
+        self._windows: Dict[str, _Window] = {}
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self._pruned_at = time.time()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+    
+    @property
+    def base_exceptions(self):
+        return self.shared.base_exceptions
+    
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[key]
+    
+    @contextmanager
+    def _locked(self, key: str):
+        """Hold the key's lock, retrying if it was pruned while we waited."""
+        while True:
+            lock = self._lock(key)
+            lock.acquire()
+            if self._locks.get(key) is lock:
+                break
+            lock.release()
+        try:
+            yield
+        finally:
+            lock.release()
+    
+    def _prune(self, now: float) -> None:
+        """Drop expired windows and the locks of keys without a live window.
+        
+        Locks held by another thread are skipped; a waiter on a pruned lock
+        notices in ``_locked`` and takes the key's new lock instead.
+        """
+        with self._locks_guard:
+            if now - self._pruned_at < self.sync_interval:
+                return
+            self._pruned_at = now
+            for key, lock in list(self._locks.items()):
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    window = self._windows.get(key)
+                    if window is None or window.expires_at <= now:
+                        self._windows.pop(key, None)
+                        del self._locks[key]
+                finally:
+                    lock.release()
+    
+    def _live_window(self, key: str, now: float) -> Optional[_Window]:
+        window = self._windows.get(key)
+        if window is not None and window.expires_at <= now:
+            del self._windows[key]
+            return None
+        return window
+    
+    def _flush(self, key: str, window: _Window, expiry: int, now: float) -> None:
+        window.remote_count = self.shared.incr(key, expiry, amount=window.pending)
+        window.pending = 0
+        window.synced_at = now
+    
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        """Count a hit, going to the shared storage only on window start or flush."""
+        now = time.time()
+        self._prune(now)
+        with self._locked(key):
+            window = self._live_window(key, now)
+            if window is None:
+                count = self.shared.incr(key, expiry, amount=amount)
+                window = _Window(count, self.shared.get_expiry(key), now)
+                self._windows[key] = window
+                return count
+            
+            window.pending += amount
+            if window.pending >= self.max_pending or now - window.synced_at >= self.sync_interval:
+                self._flush(key, window, expiry, now)
+            return window.remote_count + window.pending
+    
+    def get(self, key: str) -> int:
+        with self._locked(key):
+            window = self._live_window(key, time.time())
+            if window is not None:
+                return window.remote_count + window.pending
+        return self.shared.get(key)
+    
+    def get_expiry(self, key: str) -> float:
+        with self._locked(key):
+            window = self._live_window(key, time.time())
+            if window is not None:
+                return window.expires_at
+        return self.shared.get_expiry(key)
+    
+    def check(self) -> bool:
+        return self.shared.check()
+    
+    def reset(self) -> Optional[int]:
+        with self._locks_guard:
+            self._windows.clear()
+            self._locks.clear()
+        return self.shared.reset()
+    
+    def clear(self, key: str) -> None:
+        with self._locked(key):
+            self._windows.pop(key, None)
+            with self._locks_guard:
+                self._locks.pop(key, None)
+        self.shared.clear(key)
+
+
+# Storage comes from RATELIMIT_STORAGE_URI / RATELIMIT_STORAGE_OPTIONS (config.py)
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",  # Use Redis in production: "redis://localhost:6379"
 )
 
 # Rate limiting tiers:
@@ -52,11 +255,16 @@ def handle_rate_limit_error(e: RateLimitExceeded):
     Returns:
         JSON response with retry information
     """
-    return jsonify({
+    current = limiter.current_limit
+    retry_after = max(0, int(current.reset_at - time.time())) if current else None
+    response = jsonify({
         'error': 'Rate limit exceeded',
         'message': 'Too many requests. Please try again later.',
-        'retry_after': e.get_retry_after()
-    }), 429
+        'retry_after': retry_after
+    })
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response, 429
 
 
 __all__ = [
@@ -67,4 +275,6 @@ __all__ = [
     'TIER_API_READ',
     'TIER_PUBLIC',
     'handle_rate_limit_error',
+    'rate_limit_key',
+    'LocalFastPathStorage',
 ]
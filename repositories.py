@@ -8,10 +8,46 @@ from typing import List, Optional, Any, Dict, TypeVar, Generic
 from datetime import date, datetime
 from decimal import Decimal
 
-from models import db, User, Expense, Setting, Alert
+import logging
+
+from sqlalchemy import delete, select
+
+from models import (
+    db, User, Expense, Setting, Alert, SpendingRollup, DailySpending, SpendingForecast, CategoryForecast,
+    AnomalyModel, SpendingBaseline, ExpenseFlag, UserActivity, JobCheckpoint
+)
+from services.checkpoint_service import CheckpointService
+from services.rollup_service import RollupService
+from services.version_service import DataVersionService
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# Rows removed per DELETE statement when purging very large users
+DELETE_CHUNK_SIZE = 5000
+
+
+# Tables derived from a user's expenses, dropped with them
+DERIVED_TABLES = (
+    ExpenseFlag, SpendingRollup, DailySpending, SpendingForecast, CategoryForecast,
+    AnomalyModel, SpendingBaseline, UserActivity
+)
+
+
+def _delete_derived(user_id: int) -> None:
+    """Delete a user's derived rows (not committed)."""
+    for model in DERIVED_TABLES:
+        db.session.execute(delete(model).where(model.user_id == user_id))
+
+
+def _bump_if_deleted(user_id: int, count: int) -> int:
+    """Bump a user's data version after a set-based DELETE removed rows; returns count."""
+    if count:
+        DataVersionService.bump(db.session, [user_id])
+        db.session.commit()
+    return count
+
 
 class BaseRepository(Generic[T]):
     """Base repository class with common CRUD operations."""
@@ -54,6 +90,42 @@ class BaseRepository(Generic[T]):
         if instance:
             return self.delete(instance)
         return False
+    
+    def delete_where(self, *criteria, chunk_size: Optional[int] = None) -> int:
+        """
+        Delete matching rows with set-based DELETE statements.
+        
+        Rows are never loaded into the session. With chunk_size, rows are
+        removed in primary-key batches, committing after each one, so a
+        huge purge never holds one long transaction.
+        
+        Args:
+            *criteria: SQLAlchemy filter expressions
+            chunk_size: Maximum rows per DELETE (default: one statement)
+        
+        Returns:
+            Number of rows deleted
+        """
+        if not chunk_size:
+            result = db.session.execute(
+                delete(self.model).where(*criteria),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+            return result.rowcount
+        
+        pk = self.model.__mapper__.primary_key[0]
+        total = 0
+        while True:
+            batch = select(pk).where(*criteria).limit(chunk_size).scalar_subquery()
+            result = db.session.execute(
+                delete(self.model).where(pk.in_(batch)),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+            total += result.rowcount
+            if result.rowcount < chunk_size:
+                return total
 
 
 class UserRepository(BaseRepository[User]):
@@ -81,6 +153,66 @@ class UserRepository(BaseRepository[User]):
     def email_exists(self, email: str) -> bool:
         """Check if email exists."""
         return User.query.filter_by(email=email.lower()).first() is not None
+    
+    def delete_with_data(self, user_id: int, chunk_size: int = DELETE_CHUNK_SIZE) -> Dict[str, int]:
+        """
+        Delete a user and all their data without loading it into memory.
+        
+        Set-based DELETEs instead of ORM cascades, in two phases:
+        
+        1. A ``delete-user:<id>`` checkpoint is recorded, then expenses are
+           deleted in committed chunks (the only part big enough to need it).
+        2. Derived tables, settings, alerts and the user row are deleted in
+           one transaction that also completes the checkpoint.
+        
+        Both phases can be repeated, so calling this again (or
+        resume_deletions()) finishes a deletion that failed midway.
+        
+        Returns:
+            {"expenses": int, "settings": int, "alerts": int, "users": int}
+            for this call
+        """
+        checkpoint = CheckpointService.start(f'delete-user:{user_id}', restart=True)
+        db.session.execute(delete(ExpenseFlag).where(ExpenseFlag.user_id == user_id))
+        counts = {'expenses': expense_repo.delete_where(Expense.user_id == user_id, chunk_size=chunk_size)}
+        try:
+            _delete_derived(user_id)
+            for key, model in (('settings', Setting), ('alerts', Alert)):
+                counts[key] = db.session.execute(
+                    delete(model).where(model.user_id == user_id),
+                    execution_options={'synchronize_session': False}
+                ).rowcount
+            # Recorded in the same transaction as the DELETE, so the user's cached
+            # principal and responses are dropped when it commits
+            DataVersionService.bump(db.session, [user_id])
+            counts['users'] = db.session.execute(
+                delete(User).where(User.id == user_id),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            CheckpointService.advance(checkpoint, [user_id])
+            CheckpointService.complete(checkpoint)
+        except Exception:
+            db.session.rollback()
+            logger.error(f"Deleting user {user_id} stopped after its expenses; retry to finish")
+            raise
+        return counts
+    
+    def resume_deletions(self, chunk_size: int = DELETE_CHUNK_SIZE) -> List[int]:
+        """
+        Finish user deletions that failed midway.
+        
+        Returns:
+            IDs of the users whose deletion was finished
+        """
+        pending = [
+            checkpoint.name for checkpoint in JobCheckpoint.query.filter(
+                JobCheckpoint.name.like('delete-user:%'), JobCheckpoint.completed_at.is_(None)
+            )
+        ]
+        user_ids = [int(name.split(':', 1)[1]) for name in pending]
+        for user_id in user_ids:
+            self.delete_with_data(user_id, chunk_size=chunk_size)
+        return user_ids
 
 
 class ExpenseRepository(BaseRepository[Expense]):
@@ -128,9 +260,8 @@ class ExpenseRepository(BaseRepository[Expense]):
         ).order_by(Expense.date.desc()).all()
     
     def get_month_total(self, user_id: int, year: int, month: int) -> float:
-        """Get total spending for user in specific month."""
-        expenses = self.get_user_expenses_by_month(user_id, year, month)
-        return sum(float(e.amount) for e in expenses)
+        """Get total spending for user in specific month (served from rollups)."""
+        return float(RollupService.get_month_total(user_id, f"{year}-{month:02d}"))
     
     def get_today_total(self, user_id: int) -> float:
         """Get total spending for user today."""
@@ -149,29 +280,17 @@ class ExpenseRepository(BaseRepository[Expense]):
         return [r[0] for r in results]
     
     def get_category_breakdown(self, user_id: int, year: int, month: int) -> Dict[str, float]:
-        """Get spending breakdown by category for user in month."""
-        from sqlalchemy import func
-        
-        import calendar
-        last_day = calendar.monthrange(year, month)[1]
-        
-        results = db.session.query(
-            Expense.category,
-            func.sum(Expense.amount)
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.date >= date(year, month, 1),
-            Expense.date <= date(year, month, last_day)
-        ).group_by(Expense.category).all()
-        
-        return {category: float(amount) for category, amount in results}
-    
-    def delete_user_expenses(self, user_id: int) -> int:
-        """Delete all expenses for a user."""
-        expenses = Expense.query.filter_by(user_id=user_id).all()
-        count = len(expenses)
-        for expense in expenses:
-            db.session.delete(expense)
+        """Get spending breakdown by category for user in month (served from rollups)."""
+        month_str = f"{year}-{month:02d}"
+        totals = RollupService.get_category_totals(user_id, month_str, month_str)
+        return {category: float(amount) for category, (amount, count) in totals.items()}
+    
+    def delete_user_expenses(self, user_id: int, chunk_size: int = DELETE_CHUNK_SIZE) -> int:
+        """Delete all expenses for a user in chunks, then drop the tables derived from them."""
+        db.session.execute(delete(ExpenseFlag).where(ExpenseFlag.user_id == user_id))
+        count = self.delete_where(Expense.user_id == user_id, chunk_size=chunk_size)
+        _delete_derived(user_id)
+        DataVersionService.bump(db.session, [user_id])
         db.session.commit()
         return count
 
@@ -205,12 +324,7 @@ class SettingRepository(BaseRepository[Setting]):
     
     def delete_user_settings(self, user_id: int) -> int:
         """Delete all settings for user."""
-        settings = self.get_user_settings(user_id)
-        count = len(settings)
-        for setting in settings:
-            db.session.delete(setting)
-        db.session.commit()
-        return count
+        return _bump_if_deleted(user_id, self.delete_where(Setting.user_id == user_id))
 
 
 class AlertRepository(BaseRepository[Alert]):
@@ -245,21 +359,13 @@ class AlertRepository(BaseRepository[Alert]):
     
     def delete_monthly_alerts(self, user_id: int, month: str) -> int:
         """Delete all alerts for user in month."""
-        alerts = self.get_monthly_alerts(user_id, month)
-        count = len(alerts)
-        for alert in alerts:
-            db.session.delete(alert)
-        db.session.commit()
-        return count
+        return _bump_if_deleted(
+            user_id, self.delete_where(Alert.user_id == user_id, Alert.triggered_month == month)
+        )
     
     def delete_user_alerts(self, user_id: int) -> int:
         """Delete all alerts for user."""
-        alerts = self.get_user_alerts(user_id)
-        count = len(alerts)
-        for alert in alerts:
-            db.session.delete(alert)
-        db.session.commit()
-        return count
+        return _bump_if_deleted(user_id, self.delete_where(Alert.user_id == user_id))
 
 
 # Factory/Singleton instances for use in services
@@ -0,0 +1,189 @@
+"""Versioned response cache for analytics and insights endpoints.
+
+Cached JSON responses are keyed by (endpoint, user, user data version, date,
+query parameters). The version part comes from ``User.data_version`` (see
+services/version_service.py), which every expense/setting/alert write
+bumps, so a write makes the user's old entries unreachable without scanning
+or deleting keys; they simply age out through TTL/LRU eviction.
+
+The backend is Flask-Caching's, selected with ``CACHE_TYPE``:
+    - ``response_cache.LRUCache`` (default): in-process LRU with TTL, bounded
+      by ``CACHE_THRESHOLD`` entries
+    - ``RedisCache``: shared across workers, configured with
+      ``CACHE_REDIS_URL`` (falls back to ``REDIS_URL``)
+    - ``NullCache``: disable caching
+
+Example usage:
+    from response_cache import cached_response
+
+    @api_bp.route('/analytics/stats', methods=['GET'])
+    @token_required
+    @cached_response
+    def api_stats():
+        ...
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response, current_app, make_response, request
+from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+from flask_login import current_user
+
+from services.version_service import DataVersionService
+
+cache = Cache()
+
+_counter_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'stores': 0}
+
+
+class LRUCache(BaseCache):
+    """
+    Thread-safe in-process LRU cache with per-entry TTL.
+
+    Flask-Caching's SimpleCache prunes arbitrary entries when full; this
+    backend evicts the least recently used entry instead, so hot users'
+    dashboards stay cached under memory pressure.
+
+    Args:
+        threshold: Maximum number of entries (CACHE_THRESHOLD)
+        default_timeout: Default TTL in seconds, 0 = no expiry (CACHE_DEFAULT_TIMEOUT)
+    """
+
+    def __init__(self, threshold: int = 500, default_timeout: int = 300):
+        super().__init__(default_timeout)
+        self._threshold = threshold
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """Build the backend from Flask-Caching config (CACHE_TYPE = 'response_cache.LRUCache')."""
+        kwargs.update(threshold=config['CACHE_THRESHOLD'])
+        return cls(*args, **kwargs)
+
+    def _expires_at(self, timeout: Optional[int]) -> float:
+        timeout = self._normalize_timeout(timeout)
+        return time.monotonic() + timeout if timeout > 0 else float('inf')
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        with self._lock:
+            self._entries[key] = (self._expires_at(timeout), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._threshold:
+                self._entries.popitem(last=False)
+        return True
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def has(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _count(name: str) -> None:
+    with _counter_lock:
+        _counters[name] += 1
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Get response cache counters for this process.
+
+    Returns:
+        {"backend": str, "hits": int, "misses": int, "stores": int, "hit_ratio": float}
+    """
+    with _counter_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_ratio'] = round(counters['hits'] / lookups, 3) if lookups else 0.0
+    counters['backend'] = current_app.config.get('CACHE_TYPE')
+    return counters
+
+
+def reset_cache_stats() -> None:
+    """Reset the hit/miss counters (e.g. between benchmark runs)."""
+    with _counter_lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def response_cache_key(user) -> str:
+    """
+    Build the cache key for the current request and user.
+
+    Args:
+        user: Authenticated User (its data_version is already loaded)
+
+    Returns:
+        Key of the form
+        "resp:<endpoint>:<user/version/date>:<account epoch>:<sorted query string>"
+        where the account creation time keeps a recycled user ID from
+        hitting a deleted account's entries
+    """
+    params = '&'.join(
+        f"{name}={value}"
+        for name, values in sorted(request.args.lists())
+        for value in values
+    )
+    version = DataVersionService.etag(user.id, user.data_version)
+    epoch = user.created_at.timestamp() if user.created_at else 0
+    return f"resp:{request.endpoint}:{version}:{epoch}:{params}"
+
+
+def cached_response(f: Callable) -> Callable:
+    """
+    Decorator caching a view's 200 JSON response per user data version.
+
+    Apply below the auth decorator (``@token_required`` or
+    ``@login_required``) so the user is known before the lookup.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user = getattr(request, 'current_user', None) or current_user
+        key = response_cache_key(user)
+
+        cached = cache.get(key)
+        if cached is not None:
+            _count('hits')
+            body, mimetype = cached
+            return Response(body, status=200, mimetype=mimetype)
+
+        _count('misses')
+        response = make_response(f(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            cache.set(key, (response.get_data(), response.mimetype))
+            _count('stores')
+        return response
+
+    return decorated
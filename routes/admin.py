@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from functools import wraps
 from models import db, User, Expense
+from repositories import user_repo
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -82,10 +83,9 @@ def delete_user(user_id):
     
     user = User.query.get_or_404(user_id)
     username = user.username
-    db.session.delete(user)
-    db.session.commit()
+    deleted = user_repo.delete_with_data(user.id)
     
-    flash(f'User {username} deleted', 'info')
+    flash(f'User {username} deleted ({deleted["expenses"]} expenses removed)', 'info')
     return redirect(url_for('admin.users'))
 
 
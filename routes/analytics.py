@@ -1,14 +1,20 @@
 """Analytics routes for expense insights."""
+from datetime import datetime
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from analytics_service import (
     get_monthly_trends, get_category_breakdown, get_spending_statistics,
-    get_month_comparison, get_daily_breakdown, get_highest_spending_categories
+    get_month_comparison, get_daily_breakdown, get_highest_spending_categories,
+    MAX_TREND_MONTHS
 )
 from insights_service import (
     generate_ai_insights, get_quick_stats, get_week_over_week_comparison,
-    get_spending_anomalies, get_category_insights, get_spending_forecast
+    get_spending_anomalies, get_category_insights, get_spending_forecast,
+    get_category_forecasts, get_activity_scan, get_insights
 )
+from services.daily_index_service import DailyIndexService
+from http_cache import etag_cached
+from response_cache import cached_response
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
@@ -39,16 +45,20 @@ def index():
 
 @analytics_bp.route('/api/trends')
 @login_required
+@etag_cached
+@cached_response
 def api_trends():
     """Get monthly spending trends."""
     months = request.args.get('months', 6, type=int)
-    months = min(max(months, 1), 12)
+    months = min(max(months, 1), MAX_TREND_MONTHS)
     data = get_monthly_trends(current_user.id, months)
     return jsonify(data)
 
 
 @analytics_bp.route('/api/categories')
 @login_required
+@etag_cached
+@cached_response
 def api_categories():
     """Get category breakdown."""
     data = get_category_breakdown(current_user.id)
@@ -57,6 +67,8 @@ def api_categories():
 
 @analytics_bp.route('/api/daily')
 @login_required
+@etag_cached
+@cached_response
 def api_daily():
     """Get daily breakdown."""
     data = get_daily_breakdown(current_user.id)
@@ -65,6 +77,8 @@ def api_daily():
 
 @analytics_bp.route('/api/stats')
 @login_required
+@etag_cached
+@cached_response
 def api_stats():
     """Get spending statistics."""
     months = request.args.get('months', 1, type=int)
@@ -74,42 +88,71 @@ def api_stats():
 
 @analytics_bp.route('/api/comparison')
 @login_required
+@etag_cached
+@cached_response
 def api_comparison():
     """Get month-over-month comparison."""
     comparison = get_month_comparison(current_user.id)
     return jsonify(comparison)
 
 
+@analytics_bp.route('/api/heatmap')
+@login_required
+@etag_cached
+@cached_response
+def api_heatmap():
+    """Get calendar heatmap data (daily totals) for up to a year."""
+    end = request.args.get('end')
+    try:
+        end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        return jsonify({'error': 'end must be in YYYY-MM-DD format'}), 400
+    
+    days = request.args.get('days', 365, type=int)
+    return jsonify(DailyIndexService.heatmap(current_user.id, end_date, days))
+
+
 # ============ AI INSIGHTS ENDPOINTS ============
 
 @analytics_bp.route('/insights')
 @login_required
 def insights():
     """Display AI insights dashboard."""
-    ai_insights = generate_ai_insights(current_user.id)
+    data = get_insights(current_user.id)
     quick_stats = get_quick_stats(current_user.id)
-    category_data = get_category_insights(current_user.id)
-    forecast = get_spending_forecast(current_user.id)
     
     return render_template(
         'insights.html',
-        insights=ai_insights,
+        insights=data['insights'],
         stats=quick_stats,
-        categories=category_data,
-        forecast=forecast
+        categories=data['categories'],
+        forecast=data['forecast']
     )
 
 
 @analytics_bp.route('/api/insights')
 @login_required
+@etag_cached
+@cached_response
 def api_insights():
     """Get AI-powered insights."""
     insights = generate_ai_insights(current_user.id)
     return jsonify(insights)
 
 
+@analytics_bp.route('/api/insights/all')
+@login_required
+@etag_cached
+@cached_response
+def api_insights_all():
+    """Get every insight (messages, week comparison, anomalies, categories, forecast) at once."""
+    return jsonify(get_insights(current_user.id))
+
+
 @analytics_bp.route('/api/insights/quick-stats')
 @login_required
+@etag_cached
+@cached_response
 def api_quick_stats():
     """Get quick statistics."""
     stats = get_quick_stats(current_user.id)
@@ -118,6 +161,8 @@ def api_quick_stats():
 
 @analytics_bp.route('/api/insights/week-comparison')
 @login_required
+@etag_cached
+@cached_response
 def api_week_comparison():
     """Get week-over-week comparison."""
     data = get_week_over_week_comparison(current_user.id)
@@ -126,6 +171,8 @@ def api_week_comparison():
 
 @analytics_bp.route('/api/insights/anomalies')
 @login_required
+@etag_cached
+@cached_response
 def api_anomalies():
     """Get spending anomalies."""
     anomalies = get_spending_anomalies(current_user.id)
@@ -134,6 +181,8 @@ def api_anomalies():
 
 @analytics_bp.route('/api/insights/categories')
 @login_required
+@etag_cached
+@cached_response
 def api_categories_insights():
     """Get category insights."""
     data = get_category_insights(current_user.id)
@@ -142,8 +191,28 @@ def api_categories_insights():
 
 @analytics_bp.route('/api/insights/forecast')
 @login_required
+@etag_cached
+@cached_response
 def api_forecast():
     """Get spending forecast."""
     forecast = get_spending_forecast(current_user.id)
     return jsonify(forecast)
 
+
+@analytics_bp.route('/api/insights/category-forecast')
+@login_required
+@etag_cached
+@cached_response
+def api_category_forecast():
+    """Get this month's per-category spending forecast."""
+    return jsonify(get_category_forecasts(current_user.id))
+
+
+@analytics_bp.route('/api/insights/activity')
+@login_required
+@etag_cached
+@cached_response
+def api_activity_scan():
+    """Get the nightly unusual-activity scan result."""
+    return jsonify(get_activity_scan(current_user.id))
+
@@ -1,20 +1,24 @@
 """Dashboard and expense management routes."""
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from datetime import datetime, date
-from decimal import Decimal
+from datetime import datetime
 from sqlalchemy import func
-import csv
-import io
 from models import db, Expense, Setting
 from utils import (
     parse_month, calculate_month_total, get_setting, set_setting,
-    calculate_category_spending, check_budget_and_create_alerts
+    check_budget_and_create_alerts, check_unusual_expense,
+    get_active_alerts
 )
 from analytics_service import (
     get_monthly_trends, get_category_breakdown, get_spending_statistics,
     get_month_comparison, get_daily_breakdown
 )
+from insights_service import get_spending_anomalies
+from services.expense_service import ExpenseService
+from services.dashboard_service import DashboardSnapshot
+
+# Expenses shown per dashboard page
+DASHBOARD_PAGE_SIZE = 10
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/')
 
@@ -28,69 +32,71 @@ def index():
     category = request.args.get('category', 'all')
     month = request.args.get('month')
 
-    q = Expense.query.filter_by(user_id=current_user.id)
-
-    if month:
-        first, last = parse_month(month)
-        if first and last:
-            q = q.filter(Expense.date >= first, Expense.date <= last)
+    cursor = request.args.get('cursor') or None
 
+    df = dt = None
     if date_from:
         try:
             df = datetime.strptime(date_from, '%Y-%m-%d').date()
-            q = q.filter(Expense.date >= df)
         except ValueError:
             pass
 
     if date_to:
         try:
             dt = datetime.strptime(date_to, '%Y-%m-%d').date()
-            q = q.filter(Expense.date <= dt)
         except ValueError:
             pass
 
-    if category and category.lower() != 'all':
-        q = q.filter_by(category=category)
+    # Invalid month strings are ignored, as before
+    valid_month = month if month and parse_month(month)[0] else None
 
-    items = q.order_by(Expense.date.desc()).all()
-    
-    # Calculate totals - use Decimal(0) as start value to ensure type consistency
-    total = sum((e.amount for e in items), Decimal(0))
+    q = ExpenseService.filtered_query(
+        current_user.id,
+        date_from=df,
+        date_to=dt,
+        category=category,
+        month=valid_month
+    )
+
+    try:
+        items, next_cursor = ExpenseService.paginate_query(q, cursor, DASHBOARD_PAGE_SIZE)
+    except ValueError:
+        flash('Invalid page cursor', 'warning')
+        items, next_cursor = ExpenseService.paginate_query(q, None, DASHBOARD_PAGE_SIZE)
     
-    # Calculate today's spending
-    today_spending = sum((e.amount for e in items if e.date == date.today()), Decimal(0))
+    # Totals for the whole filtered set come from one GROUP BY, not the page
+    summary = ExpenseService.summarize_query(q)
     
-    category_spending = calculate_category_spending(items)
-    category_labels = list(category_spending.keys())
-    # Convert Decimal values to float for JSON serialization in templates
-    category_values = [float(v) for v in category_spending.values()]
-    # Also convert category_spending dict itself for template use
-    category_spending_float = {k: float(v) for k, v in category_spending.items()}
+    # Headline numbers (today, month, budget, categories, alerts) in two queries
+    snapshot = DashboardSnapshot.load(current_user.id)
     
-    month_total = calculate_month_total(current_user.id)
-    budget = get_setting('monthly_budget')
-    budget_value = float(budget) if budget else 0
-    remaining_budget = budget_value - float(month_total) if budget_value else None
+    # The chart follows the active filters, like the totals above
+    category_spending_float = summary['by_category']
+    category_labels = list(category_spending_float.keys())
+    category_values = list(category_spending_float.values())
     
-    # Get all categories for filter dropdown
-    all_expenses = Expense.query.filter_by(user_id=current_user.id).all()
-    all_categories = sorted(set(e.category for e in all_expenses if e.category))
+    active_alerts = get_active_alerts(current_user.id) if snapshot['unread_alerts'] else []
     
-    active_alerts = current_user.alerts
+    # Flags stored at write time; one indexed read, no rescoring
+    anomalies = get_spending_anomalies(current_user.id)
 
     return render_template(
         'index.html',
         expenses=items,
-        total_spent=float(total),
-        today_total=float(today_spending),
+        expense_count=summary['count'],
+        next_cursor=next_cursor,
+        cursor=cursor,
+        total_spent=summary['total'],
+        today_total=snapshot['today_total'],
         category_spending=category_spending_float,
         category_labels=category_labels,
         category_values=category_values,
-        month_total=month_total,
-        budget=budget_value,
-        remaining_budget=remaining_budget,
+        month_total=snapshot['month_total'],
+        budget=snapshot['budget'],
+        remaining_budget=snapshot['remaining_budget'],
         alerts=active_alerts,
-        all_categories=all_categories,
+        anomalies=anomalies,
+        all_categories=snapshot['categories'],
         filters={
             'date_from': date_from,
             'date_to': date_to,
@@ -140,6 +146,9 @@ def add():
             if alert:
                 severity_class = 'danger' if alert.severity == 'danger' else 'warning'
                 flash(f'{alert.title}: {alert.message}', severity_class)
+            unusual = check_unusual_expense(expense)
+            if unusual:
+                flash(f'{unusual.title}: {unusual.message}', 'warning')
             
             flash('Expense added successfully', 'success')
             return redirect(url_for('dashboard.index'))
@@ -230,55 +239,62 @@ def delete(id):
 @dashboard_bp.route('/export')
 @login_required
 def export():
-    """Export expenses to CSV file."""
+    """Export expenses to a CSV (default), Parquet or Arrow file."""
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
     category = request.args.get('category')
     month = request.args.get('month')
 
-    q = Expense.query.filter_by(user_id=current_user.id)
+    filters = {'category': category}
 
     if month:
         first, last = parse_month(month)
         if first and last:
-            q = q.filter(Expense.date >= first, Expense.date <= last)
+            filters['month'] = month
 
     if date_from:
         try:
-            df = datetime.strptime(date_from, '%Y-%m-%d').date()
-            q = q.filter(Expense.date >= df)
+            filters['date_from'] = datetime.strptime(date_from, '%Y-%m-%d').date()
         except ValueError:
             pass
 
     if date_to:
         try:
-            dt = datetime.strptime(date_to, '%Y-%m-%d').date()
-            q = q.filter(Expense.date <= dt)
+            filters['date_to'] = datetime.strptime(date_to, '%Y-%m-%d').date()
         except ValueError:
             pass
 
-    if category and category.lower() != 'all':
-        q = q.filter_by(category=category)
+    try:
+        stream, mimetype, filename = ExpenseService.export_stream(
+            current_user.id, filters, request.args.get('format', 'csv')
+        )
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('dashboard.index'))
+
+    resp = Response(stream_with_context(stream), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return resp
 
-    items = q.order_by(Expense.date.desc()).all()
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['id', 'date', 'title', 'category', 'amount', 'description'])
+@dashboard_bp.route('/import', methods=['POST'])
+@login_required
+def import_expenses():
+    """Bulk import expenses from an uploaded Parquet or Arrow file."""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a Parquet or Arrow file to import', 'warning')
+        return redirect(url_for('dashboard.index'))
 
-    for item in items:
-        writer.writerow([
-            item.id,
-            item.date.isoformat(),
-            item.title,
-            item.category,
-            f"{item.amount:.2f}",
-            item.description or ''
-        ])
+    try:
+        result = ExpenseService.import_columnar(current_user.id, upload.stream)
+        flash(result['message'], 'success')
+    except ValueError as e:
+        flash(str(e), 'danger')
+    except Exception as e:
+        flash(f'Import error: {str(e)}', 'danger')
 
-    resp = Response(output.getvalue(), mimetype='text/csv')
-    resp.headers["Content-Disposition"] = "attachment; filename=expenses.csv"
-    return resp
+    return redirect(url_for('dashboard.index'))
 
 
 @dashboard_bp.route('/settings', methods=['GET', 'POST'])
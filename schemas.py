@@ -1,10 +1,10 @@
 """Pydantic schemas for data validation and serialization."""
 
-from typing import Optional, List
-from datetime import datetime, date
+from typing import Optional, List, Dict, Any
+from datetime import datetime, date as date_type
 from enum import Enum
 from decimal import Decimal
-from pydantic import BaseModel, Field, EmailStr, field_validator, ConfigDict
+from pydantic import BaseModel, Field, EmailStr, field_validator, ConfigDict, condecimal
 import re
 
 
@@ -41,7 +41,7 @@ class ExpenseCreate(BaseModel):
     amount: Decimal = Field(..., gt=0, max_digits=12, decimal_places=2, description="Expense amount")
     category: ExpenseCategory = Field(..., description="Expense category")
     description: Optional[str] = Field(None, max_length=500, description="Optional description")
-    date: Optional[date] = Field(default_factory=date.today, description="Expense date")
+    date: Optional[date_type] = Field(default_factory=date_type.today, description="Expense date")
     receipt_url: Optional[str] = Field(None, max_length=500, description="Receipt file path")
     
     @field_validator('title')
@@ -94,10 +94,10 @@ class ExpenseUpdate(BaseModel):
     """Schema for updating an expense."""
     
     title: Optional[str] = Field(None, min_length=1, max_length=200)
-    amount: Optional[Decimal] = Field(None, gt=0, max_digits=12, decimal_places=2)
+    amount: Optional[condecimal(gt=0, max_digits=12, decimal_places=2)] = None
     category: Optional[ExpenseCategory] = None
     description: Optional[str] = Field(None, max_length=500)
-    date: Optional[date] = None
+    date: Optional[date_type] = None
     
     @field_validator('amount', mode='before')
     @classmethod
@@ -128,7 +128,7 @@ class ExpenseResponse(BaseModel):
     amount: Decimal
     category: str
     description: Optional[str]
-    date: date
+    date: date_type
     user_id: int
     created_at: datetime
     
@@ -296,10 +296,21 @@ class AlertResponse(BaseModel):
 # Batch Validation
 # ============================================================================
 
+class BatchExpenseItem(ExpenseCreate):
+    """Schema for one expense of a batch.
+    
+    Categories follow POST /api/expenses and the web form: any non-empty
+    string, stored as submitted, so batched and single expenses share the
+    same category rows.
+    """
+    
+    category: str = Field(..., min_length=1, max_length=50, description="Expense category")
+
+
 class BatchExpenseCreate(BaseModel):
     """Schema for creating multiple expenses."""
     
-    expenses: List[ExpenseCreate] = Field(..., min_items=1, max_items=100)
+    expenses: List[BatchExpenseItem] = Field(..., min_items=1, max_items=100)
     
     class Config:
         json_schema_extra = {
@@ -345,40 +356,38 @@ class ErrorResponse(BaseModel):
 # ============================================================================
 
 class PaginationParams(BaseModel):
-    """Schema for pagination parameters."""
+    """Schema for keyset (cursor) pagination parameters."""
     
-    page: int = Field(default=1, ge=1, description="Page number")
-    per_page: int = Field(default=20, ge=1, le=100, description="Items per page")
+    cursor: Optional[str] = Field(None, max_length=200, description="Opaque cursor from the previous page")
+    limit: int = Field(default=50, ge=1, le=100, description="Items per page")
     
-    @field_validator('per_page')
+    @field_validator('limit', mode='before')
     @classmethod
-    def validate_per_page(cls, v: int) -> int:
-        """Ensure per_page is reasonable."""
+    def validate_limit(cls, v) -> int:
+        """Clamp limit to a reasonable page size."""
+        if v is None:
+            return 50
+        v = int(v)
         if v > 100:
             return 100
         if v < 1:
-            return 20
+            return 50
         return v
 
 
 class PaginatedResponse(BaseModel):
-    """Schema for paginated responses."""
+    """Schema for cursor-paginated expense listings."""
     
-    items: List[ExpenseResponse] = Field(..., description="Items in this page")
-    total: int = Field(..., ge=0, description="Total items")
-    page: int = Field(..., ge=1, description="Current page")
-    per_page: int = Field(..., ge=1, description="Items per page")
-    pages: int = Field(..., ge=0, description="Total pages")
+    items: List[Dict[str, Any]] = Field(..., description="Expenses in this page")
+    count: int = Field(..., ge=0, description="Total expenses matching the filters")
+    total_amount: float = Field(..., ge=0, description="Sum of amounts matching the filters")
+    limit: int = Field(..., ge=1, description="Items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
     
     @property
     def has_next(self) -> bool:
         """Check if there's a next page."""
-        return self.page < self.pages
-    
-    @property
-    def has_prev(self) -> bool:
-        """Check if there's a previous page."""
-        return self.page > 1
+        return self.next_cursor is not None
 
 
 # ============================================================================
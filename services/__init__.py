@@ -7,14 +7,48 @@ Services exported:
 - AuthService: User authentication and account management
 - ExpenseService: Expense CRUD and filtering
 - BudgetService: Budget tracking and alerts
+- DashboardSnapshot: Dashboard headline numbers in two queries
+- StatsService: Spending/quick statistics in one aggregate query each
+- PasswordService: Password hashing on a bounded pool with a work factor policy
+- MonthlySummaryService: Month-end summary numbers for a range of users
+- CheckpointService: Resumable, chunked batch jobs over all users
+- ForecastService: Stored next-month spending forecasts with background fits
+- CategoryForecastService: Batch per-category forecasts fitted as array operations
+- AnomalyService: Persisted per-user anomaly models scored at insert time
+- BaselineService: Streaming per-category baselines and stored unusual-expense flags
+- ActivityScanService: Nightly cross-user activity scoring on a process pool
 """
 
 from services.auth_service import AuthService
 from services.expense_service import ExpenseService
 from services.budget_service import BudgetService
+from services.dashboard_service import DashboardSnapshot
+from services.stats_service import StatsService, SpendingStats, QuickStats
+from services.password_service import PasswordService, HashingBusyError
+from services.summary_service import MonthlySummaryService, MonthlySummary
+from services.checkpoint_service import CheckpointService
+from services.forecast_service import ForecastService
+from services.category_forecast_service import CategoryForecastService
+from services.anomaly_service import AnomalyService
+from services.baseline_service import BaselineService
+from services.activity_service import ActivityScanService
 
 __all__ = [
     'AuthService',
     'ExpenseService',
     'BudgetService',
+    'DashboardSnapshot',
+    'StatsService',
+    'SpendingStats',
+    'QuickStats',
+    'PasswordService',
+    'HashingBusyError',
+    'MonthlySummaryService',
+    'MonthlySummary',
+    'CheckpointService',
+    'ForecastService',
+    'CategoryForecastService',
+    'AnomalyService',
+    'BaselineService',
+    'ActivityScanService',
 ]
@@ -0,0 +1,339 @@
+"""ActivityScanService - nightly cross-user unusual-activity scoring.
+
+Scores every user with expenses in the last ACTIVITY_WINDOW_DAYS and stores
+the result in ``user_activity``, which the web tier reads as is. The run is
+split between the parent process and a process pool:
+
+    - the parent walks users in checkpointed ID chunks and loads each
+      chunk's expenses with one query straight into columnar NumPy arrays
+      (user, expense id, day, category code, amount) - no ORM objects or
+      per-expense dicts
+    - chunks are scored on a ProcessPoolExecutor: per-user and
+      per-(user, category) statistics are computed with grouped array
+      operations, so a chunk costs a handful of passes over its columns
+    - the parent writes each chunk's rows and advances the checkpoint in
+      one transaction, in chunk order, while the next chunks are scored
+
+Loading, scoring and writing overlap, and scoring - the CPU-bound part -
+scales with the number of worker processes. An interrupted run resumes
+after its last written chunk.
+
+An expense of the last RECENT_DAYS is unusual when its log amount is at
+least Z_THRESHOLD deviations above the mean of the user's other expenses
+in the category over the window (MIN_GROUP of them at least).
+
+Methods:
+    load_chunk() - Load a user ID range's expenses as columns
+    run() - Score every active user and store the results
+    get_activity() - A user's stored activity result
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from models import db, Expense, UserActivity
+from services.version_service import DataVersionService
+
+logger = logging.getLogger(__name__)
+
+# Days of expenses a user's statistics are computed over
+ACTIVITY_WINDOW_DAYS = 90
+# Days scanned for unusual expenses and compared with the period before
+RECENT_DAYS = 30
+# Other expenses of a category needed before one of them can be unusual
+MIN_GROUP = 5
+# Deviations (log amounts) above the category mean that make an expense unusual
+Z_THRESHOLD = 3.0
+HIGH_Z_THRESHOLD = 5.0
+# Lower bound of the log-amount deviation (about 10%)
+MIN_DEVIATION = 0.1
+# Spending change (percent) and category share (percent) worth an insight
+CHANGE_PERCENT = 25.0
+CATEGORY_SHARE_PERCENT = 40.0
+# Unusual expenses kept per user
+TOP_UNUSUAL = 3
+# Users per checkpointed chunk
+BATCH_SIZE = 2000
+
+
+class Columns(NamedTuple):
+    """A chunk of expenses as parallel arrays, sorted by user."""
+    user_id: np.ndarray
+    expense_id: np.ndarray
+    day: np.ndarray
+    category: np.ndarray
+    amount: np.ndarray
+    categories: List[str]
+
+
+def score_chunk(columns: Columns, today: int) -> List[Dict[str, Any]]:
+    """
+    Score a chunk of users (runs in the worker processes).
+
+    Args:
+        columns: Chunk loaded by load_chunk()
+        today: Run date as a proleptic ordinal (date.toordinal())
+
+    Returns:
+        One user_activity row dict per user in the chunk
+    """
+    if not len(columns.user_id):
+        return []
+
+    users, user_index = np.unique(columns.user_id, return_inverse=True)
+    count = len(users)
+    amount = columns.amount
+    recent = columns.day > today - RECENT_DAYS
+    previous = ~recent & (columns.day > today - 2 * RECENT_DAYS)
+
+    spend_recent = np.bincount(user_index, weights=amount * recent, minlength=count)
+    spend_previous = np.bincount(user_index, weights=amount * previous, minlength=count)
+    expenses_recent = np.bincount(user_index, weights=recent, minlength=count).astype(int)
+
+    # Per (user, category) log-amount moments; each expense is compared with
+    # the others of its group (leave-one-out), so it cannot mask itself
+    _, group = np.unique(user_index * len(columns.categories) + columns.category, return_inverse=True)
+    logs = np.log1p(amount)
+    size = np.bincount(group)
+    total = np.bincount(group, weights=logs)
+    squares = np.bincount(group, weights=logs * logs)
+    others = size[group] - 1
+    safe = np.maximum(others, 1)
+    mean = (total[group] - logs) / safe
+    variance = np.maximum((squares[group] - logs * logs) / safe - mean * mean, 0.0)
+    zscore = (logs - mean) / np.maximum(np.sqrt(variance), MIN_DEVIATION)
+    unusual = recent & (others >= MIN_GROUP) & (zscore >= Z_THRESHOLD)
+    unusual_count = np.bincount(user_index, weights=unusual, minlength=count).astype(int)
+
+    # Top category of the recent period: groups sorted by user, then spend
+    group_spend = np.bincount(group, weights=amount * recent)
+    group_user = np.zeros(len(size), dtype=int)
+    group_user[group] = user_index
+    group_category = np.zeros(len(size), dtype=int)
+    group_category[group] = columns.category
+    order = np.lexsort((-group_spend, group_user))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = group_user[order][1:] != group_user[order][:-1]
+    top_group = np.full(count, -1)
+    top_group[group_user[order][first]] = order[first]
+
+    flagged: Dict[int, List[int]] = {}
+    for row in np.flatnonzero(unusual)[np.argsort(-zscore[unusual])]:
+        picks = flagged.setdefault(int(user_index[row]), [])
+        if len(picks) < TOP_UNUSUAL:
+            picks.append(int(row))
+
+    results = []
+    for i, user_id in enumerate(users.tolist()):
+        spent, before = float(spend_recent[i]), float(spend_previous[i])
+        change = round((spent - before) / before * 100, 1) if before > 0 else None
+        top = int(top_group[i])
+        top_category = columns.categories[group_category[top]] if group_spend[top] > 0 else None
+        top_share = round(float(group_spend[top]) / spent * 100, 1) if top_category else 0.0
+        unusual_rows = [
+            {
+                'expense_id': int(columns.expense_id[row]),
+                'date': date.fromordinal(int(columns.day[row])).isoformat(),
+                'category': columns.categories[columns.category[row]],
+                'amount': round(float(amount[row]), 2),
+                'zscore': round(float(zscore[row]), 2),
+            }
+            for row in flagged.get(i, [])
+        ]
+
+        insights = []
+        if unusual_rows:
+            largest = max(unusual_rows, key=lambda item: item['amount'])
+            insights.append({
+                'type': 'unusual_expenses',
+                'severity': 'high' if unusual_rows[0]['zscore'] >= HIGH_Z_THRESHOLD else 'medium',
+                'message': f"{unusual_count[i]} unusual expense(s) in the last {RECENT_DAYS} days, "
+                           f"the largest ${largest['amount']:.2f} in {largest['category']}",
+            })
+        if change is not None and abs(change) >= CHANGE_PERCENT:
+            insights.append({
+                'type': 'spending_up' if change > 0 else 'spending_down',
+                'severity': 'medium' if change > 0 else 'low',
+                'message': f"You spent {abs(change):.1f}% {'more' if change > 0 else 'less'} in the "
+                           f"last {RECENT_DAYS} days than in the {RECENT_DAYS} days before",
+            })
+        if top_category and top_share > CATEGORY_SHARE_PERCENT:
+            insights.append({
+                'type': 'high_category_spending',
+                'severity': 'low',
+                'message': f"{top_category} is {top_share:.1f}% of your spending in the last {RECENT_DAYS} days",
+            })
+
+        results.append({
+            'user_id': user_id,
+            'expense_count': int(expenses_recent[i]),
+            'spent': Decimal(str(round(spent, 2))),
+            'spent_previous': Decimal(str(round(before, 2))),
+            'change_percent': change,
+            'top_category': top_category,
+            'top_share': top_share,
+            'unusual_count': int(unusual_count[i]),
+            'unusual': json.dumps(unusual_rows),
+            'insights': json.dumps(insights),
+        })
+    return results
+
+
+class ActivityScanService:
+    """Nightly activity scoring - pure Python, no Flask imports."""
+
+    @staticmethod
+    def load_chunk(first_user_id: int, last_user_id: int, today: date) -> Columns:
+        """
+        Load a user ID range's expenses of the window as columns.
+
+        Args:
+            first_user_id: First user ID of the range (inclusive)
+            last_user_id: Last user ID of the range (inclusive)
+            today: Run date
+
+        Returns:
+            Columns sorted by user (category codes index ``categories``)
+        """
+        rows = db.session.execute(
+            select(Expense.user_id, Expense.id, Expense.date, Expense.category, Expense.amount)
+            .where(
+                Expense.user_id.between(first_user_id, last_user_id),
+                Expense.date > today - timedelta(days=ACTIVITY_WINDOW_DAYS),
+                Expense.date <= today
+            )
+            .order_by(Expense.user_id)
+        ).all()
+
+        codes: Dict[str, int] = {}
+        return Columns(
+            user_id=np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            expense_id=np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)),
+            day=np.fromiter((row[2].toordinal() for row in rows), dtype=np.int64, count=len(rows)),
+            category=np.fromiter((codes.setdefault(row[3], len(codes)) for row in rows),
+                                 dtype=np.int64, count=len(rows)),
+            amount=np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows)),
+            categories=list(codes),
+        )
+
+    @staticmethod
+    def run(
+        today: Optional[date] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        restart: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Score every user with recent expenses and replace the stored results.
+
+        Args:
+            today: Run date (defaults to date.today())
+            workers: Scoring processes (default one per CPU core; 1 scores
+                in this process)
+            batch_size: Users per chunk (default BATCH_SIZE)
+            restart: Start over even if today's run already (partly) ran
+
+        Returns:
+            {"date", "workers", "users", "scored", "unusual",
+             "resumed_from", "completed", "seconds"} for this call
+        """
+        from services.checkpoint_service import CheckpointService
+
+        today = today or date.today()
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+
+        checkpoint = CheckpointService.start(f'activity-scan:{today.isoformat()}', restart=restart)
+        counts = {'date': today.isoformat(), 'workers': workers, 'users': 0, 'scored': 0, 'unusual': 0,
+                  'resumed_from': checkpoint.last_user_id, 'completed': 0, 'seconds': 0.0}
+        if checkpoint.completed_at is not None:
+            counts['completed'] = 1
+            return counts
+
+        def write(user_ids: List[int], future: Future) -> None:
+            rows = future.result()
+            scored_at = datetime.now(timezone.utc)
+            for row in rows:
+                row['day'] = today
+                row['scored_at'] = scored_at
+            try:
+                db.session.execute(delete(UserActivity).where(
+                    UserActivity.user_id.between(user_ids[0], user_ids[-1])
+                ))
+                if rows:
+                    db.session.execute(insert(UserActivity), rows)
+                DataVersionService.bump(db.session, [row['user_id'] for row in rows])
+                CheckpointService.advance(checkpoint, user_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.error(f"Activity scan for {today} stopped after user {checkpoint.last_user_id}")
+                raise
+            counts['users'] += len(user_ids)
+            counts['scored'] += len(rows)
+            counts['unusual'] += sum(1 for row in rows if row['unusual_count'])
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        in_flight: deque = deque()
+        try:
+            for user_ids in CheckpointService.user_chunks(checkpoint, batch_size or BATCH_SIZE):
+                columns = ActivityScanService.load_chunk(user_ids[0], user_ids[-1], today)
+                if pool is None:
+                    future = Future()
+                    future.set_result(score_chunk(columns, today.toordinal()))
+                else:
+                    future = pool.submit(score_chunk, columns, today.toordinal())
+                in_flight.append((user_ids, future))
+                # Keep every worker busy while chunks are written in order
+                while len(in_flight) > 2 * workers or (in_flight and in_flight[0][1].done()):
+                    write(*in_flight.popleft())
+            while in_flight:
+                write(*in_flight.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        CheckpointService.complete(checkpoint)
+        counts['completed'] = 1
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+        return counts
+
+    @staticmethod
+    def get_activity(user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's result of the latest activity scan.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            {"date", "expense_count", "spent", "spent_previous",
+             "change_percent", "top_category", "top_share", "unusual_count",
+             "unusual": [{"expense_id", "date", "category", "amount",
+             "zscore"}], "insights": [{"type", "severity", "message"}]},
+            or None if the user was not scanned
+        """
+        row = db.session.get(UserActivity, user_id)
+        if row is None:
+            return None
+        return {
+            'date': row.day.isoformat(),
+            'expense_count': row.expense_count,
+            'spent': float(row.spent),
+            'spent_previous': float(row.spent_previous),
+            'change_percent': row.change_percent,
+            'top_category': row.top_category,
+            'top_share': row.top_share,
+            'unusual_count': row.unusual_count,
+            'unusual': json.loads(row.unusual),
+            'insights': json.loads(row.insights),
+        }
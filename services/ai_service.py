@@ -86,7 +86,7 @@ class SpendingForecaster:
         
         try:
             # Prepare time series
-            values = list(monthly_totals.values())
+            values = pd.Series(list(monthly_totals.values()), dtype=float)
             
             # Fit ARIMA model (1,1,1) - common for financial data
             model = ARIMA(values, order=(1, 1, 1))
@@ -99,8 +99,8 @@ class SpendingForecaster:
             
             return {
                 'forecast': forecast_value,
-                'lower_bound': float(conf_int[0]),
-                'upper_bound': float(conf_int[1]),
+                'lower_bound': float(conf_int.iloc[0]),
+                'upper_bound': float(conf_int.iloc[1]),
                 'confidence': 0.95,
                 'status': 'success'
             }
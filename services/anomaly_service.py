@@ -0,0 +1,415 @@
+"""AnomalyService - persisted per-user anomaly models scored at insert time.
+
+``AnomalyDetector`` (services/ai_service.py) fits an IsolationForest over a
+list of amounts on every call. Here each user has small statistical models
+stored in ``anomaly_model``: one per category plus one over all categories
+(category '*'). A model holds robust amount statistics (median and MAD of
+log amounts), weekday counts, the median gap between expenses of the
+category and the date of the latest one.
+
+A new expense is scored against the stored models with a few arithmetic
+operations - no fit, no scan of past expenses:
+
+    - amount: robust z-score of the log amount (category model, or the
+      all-categories model while the category has too little history)
+    - category: how rarely the user spends in the category at all
+    - weekday: how rarely the category sees spending on that weekday
+    - days since the last similar expense, against the usual gap
+
+An expense is unusual when its amount z-score is at least AMOUNT_Z_MIN and
+the combined score reaches SCORE_THRESHOLD; it then raises its own alert
+(type 'unusual_expense:<expense id>', so a rescored expense never alerts
+twice).
+
+Models are refitted from the latest MODEL_SAMPLES expenses only once enough
+new expenses arrived since the last fit (REFIT_MIN_NEW, or REFIT_FRACTION
+of the fitted sample), so most inserts only bump a counter.
+
+Single expenses go through observe() after their commit; bulk inserts
+(batch endpoint, columnar import) call apply() on the insert transaction,
+which scores the whole batch against one read of the models and bumps the
+counters with one statement.
+
+Methods:
+    score() - Score an expense against a user's models
+    fit() - Refit and store one of a user's models
+    observe() - Score a new expense, raise its alert and update the models
+    apply() - Score bulk-inserted expenses and update the models
+    stats() - Scoring latency and refit cost metrics
+"""
+import logging
+import math
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, case, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Expense, AnomalyModel
+from services.rollup_service import month_key
+
+logger = logging.getLogger(__name__)
+
+# Category key of a user's model over all categories
+ALL_CATEGORIES = '*'
+# Latest expenses a model is fitted on
+MODEL_SAMPLES = 500
+# Fitted expenses a model needs before it scores
+MIN_SAMPLES = 10
+# Refit after max(REFIT_MIN_NEW, REFIT_FRACTION * fitted samples) new expenses
+REFIT_MIN_NEW = 5
+REFIT_FRACTION = 0.2
+# Lower bound of the log-amount spread, so near-constant amounts do not flag cents
+MIN_LOG_SPREAD = 0.1
+# Flagging thresholds (amount z-score, and z-score plus context surprises)
+AMOUNT_Z_MIN = 2.0
+SCORE_THRESHOLD = 3.0
+CONTEXT_WEIGHT = 0.5
+# Latency samples kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+# Bulk-inserted expense: (expense id, user_id, date, category, amount, title)
+ExpenseRow = Tuple[int, int, date, str, Decimal, str]
+
+
+def _summary(samples, scale: float) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as mean/p50/p95/max in seconds * scale."""
+    if not samples:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'mean': round(statistics.fmean(ordered) * scale, 2),
+        'p50': round(ordered[len(ordered) // 2] * scale, 2),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * scale, 2),
+        'max': round(ordered[-1] * scale, 2),
+    }
+
+
+class _Metrics:
+    """Process-local scoring and refit counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scored = 0
+        self.flagged = 0
+        self.unscored = 0
+        self.refits = 0
+        self.score_seconds: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.refit_seconds: deque = deque(maxlen=LATENCY_SAMPLES)
+
+
+_metrics = _Metrics()
+
+
+def _clip(value: float) -> float:
+    """Clip a context surprise to [0, 1]."""
+    return min(max(value, 0.0), 1.0)
+
+
+def _raise_alert(expense_id: int, user_id: int, day: date, title: str, category: str,
+                 amount: Decimal) -> Optional[int]:
+    """Raise an unusual expense's own alert (not committed); returns the new alert ID."""
+    from services.budget_service import BudgetService
+
+    return BudgetService.upsert_alert(
+        user_id, month_key(day), f'unusual_expense:{expense_id}',
+        'Unusual Expense',
+        f"${float(amount):.2f} for {title} ({category}) is unusual for you",
+        'warning'
+    )
+
+
+def _refit_due(model, new: int) -> bool:
+    """Whether a model is missing or has collected enough new expenses for a refit."""
+    return model is None or model.pending + new >= max(REFIT_MIN_NEW, REFIT_FRACTION * model.samples)
+
+
+class AnomalyService:
+    """Per-user anomaly models - pure Python, no Flask imports."""
+
+    @staticmethod
+    def score(
+        models: Dict[str, AnomalyModel],
+        category: str,
+        amount: Decimal,
+        day: date
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Score an expense against a user's stored models.
+
+        Args:
+            models: The user's models keyed by category (the expense's
+                category and ALL_CATEGORIES; missing or None ones are skipped)
+            category: Expense category
+            amount: Expense amount
+            day: Expense date
+
+        Returns:
+            {"score", "unusual", "amount_z", "category", "weekday", "gap",
+             "days_since"} or None while the user has too little history
+        """
+        own = models.get(category)
+        overall = models.get(ALL_CATEGORIES)
+        if own is not None and own.samples >= MIN_SAMPLES:
+            model = own
+        elif overall is not None and overall.samples >= MIN_SAMPLES:
+            model = overall
+        else:
+            return None
+
+        spread = max(1.4826 * model.log_mad, MIN_LOG_SPREAD)
+        amount_z = max((math.log1p(float(amount)) - model.log_median) / spread, 0.0)
+
+        counts = [int(count) for count in model.weekday_counts.split(',')]
+        weekday_p = (counts[day.weekday()] + 1) / (sum(counts) + 7)
+        weekday = _clip(math.log(1 / (7 * weekday_p)) / math.log(7))
+
+        category_surprise = 0.0
+        if overall is not None and overall.samples:
+            category_p = ((own.samples if own is not None else 0) + 1) / (overall.samples + 2)
+            category_surprise = _clip(-math.log10(category_p) / 2)
+
+        gap, days_since = 0.0, None
+        if own is not None and own.last_date is not None and day >= own.last_date:
+            days_since = (day - own.last_date).days
+            if own.gap_median and own.gap_median >= 2:
+                gap = _clip(math.log2(own.gap_median / max(days_since, 1)) / 4)
+
+        score = amount_z + CONTEXT_WEIGHT * (category_surprise + weekday + gap)
+        return {
+            'score': round(score, 3),
+            'unusual': amount_z >= AMOUNT_Z_MIN and score >= SCORE_THRESHOLD,
+            'amount_z': round(amount_z, 3),
+            'category': round(category_surprise, 3),
+            'weekday': round(weekday, 3),
+            'gap': round(gap, 3),
+            'days_since': days_since,
+        }
+
+    @staticmethod
+    def fit(user_id: int, category: str) -> AnomalyModel:
+        """
+        Refit one of a user's models from its latest MODEL_SAMPLES expenses.
+
+        Not committed here.
+
+        Args:
+            user_id: User ID
+            category: Category, or ALL_CATEGORIES for the user-wide model
+
+        Returns:
+            The stored AnomalyModel
+        """
+        start = time.perf_counter()
+        query = db.session.query(Expense.date, Expense.amount).filter(Expense.user_id == user_id)
+        if category != ALL_CATEGORIES:
+            query = query.filter(Expense.category == category)
+        rows = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(MODEL_SAMPLES).all()
+
+        logs = [math.log1p(float(amount)) for _, amount in rows]
+        weekdays = [0] * 7
+        for day, _ in rows:
+            weekdays[day.weekday()] += 1
+        days = sorted({day for day, _ in rows})
+        gaps = [(later - earlier).days for earlier, later in zip(days, days[1:])]
+
+        # populate_existing: observe() bumps the counters with a Core UPDATE
+        model = db.session.get(AnomalyModel, (user_id, category), populate_existing=True)
+        if model is None:
+            model = AnomalyModel(user_id=user_id, category=category)
+            db.session.add(model)
+        model.samples = len(rows)
+        model.pending = 0
+        model.log_median = statistics.median(logs) if logs else 0.0
+        model.log_mad = statistics.median(abs(value - model.log_median) for value in logs) if logs else 0.0
+        model.weekday_counts = ','.join(str(count) for count in weekdays)
+        model.gap_median = float(statistics.median(gaps)) if gaps and category != ALL_CATEGORIES else None
+        model.last_date = days[-1] if days else None
+        model.fit_ms = round((time.perf_counter() - start) * 1000, 2)
+        model.fitted_at = datetime.now(timezone.utc)
+
+        with _metrics.lock:
+            _metrics.refits += 1
+            _metrics.refit_seconds.append(time.perf_counter() - start)
+        return model
+
+    @staticmethod
+    def observe(expense: Expense) -> Optional[Dict[str, Any]]:
+        """
+        Score a just-created expense, raise its alert and update the models.
+
+        Called after the expense is committed: one read of the user's two
+        models, the score, a counter update, and a refit only for models
+        that are missing or have collected enough new expenses. Each refit
+        runs in a savepoint, so losing a race to create a model drops only
+        that refit, not the alert or the counters.
+
+        Args:
+            expense: The new expense
+
+        Returns:
+            score() result with "alert_id" (new alert ID or None) added,
+            or None while the user has too little history
+        """
+        user_id, category = expense.user_id, expense.category
+        keys = [category, ALL_CATEGORIES]
+        models = {
+            model.category: model for model in AnomalyModel.query.filter(
+                AnomalyModel.user_id == user_id, AnomalyModel.category.in_(keys)
+            )
+        }
+
+        start = time.perf_counter()
+        result = AnomalyService.score(models, category, expense.amount, expense.date)
+        elapsed = time.perf_counter() - start
+        with _metrics.lock:
+            if result is None:
+                _metrics.unscored += 1
+            else:
+                _metrics.scored += 1
+                _metrics.flagged += result['unusual']
+                _metrics.score_seconds.append(elapsed)
+
+        if result is not None:
+            result['alert_id'] = None
+            if result['unusual']:
+                result['alert_id'] = _raise_alert(expense.id, user_id, expense.date, expense.title,
+                                                  category, expense.amount)
+
+        table = AnomalyModel.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.category.in_(keys))
+            .values(
+                pending=table.c.pending + 1,
+                last_date=case(
+                    (table.c.last_date.is_(None), expense.date),
+                    (table.c.last_date < expense.date, expense.date),
+                    else_=table.c.last_date
+                )
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        for key in keys:
+            if _refit_due(models.get(key), 1):
+                try:
+                    with db.session.begin_nested():
+                        AnomalyService.fit(user_id, key)
+                except IntegrityError:
+                    # A concurrent insert created the same model first; it is refitted later
+                    pass
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def apply(connection, rows: Iterable[ExpenseRow]) -> int:
+        """
+        Score bulk-inserted expenses, raise their alerts and update the models.
+
+        Runs on the insert transaction: one read of every affected model,
+        each expense scored against the models as they were before the
+        batch, one executemany UPDATE of the pending counters and last
+        dates, and refits (each in a savepoint) of the models now due.
+
+        Args:
+            connection: SQLAlchemy connection bound to the current transaction
+            rows: (expense id, user_id, date, category, amount, title) tuples
+
+        Returns:
+            Number of expenses found unusual
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        table = AnomalyModel.__table__
+        user_ids = {row[1] for row in rows}
+        categories = {row[3] for row in rows} | {ALL_CATEGORIES}
+        models: Dict[Tuple[int, str], Any] = {
+            (model.user_id, model.category): model for model in connection.execute(
+                select(table).where(table.c.user_id.in_(user_ids), table.c.category.in_(categories))
+            )
+        }
+
+        unusual = 0
+        new: Dict[Tuple[int, str], list] = defaultdict(lambda: [0, None])
+        for expense_id, user_id, day, category, amount, title in rows:
+            start = time.perf_counter()
+            result = AnomalyService.score(
+                {category: models.get((user_id, category)),
+                 ALL_CATEGORIES: models.get((user_id, ALL_CATEGORIES))},
+                category, amount, day
+            )
+            elapsed = time.perf_counter() - start
+            with _metrics.lock:
+                if result is None:
+                    _metrics.unscored += 1
+                else:
+                    _metrics.scored += 1
+                    _metrics.flagged += result['unusual']
+                    _metrics.score_seconds.append(elapsed)
+            if result is not None and result['unusual']:
+                unusual += 1
+                _raise_alert(expense_id, user_id, day, title, category, amount)
+
+            for key in ((user_id, category), (user_id, ALL_CATEGORIES)):
+                counter = new[key]
+                counter[0] += 1
+                counter[1] = day if counter[1] is None else max(counter[1], day)
+
+        existing = [key for key in new if key in models]
+        if existing:
+            connection.execute(
+                update(table)
+                .where(table.c.user_id == bindparam('key_user'), table.c.category == bindparam('key_category'))
+                .values(
+                    pending=table.c.pending + bindparam('new_count'),
+                    last_date=case(
+                        (table.c.last_date.is_(None), bindparam('new_last')),
+                        (table.c.last_date < bindparam('new_last'), bindparam('new_last')),
+                        else_=table.c.last_date
+                    )
+                ),
+                [
+                    {'key_user': key[0], 'key_category': key[1],
+                     'new_count': new[key][0], 'new_last': new[key][1]}
+                    for key in existing
+                ]
+            )
+
+        for key, (count, _) in new.items():
+            if _refit_due(models.get(key), count):
+                try:
+                    with db.session.begin_nested():
+                        AnomalyService.fit(*key)
+                except IntegrityError:
+                    # A concurrent insert created the same model first; it is refitted later
+                    pass
+        return unusual
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """
+        Get anomaly scoring metrics for this process.
+
+        Returns:
+            {"scored", "flagged", "unscored", "refits",
+             "score_us": {"mean", "p50", "p95", "max"},
+             "refit_ms": {"mean", "p50", "p95", "max"}}
+            where score_us is the time to score one expense against its
+            loaded models and refit_ms the time to refit one model
+        """
+        with _metrics.lock:
+            return {
+                'scored': _metrics.scored,
+                'flagged': _metrics.flagged,
+                'unscored': _metrics.unscored,
+                'refits': _metrics.refits,
+                'score_us': _summary(_metrics.score_seconds, 1e6),
+                'refit_ms': _summary(_metrics.refit_seconds, 1e3),
+            }
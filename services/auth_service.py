@@ -12,10 +12,10 @@ Returns clean Python dicts/objects for routes to format.
 from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 import secrets
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask import current_app, url_for
 
 from models import db, User
+from services.password_service import PasswordService
 from email_service import (
     send_password_reset_email, 
     send_welcome_email,
@@ -66,12 +66,15 @@ class AuthService:
         if existing_email:
             raise ValueError('Email already registered')
         
+        # Hashed under the hashing admission limit (may raise HashingBusyError)
+        password_hash = PasswordService.hash(password)
+        
         try:
             # Create new user with secure password hashing
             user = User(
                 username=username.strip().lower(),
                 email=email.strip().lower(),
-                password=generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+                password=password_hash
             )
             db.session.add(user)
             db.session.commit()
@@ -120,8 +123,8 @@ class AuthService:
         if not user:
             raise ValueError('Invalid username or password')
         
-        # Verify password
-        if not check_password_hash(user.password, password):
+        # Verify password (upgrading a hash made with an old work factor)
+        if not PasswordService.verify_and_update(user, password):
             raise ValueError('Invalid username or password')
         
         return {
@@ -222,9 +225,12 @@ class AuthService:
         if not user.reset_token_expires or datetime.now(timezone.utc) > user.reset_token_expires:
             raise ValueError('Password reset link has expired')
         
+        password_hash = PasswordService.hash(new_password)
+        
         try:
             # Update password and clear token
-            user.password = generate_password_hash(new_password, method='pbkdf2:sha256', salt_length=16)
+            user.password = password_hash
+            user.token_version = (user.token_version or 0) + 1  # revoke issued JWTs
             user.reset_token = None
             user.reset_token_expires = None
             db.session.commit()
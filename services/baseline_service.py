@@ -0,0 +1,318 @@
+"""BaselineService - streaming per-category spending baselines and flags.
+
+Each (user, category) keeps running statistics in ``spending_baseline``,
+plus one row over all of the user's categories (category '*'):
+
+    - EWMA mean and variance of log(1 + amount) - recent spending weighs
+      most, and the first expenses are averaged plainly until the decay
+      takes over
+    - a quantile sketch: counts of amounts in logarithmic buckets
+      (relative accuracy SKETCH_ACCURACY), capped at SKETCH_MAX_BUCKETS by
+      merging the smallest buckets
+
+Every new expense is evaluated against its category's baseline before the
+baseline absorbs it - the whole update is O(1) in the user's history. A
+category seen for the first time is evaluated against the user-wide
+baseline instead. An expense is flagged when it is at least Z_THRESHOLD
+deviations above the category's running mean and above the
+PERCENTILE_THRESHOLD quantile of its past amounts, so recurring large
+payments (rent) become part of their category's baseline instead of being
+flagged every month. Flags are stored in ``expense_flag`` in the same
+transaction as the expense; insights read them instead of rescanning.
+
+Edited expenses are re-evaluated against the current baseline (the
+baseline itself is not rewound); deleted expenses lose their flag. The
+statistics are approximate by design: concurrent writes to the same
+category can overwrite each other's baseline step, but never a flag.
+
+Methods:
+    register_listeners() - Hook baseline updates into SQLAlchemy flushes
+    apply() - Evaluate new expenses, store flags and update baselines
+    evaluate() - Evaluate an amount against a baseline
+    recent_flags() - A user's flagged expenses in a date range
+"""
+import json
+import math
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, Expense, ExpenseFlag, SpendingBaseline, User
+
+# Category key of a user's baseline over all categories
+ALL_CATEGORIES = '*'
+# Weight of the newest expense once the baseline has 1/EWMA_ALPHA expenses
+EWMA_ALPHA = 0.05
+# Expenses a baseline needs before it flags
+MIN_COUNT = 5
+# Lower bound of the log-amount deviation (about 10%), so constant amounts
+# do not flag small changes
+MIN_DEVIATION = 0.1
+# Flagging thresholds: deviations above the mean and quantile of past amounts
+Z_THRESHOLD = 3.0
+HIGH_Z_THRESHOLD = 5.0
+PERCENTILE_THRESHOLD = 0.95
+# Quantile sketch: relative accuracy and bucket cap
+SKETCH_ACCURACY = 0.025
+SKETCH_MAX_BUCKETS = 128
+
+_GAMMA_LOG = math.log((1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY))
+_TRACKED_ATTRS = ('date', 'category', 'amount')
+
+# New or re-evaluated expense: (expense id, user_id, date, category, amount)
+ExpenseRow = Tuple[int, int, date, str, Decimal]
+
+
+class Baseline:
+    """Running statistics of one (user, category), updated in place."""
+
+    __slots__ = ('user_id', 'category', 'count', 'mean', 'variance', 'buckets')
+
+    def __init__(self, user_id: int, category: str, count: int = 0, mean: float = 0.0,
+                 variance: float = 0.0, sketch: Optional[str] = None):
+        self.user_id = user_id
+        self.category = category
+        self.count = count
+        self.mean = mean
+        self.variance = variance
+        self.buckets: Dict[int, int] = {int(k): v for k, v in json.loads(sketch or '{}').items()}
+
+    def add(self, value: float) -> None:
+        """Absorb an amount: one EWMA step and one sketch bucket increment."""
+        self.count += 1
+        x = math.log1p(value)
+        alpha = max(EWMA_ALPHA, 1 / self.count)
+        diff = x - self.mean
+        self.mean += alpha * diff
+        self.variance = (1 - alpha) * (self.variance + alpha * diff * diff)
+
+        index = _bucket(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > SKETCH_MAX_BUCKETS:
+            low, second = sorted(self.buckets)[:2]
+            self.buckets[second] += self.buckets.pop(low)
+
+    def percentile(self, value: float) -> float:
+        """Fraction of absorbed amounts below ``value`` (sketch accuracy)."""
+        total = sum(self.buckets.values())
+        if not total:
+            return 0.0
+        index = _bucket(value)
+        below = sum(count for bucket, count in self.buckets.items() if bucket < index)
+        return (below + self.buckets.get(index, 0) / 2) / total
+
+    def as_row(self) -> Dict[str, Any]:
+        """Return the spending_baseline row of this baseline."""
+        return {
+            'user_id': self.user_id,
+            'category': self.category,
+            'count': self.count,
+            'mean': self.mean,
+            'variance': self.variance,
+            'sketch': json.dumps(self.buckets, separators=(',', ':')),
+            'updated_at': datetime.now(timezone.utc),
+        }
+
+
+def _bucket(value: float) -> int:
+    """Return the sketch bucket of an amount."""
+    return math.ceil(math.log(max(value, 0.01)) / _GAMMA_LOG)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    """Drop the flags of expenses about to be deleted (before their rows go)."""
+    ids = [obj.id for obj in session.deleted if isinstance(obj, Expense) and obj.id is not None]
+    if ids:
+        session.connection().execute(delete(ExpenseFlag).where(ExpenseFlag.expense_id.in_(ids)))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    """Evaluate the flushed new and edited expenses against their baselines."""
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    new_rows, edited_rows = [], []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Expense) or obj in session.deleted or obj.user_id in deleted_users:
+            continue
+        row = (obj.id, obj.user_id, obj.date, obj.category, obj.amount)
+        if obj in session.new:
+            new_rows.append(row)
+        elif any(get_history(obj, attr).has_changes() for attr in _TRACKED_ATTRS):
+            edited_rows.append(row)
+
+    if new_rows:
+        BaselineService.apply(session.connection(), new_rows)
+    if edited_rows:
+        BaselineService.apply(session.connection(), edited_rows, update_baselines=False)
+
+
+class BaselineService:
+    """Streaming spending baselines - pure Python, no Flask imports."""
+
+    @staticmethod
+    def register_listeners() -> None:
+        """
+        Attach baseline updates to every SQLAlchemy session flush.
+
+        Safe to call more than once (e.g. one call per app created in tests).
+        """
+        for name, listener in (('before_flush', _before_flush), ('after_flush', _after_flush)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    @staticmethod
+    def evaluate(baseline: Optional[Baseline], amount: Decimal) -> Optional[Dict[str, Any]]:
+        """
+        Evaluate an amount against a baseline.
+
+        Args:
+            baseline: Baseline to compare against (None if there is none)
+            amount: Expense amount
+
+        Returns:
+            {"zscore", "percentile", "vs_typical", "severity"} if the amount
+            is flagged, otherwise None
+        """
+        if baseline is None or baseline.count < MIN_COUNT:
+            return None
+        value = float(amount)
+        deviation = max(math.sqrt(baseline.variance), MIN_DEVIATION)
+        zscore = (math.log1p(value) - baseline.mean) / deviation
+        if zscore < Z_THRESHOLD:
+            return None
+        percentile = baseline.percentile(value)
+        if percentile < PERCENTILE_THRESHOLD:
+            return None
+        return {
+            'zscore': round(zscore, 2),
+            'percentile': round(percentile, 3),
+            'vs_typical': round(value / max(math.expm1(baseline.mean), 0.01), 1),
+            'severity': 'high' if zscore >= HIGH_Z_THRESHOLD else 'medium',
+        }
+
+    @staticmethod
+    def apply(connection, rows: Iterable[ExpenseRow], update_baselines: bool = True) -> int:
+        """
+        Evaluate expenses against their baselines, store flags and update the baselines.
+
+        One read of the affected baselines, then per expense (in order) an
+        evaluation and, if update_baselines, an O(1) update of its category
+        and user-wide baselines; the changed baselines are written back with
+        one upsert.
+
+        Args:
+            connection: SQLAlchemy connection bound to the current transaction
+            rows: (expense id, user_id, date, category, amount) tuples
+            update_baselines: False to only re-evaluate (edited expenses)
+
+        Returns:
+            Number of expenses flagged
+        """
+        rows = [row for row in rows if None not in row]
+        if not rows:
+            return 0
+
+        table = SpendingBaseline.__table__
+        user_ids = {row[1] for row in rows}
+        categories = {row[3] for row in rows} | {ALL_CATEGORIES}
+        baselines: Dict[Tuple[int, str], Baseline] = {
+            (user_id, category): Baseline(user_id, category, count, mean, variance, sketch)
+            for user_id, category, count, mean, variance, sketch in connection.execute(
+                select(table.c.user_id, table.c.category, table.c.count,
+                       table.c.mean, table.c.variance, table.c.sketch)
+                .where(table.c.user_id.in_(user_ids), table.c.category.in_(categories))
+            )
+        }
+
+        flags = []
+        for expense_id, user_id, day, category, amount in rows:
+            own = baselines.get((user_id, category))
+            reference = own if own is not None and own.count else baselines.get((user_id, ALL_CATEGORIES))
+            flag = BaselineService.evaluate(reference, amount)
+            if flag is not None:
+                flags.append(dict(flag, expense_id=expense_id, user_id=user_id, date=day,
+                                  category=category, amount=amount))
+            if update_baselines:
+                for key in ((user_id, category), (user_id, ALL_CATEGORIES)):
+                    if key not in baselines:
+                        baselines[key] = Baseline(*key)
+                    baselines[key].add(float(amount))
+
+        if not update_baselines:
+            connection.execute(delete(ExpenseFlag).where(
+                ExpenseFlag.expense_id.in_([row[0] for row in rows])
+            ))
+        if flags:
+            connection.execute(insert(ExpenseFlag), flags)
+        if update_baselines:
+            _upsert_baselines(connection, [baseline.as_row() for baseline in baselines.values()])
+        return len(flags)
+
+    @staticmethod
+    def recent_flags(user_id: int, since: date, until: date, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get a user's flagged expenses in a date range, largest first.
+
+        Args:
+            user_id: User ID
+            since: First date (inclusive)
+            until: Last date (inclusive)
+            limit: Maximum number of flags
+
+        Returns:
+            List of {"title", "date", "category", "amount", "vs_average",
+            "severity"} where vs_average is the amount over the category's
+            typical amount
+        """
+        rows = db.session.query(
+            Expense.title, ExpenseFlag.date, ExpenseFlag.category, ExpenseFlag.amount,
+            ExpenseFlag.vs_typical, ExpenseFlag.severity
+        ).join(
+            Expense, Expense.id == ExpenseFlag.expense_id
+        ).filter(
+            ExpenseFlag.user_id == user_id,
+            ExpenseFlag.date >= since,
+            ExpenseFlag.date <= until
+        ).order_by(ExpenseFlag.amount.desc(), ExpenseFlag.expense_id).limit(limit).all()
+        return [
+            {
+                'title': title,
+                'date': day.isoformat(),
+                'category': category,
+                'amount': round(float(amount), 2),
+                'vs_average': vs_typical,
+                'severity': severity,
+            }
+            for title, day, category, amount, vs_typical, severity in rows
+        ]
+
+
+def _upsert_baselines(connection, rows: List[Dict[str, Any]]) -> None:
+    """Write baselines back with one upsert (UPDATE-then-INSERT on other dialects)."""
+    table = SpendingBaseline.__table__
+    dialect_name = connection.dialect.name
+    values = ('count', 'mean', 'variance', 'sketch', 'updated_at')
+
+    if dialect_name in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite_insert if dialect_name == 'sqlite' else pg_insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.category],
+            set_={name: stmt.excluded[name] for name in values}
+        )
+        connection.execute(stmt)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(table.c.user_id == row['user_id'], table.c.category == row['category'])
+            .values(**{name: row[name] for name in values})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**row))
@@ -4,18 +4,82 @@ This module provides budget management operations without any Flask dependencies
 All methods return clean dictionaries with success/error information.
 Can be used from web routes, REST APIs, CLI tools, or background jobs.
 
+Budget alerts are evaluated on every expense write from the spending rollup,
+which holds each user's running month total per category (see
+services/rollup_service.py): one round trip reads the budget and the month
+total, and a crossed threshold is recorded with an idempotent insert against
+the alert table's unique (user_id, triggered_month, alert_type) index.
+
 Methods:
     set_budget() - Set monthly budget for user
     get_budget() - Get current budget and spending status
     check_budget_exceeds() - Check if spending exceeds budget
     get_budget_status() - Get detailed budget status with percentage
+    month_status() - Budget and month total in one round trip
+    upsert_alert() - Insert an alert unless one exists for its month and type
+    evaluate_alerts() - Raise the budget alert a user's month total calls for
+    sweep_alerts() - Raise missing budget alerts for every user (nightly)
     reset_monthly_alerts() - Clear monthly alerts
 """
 from datetime import date, datetime
-from decimal import Decimal
-from typing import Optional, Dict, Any
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Setting, Alert, SpendingRollup
+from services.rollup_service import month_key
+from services.version_service import DataVersionService
 
-from models import db, User, Expense, Setting, Alert
+# Share of the budget above which a warning alert is raised
+WARNING_RATIO = Decimal('0.8')
+
+
+def _parse_budget(value: Optional[str]) -> Optional[Decimal]:
+    """Parse a 'monthly_budget' setting; missing, invalid or non-positive values are None."""
+    try:
+        budget = Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+    return budget if budget is not None and budget.is_finite() and budget > 0 else None
+
+
+def _budget_alert(month_total: Decimal, budget: Optional[Decimal]) -> Optional[Dict[str, str]]:
+    """
+    Get the budget alert a month total calls for.
+    
+    Returns:
+        {"alert_type", "title", "message", "severity"} for 'budget_exceeded'
+        (above the budget) or 'budget_warning' (above WARNING_RATIO of it),
+        else None
+    """
+    if budget is None or month_total <= budget * WARNING_RATIO:
+        return None
+    
+    total, limit = float(month_total), float(budget)
+    if month_total > budget:
+        exceeded_by = total - limit
+        percentage = (total / limit - 1) * 100
+        return {
+            'alert_type': 'budget_exceeded',
+            'title': 'Budget Exceeded! 🚨',
+            'message': f"You've spent ${total:.2f}, exceeding your ${limit:.2f} budget by "
+                       f"${exceeded_by:.2f} ({percentage:.1f}%)",
+            'severity': 'danger',
+        }
+    
+    remaining = limit - total
+    percentage_used = total / limit * 100
+    return {
+        'alert_type': 'budget_warning',
+        'title': 'Budget Warning ⚠️',
+        'message': f"You've spent ${total:.2f} of your ${limit:.2f} budget ({percentage_used:.1f}%). "
+                   f"Only ${remaining:.2f} remaining.",
+        'severity': 'warning',
+    }
 
 
 class BudgetService:
@@ -133,14 +197,9 @@ class BudgetService:
                     "message": "Invalid budget value in database"
                 }
             
-            # Calculate month's spending
-            today = date.today()
-            month_expenses = Expense.query.filter(
-                Expense.user_id == user_id,
-                Expense.date >= date(today.year, today.month, 1)
-            ).all()
-            
-            month_spent = sum(float(e.amount) for e in month_expenses)
+            # Month's spending from the rollup (a few rows, not the expenses)
+            _, month_total = BudgetService.month_status(user_id, month_key(date.today()))
+            month_spent = float(month_total)
             remaining = budget - month_spent
             percentage_used = (month_spent / budget * 100) if budget > 0 else 0
             is_exceeded = month_spent > budget
@@ -302,25 +361,8 @@ class BudgetService:
             
             budget = result["budget"]
             month_spent = result["month_spent"]
-            today = date.today()
-            current_month = f"{today.year}-{today.month:02d}"
+            current_month = month_key(date.today())
             
-            # Check if alert already exists
-            existing_alert = Alert.query.filter_by(
-                user_id=user_id,
-                triggered_month=current_month,
-                alert_type=f'budget_{alert_type}' if alert_type in ['warning', 'danger'] else alert_type
-            ).first()
-            
-            if existing_alert:
-                return {
-                    "success": True,
-                    "alert_created": False,
-                    "alert_id": existing_alert.id,
-                    "message": f"Alert already exists for {current_month}"
-                }
-            
-            # Create alert
             if alert_type == "danger":
                 exceeded_by = month_spent - budget
                 percentage_over = (month_spent / budget - 1) * 100
@@ -338,22 +380,28 @@ class BudgetService:
                     "message": f"Invalid alert type: {alert_type}"
                 }
             
-            alert = Alert(
-                user_id=user_id,
-                alert_type=f'budget_{alert_type}',
-                title=title,
-                message=message,
-                severity=severity,
-                triggered_month=current_month
+            alert_id = BudgetService.upsert_alert(
+                user_id, current_month, f'budget_{alert_type}', title, message, severity
             )
-            
-            db.session.add(alert)
             db.session.commit()
             
+            if alert_id is None:
+                existing_alert = Alert.query.filter_by(
+                    user_id=user_id,
+                    triggered_month=current_month,
+                    alert_type=f'budget_{alert_type}'
+                ).first()
+                return {
+                    "success": True,
+                    "alert_created": False,
+                    "alert_id": existing_alert.id if existing_alert else None,
+                    "message": f"Alert already exists for {current_month}"
+                }
+            
             return {
                 "success": True,
                 "alert_created": True,
-                "alert_id": alert.id,
+                "alert_id": alert_id,
                 "message": f"Budget {alert_type} alert created"
             }
         
@@ -361,6 +409,207 @@ class BudgetService:
             db.session.rollback()
             raise Exception(f"Failed to create budget alert: {str(e)}")
     
+    @staticmethod
+    def month_status(user_id: int, month: str) -> Tuple[Optional[Decimal], Decimal]:
+        """
+        Get a user's budget and month total in one round trip.
+        
+        The total is summed from the user's rollup buckets for the month
+        (one per category), which are kept current by every expense write.
+        
+        Args:
+            user_id: User ID
+            month: Month in YYYY-MM format
+        
+        Returns:
+            (budget or None if unset/invalid, month total)
+        """
+        budget_value = select(Setting.value).where(
+            Setting.user_id == user_id,
+            Setting.key == 'monthly_budget'
+        ).limit(1).scalar_subquery()
+        month_total = select(
+            func.coalesce(func.sum(SpendingRollup.total), 0)
+        ).where(
+            SpendingRollup.user_id == user_id,
+            SpendingRollup.month == month
+        ).scalar_subquery()
+        
+        budget, total = db.session.execute(select(budget_value, month_total)).one()
+        return _parse_budget(budget), Decimal(str(total or 0))
+    
+    @staticmethod
+    def upsert_alert(
+        user_id: int,
+        month: str,
+        alert_type: str,
+        title: str,
+        message: str,
+        severity: str
+    ) -> Optional[int]:
+        """
+        Insert an alert unless the user already has one of its type for the month.
+        
+        Idempotent under concurrency: the insert is resolved by the unique
+        (user_id, triggered_month, alert_type) index - ON CONFLICT DO NOTHING
+        on SQLite and PostgreSQL, a savepoint elsewhere. Not committed here.
+        
+        Args:
+            user_id: User ID
+            month: Triggered month in YYYY-MM format
+            alert_type: Alert type, e.g. 'budget_warning'
+            title: Alert title
+            message: Alert message
+            severity: 'warning', 'danger' or 'info'
+        
+        Returns:
+            ID of the new alert, or None if it already existed
+        """
+        row = {
+            'user_id': user_id,
+            'triggered_month': month,
+            'alert_type': alert_type,
+            'title': title,
+            'message': message[:500],
+            'severity': severity,
+        }
+        table = Alert.__table__
+        dialect_name = db.session.get_bind().dialect.name
+        
+        if dialect_name in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite_insert if dialect_name == 'sqlite' else pg_insert
+            stmt = dialect_insert(table).values(**row).on_conflict_do_nothing(
+                index_elements=[table.c.user_id, table.c.triggered_month, table.c.alert_type]
+            ).returning(table.c.id)
+            alert_id = db.session.execute(stmt).scalar()
+        else:
+            try:
+                with db.session.begin_nested():
+                    alert_id = db.session.execute(insert(table).values(**row)).inserted_primary_key[0]
+            except IntegrityError:
+                alert_id = None
+        
+        if alert_id is not None:
+            DataVersionService.bump(db.session, [user_id])
+        return alert_id
+    
+    @staticmethod
+    def evaluate_alerts(user_id: int, month: Optional[str] = None) -> Optional[Alert]:
+        """
+        Raise the budget alert a user's month total calls for, at most once per month.
+        
+        Called after every expense write: one read of the budget and month
+        total, a threshold check, and at most one idempotent insert.
+        Spending above the budget raises 'budget_exceeded'; above
+        WARNING_RATIO of it, 'budget_warning'.
+        
+        Args:
+            user_id: User ID
+            month: Month in YYYY-MM format (defaults to the current month)
+        
+        Returns:
+            The newly created Alert, or None if no new alert was raised
+        """
+        month = month or month_key(date.today())
+        budget, month_total = BudgetService.month_status(user_id, month)
+        alert = _budget_alert(month_total, budget)
+        if alert is None:
+            return None
+        
+        alert_id = BudgetService.upsert_alert(user_id, month, **alert)
+        if alert_id is None:
+            return None
+        db.session.commit()
+        return db.session.get(Alert, alert_id)
+    
+    @staticmethod
+    def sweep_alerts(month: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Re-evaluate the budget alerts of every user with a budget (nightly job).
+        
+        Catches what the per-write check cannot see: back-dated edits,
+        budget changes and month rollovers. One query joins every
+        'monthly_budget' setting to the user's month total and to the
+        month's existing budget alerts; the missing alerts are then
+        bulk-inserted in one transaction (ON CONFLICT DO NOTHING, so a
+        concurrent per-write check is never duplicated).
+        
+        Args:
+            month: Month in YYYY-MM format (defaults to the current month)
+        
+        Returns:
+            {"month": str, "scanned": users with a budget, "raised": alerts
+             inserted, "warnings": int, "exceeded": int}
+        """
+        month = month or month_key(date.today())
+        
+        month_totals = select(
+            SpendingRollup.user_id,
+            func.sum(SpendingRollup.total).label('total')
+        ).where(
+            SpendingRollup.month == month
+        ).group_by(SpendingRollup.user_id).subquery()
+        
+        def has_alert(alert_type: str):
+            return select(Alert.id).where(
+                Alert.user_id == Setting.user_id,
+                Alert.triggered_month == month,
+                Alert.alert_type == alert_type
+            ).exists()
+        
+        rows = db.session.query(
+            Setting.user_id,
+            Setting.value,
+            func.coalesce(month_totals.c.total, 0),
+            has_alert('budget_warning'),
+            has_alert('budget_exceeded')
+        ).outerjoin(
+            month_totals, month_totals.c.user_id == Setting.user_id
+        ).filter(
+            Setting.key == 'monthly_budget'
+        ).all()
+        
+        missing = []
+        for user_id, budget_value, total, has_warning, has_exceeded in rows:
+            alert = _budget_alert(Decimal(str(total)), _parse_budget(budget_value))
+            if alert is None:
+                continue
+            exists = has_exceeded if alert['alert_type'] == 'budget_exceeded' else has_warning
+            if not exists:
+                missing.append(dict(alert, user_id=user_id, triggered_month=month))
+        
+        raised = []
+        try:
+            if missing:
+                table = Alert.__table__
+                dialect_name = db.session.get_bind().dialect.name
+                if dialect_name in ('sqlite', 'postgresql'):
+                    dialect_insert = sqlite_insert if dialect_name == 'sqlite' else pg_insert
+                    stmt = dialect_insert(table).on_conflict_do_nothing(
+                        index_elements=[table.c.user_id, table.c.triggered_month, table.c.alert_type]
+                    ).returning(table.c.user_id, table.c.alert_type)
+                    raised = [tuple(row) for row in db.session.execute(stmt, missing)]
+                else:
+                    for row in missing:
+                        if BudgetService.upsert_alert(
+                            row['user_id'], month, row['alert_type'],
+                            row['title'], row['message'], row['severity']
+                        ) is not None:
+                            raised.append((row['user_id'], row['alert_type']))
+                DataVersionService.bump(db.session, [user_id for user_id, _ in raised])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to sweep budget alerts: {str(e)}")
+        
+        return {
+            'month': month,
+            'scanned': len(rows),
+            'raised': len(raised),
+            'warnings': sum(1 for _, alert_type in raised if alert_type == 'budget_warning'),
+            'exceeded': sum(1 for _, alert_type in raised if alert_type == 'budget_exceeded'),
+        }
+    
     @staticmethod
     def reset_monthly_alerts(user_id: int, current_month: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -378,15 +627,18 @@ class BudgetService:
                 today = date.today()
                 current_month = f"{today.year}-{today.month:02d}"
             
-            # Delete all budget alerts for this month
-            alerts = Alert.query.filter_by(
-                user_id=user_id,
-                triggered_month=current_month
-            ).filter(Alert.alert_type.like('budget_%')).all()
-            
-            count = len(alerts)
-            for alert in alerts:
-                db.session.delete(alert)
+            # Delete all budget alerts for this month in one statement
+            result = db.session.execute(
+                delete(Alert).where(
+                    Alert.user_id == user_id,
+                    Alert.triggered_month == current_month,
+                    Alert.alert_type.like('budget_%')
+                ),
+                execution_options={'synchronize_session': False}
+            )
+            count = result.rowcount
+            if count:
+                DataVersionService.bump(db.session, [user_id])
             
             db.session.commit()
             
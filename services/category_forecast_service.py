@@ -0,0 +1,284 @@
+"""CategoryForecastService - batch per-category spending forecasts.
+
+Every (user, category) series of completed monthly totals is forecast with
+damped-trend exponential smoothing (Holt's method). Instead of one model fit
+per series, a whole chunk of users is fitted at once:
+
+    1. The chunk's rollup rows become one matrix - a row per (user,
+       category), a column per month of the last HISTORY_MONTHS.
+    2. The smoothing recursion runs over the month columns only; each step
+       updates every series and every (alpha, beta) candidate of the
+       parameter grid with array operations.
+    3. Each series keeps the candidate with the lowest one-step-ahead error,
+       whose residual spread gives the forecast interval.
+
+The nightly job (``flask category-forecasts``) stores the results in
+``category_forecast``, one checkpointed chunk of users per transaction;
+lookups read the stored rows and only fit the one user live when the batch
+has not run for the month yet.
+
+Methods:
+    forecast_users() - Fit the category series of a range of users
+    refresh_all() - Batch-fit every user and store the forecasts
+    get_forecasts() - A user's stored (or live) category forecasts
+"""
+import logging
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+
+from models import db, SpendingRollup, CategoryForecast
+from services.rollup_service import month_key, month_keys, shift_month
+from services.version_service import DataVersionService
+
+logger = logging.getLogger(__name__)
+
+# Completed months fed to the smoothing
+HISTORY_MONTHS = 24
+# Series with fewer months since their first spending are not forecast
+MIN_HISTORY_MONTHS = 3
+# Parameter grid searched for every series
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.05, 0.15, 0.3)
+# Trend damping factor (1.0 would be Holt's undamped linear trend)
+DAMPING = 0.9
+# Users per checkpointed chunk of the nightly job
+BATCH_SIZE = 5000
+
+
+def smooth_forecasts(values: np.ndarray, start: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Fit damped-trend exponential smoothing to many series at once.
+
+    Args:
+        values: (series, months) matrix of monthly totals, oldest first
+        start: Column of each series' first month (earlier columns ignored)
+
+    Returns:
+        {"forecast", "lower_bound", "upper_bound", "alpha", "beta"} - arrays
+        with one entry per series (95% interval from the one-step residuals)
+    """
+    alpha_grid, beta_grid = np.meshgrid(ALPHAS, BETAS, indexing='ij')
+    alpha = alpha_grid.reshape(-1, 1)
+    beta = beta_grid.reshape(-1, 1)
+
+    candidates, months = alpha.shape[0], values.shape[1]
+    level = np.zeros((candidates, values.shape[0]))
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+
+    for t in range(months):
+        observed = values[:, t]
+        active = t > start
+        predicted = level + DAMPING * trend
+        error = observed - predicted
+        sse += np.where(active, error * error, 0.0)
+        level = np.where(active, predicted + alpha * error, np.where(t == start, observed, level))
+        trend = np.where(active, DAMPING * trend + alpha * beta * error, trend)
+
+    best = sse.argmin(axis=0)
+    columns = np.arange(values.shape[0])
+    forecast = np.maximum(level[best, columns] + DAMPING * trend[best, columns], 0.0)
+    residuals = np.maximum(months - 1 - start, 1)
+    margin = 1.96 * np.sqrt(sse[best, columns] / residuals)
+    return {
+        'forecast': forecast,
+        'lower_bound': np.maximum(forecast - margin, 0.0),
+        'upper_bound': forecast + margin,
+        'alpha': alpha[best, 0],
+        'beta': beta[best, 0],
+    }
+
+
+def _load_series(
+    first_user_id: int, last_user_id: int, months: List[str]
+) -> Tuple[List[Tuple[int, str]], np.ndarray]:
+    """Load the rollup of a user ID range as ([(user_id, category)], matrix)."""
+    column = {month: index for index, month in enumerate(months)}
+    rows = db.session.query(
+        SpendingRollup.user_id, SpendingRollup.category, SpendingRollup.month, SpendingRollup.total
+    ).filter(
+        SpendingRollup.user_id.between(first_user_id, last_user_id),
+        SpendingRollup.month >= months[0],
+        SpendingRollup.month <= months[-1]
+    ).all()
+
+    keys: Dict[Tuple[int, str], int] = {}
+    series_index = [keys.setdefault((user_id, category), len(keys)) for user_id, category, _, _ in rows]
+    month_index = [column[month] for _, _, month, _ in rows]
+
+    values = np.zeros((len(keys), len(months)))
+    values[series_index, month_index] = [float(total or 0) for _, _, _, total in rows]
+    return list(keys), values
+
+
+class CategoryForecastService:
+    """Batch category forecasts - pure Python, no Flask imports."""
+
+    @staticmethod
+    def forecast_users(
+        first_user_id: int, last_user_id: int, today: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Forecast this month's spending per category for a range of users.
+
+        Args:
+            first_user_id: First user ID of the range (inclusive)
+            last_user_id: Last user ID of the range (inclusive)
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            category_forecast row dicts ({"user_id", "category", "month",
+            "forecast", "lower_bound", "upper_bound", "alpha", "beta",
+            "history_months"}) for series with enough history
+        """
+        today = today or date.today()
+        months = month_keys(shift_month(today, -1), HISTORY_MONTHS)
+        keys, values = _load_series(first_user_id, last_user_id, months)
+        if not keys:
+            return []
+
+        start = np.argmax(values != 0, axis=1)
+        enough = (len(months) - start >= MIN_HISTORY_MONTHS) & values.any(axis=1)
+        keys = [key for key, keep in zip(keys, enough) if keep]
+        if not keys:
+            return []
+        values, start = values[enough], start[enough]
+        fitted = smooth_forecasts(values, start)
+
+        month = month_key(today)
+        return [
+            {
+                'user_id': user_id,
+                'category': category,
+                'month': month,
+                'forecast': Decimal(str(round(float(fitted['forecast'][i]), 2))),
+                'lower_bound': Decimal(str(round(float(fitted['lower_bound'][i]), 2))),
+                'upper_bound': Decimal(str(round(float(fitted['upper_bound'][i]), 2))),
+                'alpha': float(fitted['alpha'][i]),
+                'beta': float(fitted['beta'][i]),
+                'history_months': int(len(months) - start[i]),
+            }
+            for i, (user_id, category) in enumerate(keys)
+        ]
+
+    @staticmethod
+    def refresh_all(
+        today: Optional[date] = None,
+        batch_size: Optional[int] = None,
+        restart: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Forecast every user's categories and replace the stored forecasts.
+
+        Users are processed in checkpointed ID chunks; each chunk's rows and
+        the checkpoint are committed together, so an interrupted run resumes
+        after its last committed chunk.
+
+        Args:
+            today: Reference date (defaults to date.today())
+            batch_size: Users per chunk (default BATCH_SIZE)
+            restart: Start over even if the day's run already (partly) ran
+
+        Returns:
+            {"month", "users", "series", "resumed_from", "completed",
+             "seconds"} for this call
+        """
+        from services.checkpoint_service import CheckpointService
+
+        today = today or date.today()
+        month = month_key(today)
+        started = time.perf_counter()
+
+        checkpoint = CheckpointService.start(f'category-forecast:{today.isoformat()}', restart=restart)
+        counts = {'month': month, 'users': 0, 'series': 0,
+                  'resumed_from': checkpoint.last_user_id, 'completed': 0, 'seconds': 0.0}
+        if checkpoint.completed_at is not None:
+            counts['completed'] = 1
+            return counts
+
+        for user_ids in CheckpointService.user_chunks(checkpoint, batch_size or BATCH_SIZE):
+            rows = CategoryForecastService.forecast_users(user_ids[0], user_ids[-1], today)
+            fitted_at = datetime.now(timezone.utc)
+            for row in rows:
+                row['fitted_at'] = fitted_at
+            try:
+                db.session.execute(delete(CategoryForecast).where(
+                    CategoryForecast.user_id.between(user_ids[0], user_ids[-1])
+                ))
+                if rows:
+                    db.session.execute(insert(CategoryForecast), rows)
+                DataVersionService.bump(db.session, {row['user_id'] for row in rows})
+                CheckpointService.advance(checkpoint, user_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.error(f"Category forecasts for {month} stopped after user {checkpoint.last_user_id}")
+                raise
+            counts['users'] += len(user_ids)
+            counts['series'] += len(rows)
+
+        CheckpointService.complete(checkpoint)
+        counts['completed'] = 1
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+        return counts
+
+    @staticmethod
+    def get_forecasts(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Get a user's per-category forecasts for this month.
+
+        Stored batch results are used when they are for this month;
+        otherwise the user's series are fitted live (and not stored).
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            {"month": "YYYY-MM", "source": "batch" or "live",
+             "total": {"forecast", "lower_bound", "upper_bound"},
+             "categories": {category: {"forecast", "lower_bound",
+             "upper_bound", "history_months"}}} with categories ordered by
+            forecast (descending); the total's bounds add the category bounds
+        """
+        today = today or date.today()
+        month = month_key(today)
+        rows = [
+            {
+                'category': row.category,
+                'forecast': row.forecast,
+                'lower_bound': row.lower_bound,
+                'upper_bound': row.upper_bound,
+                'history_months': row.history_months,
+            }
+            for row in CategoryForecast.query.filter_by(user_id=user_id, month=month)
+        ]
+        source = 'batch'
+        if not rows:
+            rows = CategoryForecastService.forecast_users(user_id, user_id, today)
+            source = 'live'
+
+        rows.sort(key=lambda row: (-row['forecast'], row['category']))
+        categories = {
+            row['category']: {
+                'forecast': float(row['forecast']),
+                'lower_bound': float(row['lower_bound']),
+                'upper_bound': float(row['upper_bound']),
+                'history_months': row['history_months'],
+            }
+            for row in rows
+        }
+        return {
+            'month': month,
+            'source': source,
+            'total': {
+                key: round(sum(float(row[key]) for row in rows), 2)
+                for key in ('forecast', 'lower_bound', 'upper_bound')
+            },
+            'categories': categories,
+        }
@@ -0,0 +1,103 @@
+"""CheckpointService - resumable, chunked batch jobs over all users.
+
+Batch jobs (monthly summaries, sweeps, nightly scoring) walk the user table
+in primary-key order, one chunk at a time. Each chunk's output and the
+advanced ``JobCheckpoint`` are committed together, so a run that crashes or
+is interrupted resumes right after the last committed chunk - no user is
+skipped and none is processed twice.
+
+Example usage:
+    checkpoint = CheckpointService.start('monthly-summary:2026-09')
+    for user_ids in CheckpointService.user_chunks(checkpoint, 1000):
+        ...  # write the chunk's output to db.session
+        CheckpointService.advance(checkpoint, user_ids)
+        db.session.commit()
+    CheckpointService.complete(checkpoint)
+
+Methods:
+    start() - Get or create a job run's checkpoint
+    user_chunks() - Iterate user IDs after the checkpoint in chunks
+    advance() - Move the checkpoint past a chunk (caller commits)
+    complete() - Mark a run as finished
+"""
+from datetime import datetime, timezone
+from typing import Iterator, List
+
+from models import db, User, JobCheckpoint
+
+
+class CheckpointService:
+    """Job checkpoints - pure Python, no Flask imports."""
+
+    @staticmethod
+    def start(name: str, restart: bool = False) -> JobCheckpoint:
+        """
+        Get a job run's checkpoint, creating it on the first run.
+
+        Args:
+            name: Job run name, e.g. 'monthly-summary:2026-09'
+            restart: Discard earlier progress and start from the first user
+
+        Returns:
+            JobCheckpoint (completed_at is set if the run already finished)
+        """
+        checkpoint = db.session.get(JobCheckpoint, name)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(name=name, last_user_id=0, processed=0)
+            db.session.add(checkpoint)
+        elif restart:
+            checkpoint.last_user_id = 0
+            checkpoint.processed = 0
+            checkpoint.started_at = datetime.now(timezone.utc)
+            checkpoint.completed_at = None
+        db.session.commit()
+        return checkpoint
+
+    @staticmethod
+    def user_chunks(checkpoint: JobCheckpoint, chunk_size: int = 1000) -> Iterator[List[int]]:
+        """
+        Iterate the IDs of users after the checkpoint, in ascending chunks.
+
+        Keyset pagination: each chunk is one indexed range query, however
+        far into the table the job is.
+
+        Args:
+            checkpoint: Run checkpoint
+            chunk_size: User IDs per chunk
+
+        Yields:
+            Lists of up to chunk_size user IDs
+        """
+        after = checkpoint.last_user_id
+        while True:
+            user_ids = [
+                user_id for (user_id,) in db.session.query(User.id)
+                .filter(User.id > after)
+                .order_by(User.id)
+                .limit(chunk_size)
+            ]
+            if not user_ids:
+                return
+            yield user_ids
+            after = user_ids[-1]
+
+    @staticmethod
+    def advance(checkpoint: JobCheckpoint, user_ids: List[int]) -> None:
+        """
+        Move the checkpoint past a processed chunk.
+
+        Not committed here: commit it together with the chunk's output.
+
+        Args:
+            checkpoint: Run checkpoint
+            user_ids: The chunk just processed (ascending)
+        """
+        checkpoint.last_user_id = user_ids[-1]
+        checkpoint.processed += len(user_ids)
+        checkpoint.updated_at = datetime.now(timezone.utc)
+
+    @staticmethod
+    def complete(checkpoint: JobCheckpoint) -> None:
+        """Mark a run as finished and commit."""
+        checkpoint.completed_at = datetime.now(timezone.utc)
+        db.session.commit()
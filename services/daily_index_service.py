@@ -0,0 +1,367 @@
+"""DailyIndexService - per-user daily prefix sums for O(1) date-range totals.
+
+The ``daily_spending`` table keeps one row per user per day with spending,
+plus running (cumulative) totals and counts up to that day. The spend
+between any two dates is then
+
+    running(date_to) - running(date_from - 1 day)
+
+where running(d) is the running value of the user's last row on or before
+``d`` - two primary-key index seeks, independent of how many expenses fall
+in the range.
+
+The index is updated from the same flush hook as the monthly rollup (see
+services/rollup_service.py). A write on day ``d`` changes that day's row and
+shifts the running values of every later row, which is one set-based
+UPDATE per user and flush, so back-dated inserts, edits that move an
+expense to another day and deletes all stay exact. Concurrent writers for
+the same user are serialized by locking the user rows first (SELECT ... FOR
+UPDATE); otherwise two transactions could seed from, or shift, the same
+running values and the prefix sums would drift. SQLite serializes write
+transactions by itself.
+
+Methods:
+    apply_deltas() - Apply (amount, count) day deltas to the index
+    rebuild() - Recompute the index from raw expenses (backfill/repair)
+    range_summary() - Total and count between two dates
+    range_totals() - Totals for several date ranges in one query
+    daily_totals() - Per-day totals between two dates
+    heatmap() - Year-long calendar heatmap data
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Expense, DailySpending, User
+
+DayKey = Tuple[int, date]
+
+# Longest heatmap window served (one leap year)
+MAX_HEATMAP_DAYS = 366
+
+
+def _to_decimal(value) -> Decimal:
+    """Convert an amount (None, Decimal, float, int or str) to Decimal."""
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _running_at(user_id: int, day: Optional[date], column):
+    """
+    Build a scalar subquery for a running column as of the end of ``day``.
+
+    Args:
+        user_id: User ID
+        day: Last day included (None = latest row)
+        column: DailySpending.running_total or DailySpending.running_count
+
+    Returns:
+        Scalar subquery, 0 when the user has no spending up to ``day``
+    """
+    query = select(column).where(DailySpending.user_id == user_id)
+    if day is not None:
+        query = query.where(DailySpending.day <= day)
+    return func.coalesce(
+        query.order_by(DailySpending.day.desc()).limit(1).scalar_subquery(), 0
+    )
+
+
+class DailyIndexService:
+    """Daily prefix-sum index maintenance and queries - pure Python, no Flask imports."""
+
+    @staticmethod
+    def apply_deltas(connection, deltas: Dict[DayKey, List]) -> None:
+        """
+        Apply (amount, count) deltas to the daily index.
+
+        Runs on the caller's connection/transaction:
+
+            0. Lock the affected users' rows (in ID order, so concurrent
+               multi-user writers cannot deadlock) until the transaction ends.
+            1. Upsert the per-day totals; new days get NULL running values.
+            2. Seed new days' running values from the nearest earlier day.
+            3. Shift running values of every affected day and all later days
+               by the cumulative delta, one CASE UPDATE per user.
+            4. Prune days whose count dropped to zero.
+
+        Args:
+            connection: SQLAlchemy connection bound to the current transaction
+            deltas: Mapping of (user_id, day) -> [amount, count]
+        """
+        rows = [
+            {'user_id': user_id, 'day': day, 'total': amount, 'count': count,
+             'running_total': None, 'running_count': None}
+            for (user_id, day), (amount, count) in deltas.items()
+            if amount or count
+        ]
+        if not rows:
+            return
+
+        table = DailySpending.__table__
+        dialect_name = connection.dialect.name
+
+        # 0. One writer per user at a time (FOR UPDATE is omitted on SQLite)
+        users = {row['user_id'] for row in rows}
+        connection.execute(
+            select(User.id).where(User.id.in_(users)).order_by(User.id).with_for_update()
+        )
+
+        # 1. Day totals
+        if dialect_name in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite_insert if dialect_name == 'sqlite' else pg_insert
+            stmt = dialect_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.day],
+                set_={
+                    'total': table.c.total + stmt.excluded.total,
+                    'count': table.c.count + stmt.excluded.count,
+                }
+            )
+            connection.execute(stmt)
+        else:
+            for row in rows:
+                result = connection.execute(
+                    update(table)
+                    .where(table.c.user_id == row['user_id'], table.c.day == row['day'])
+                    .values(total=table.c.total + row['total'], count=table.c.count + row['count'])
+                )
+                if result.rowcount == 0:
+                    connection.execute(insert(table).values(**row))
+
+        # 2. Seed new days with the running values of the nearest earlier day
+        earlier = table.alias('earlier')
+
+        def running_before(column_name):
+            return func.coalesce(
+                select(earlier.c[column_name])
+                .where(
+                    earlier.c.user_id == table.c.user_id,
+                    earlier.c.day < table.c.day,
+                    earlier.c.running_total.isnot(None)
+                )
+                .order_by(earlier.c.day.desc())
+                .limit(1)
+                .scalar_subquery(),
+                0
+            )
+
+        connection.execute(
+            update(table)
+            .where(table.c.user_id.in_(users), table.c.running_total.is_(None))
+            .values(
+                running_total=running_before('running_total'),
+                running_count=running_before('running_count')
+            )
+        )
+
+        # 3. Shift running values by the cumulative delta at each day
+        by_user: Dict[int, List] = defaultdict(list)
+        for row in rows:
+            by_user[row['user_id']].append(row)
+
+        for user_id, user_rows in by_user.items():
+            user_rows.sort(key=lambda row: row['day'])
+            amount_steps, count_steps = [], []
+            running_amount, running_count = Decimal(0), 0
+            for row in user_rows:
+                running_amount += row['total']
+                running_count += row['count']
+                amount_steps.append((table.c.day >= row['day'], running_amount))
+                count_steps.append((table.c.day >= row['day'], running_count))
+
+            connection.execute(
+                update(table)
+                .where(table.c.user_id == user_id, table.c.day >= user_rows[0]['day'])
+                .values(
+                    running_total=table.c.running_total + case(*reversed(amount_steps), else_=0),
+                    running_count=table.c.running_count + case(*reversed(count_steps), else_=0)
+                )
+            )
+
+        # 4. Days without expenses carry no information
+        touched_users = {row['user_id'] for row in rows if row['count'] < 0}
+        if touched_users:
+            connection.execute(
+                delete(table).where(
+                    table.c.user_id.in_(touched_users),
+                    table.c.count <= 0
+                )
+            )
+
+    @staticmethod
+    def rebuild(user_id: Optional[int] = None) -> int:
+        """
+        Recompute the daily index from raw expenses in one INSERT ... SELECT.
+
+        Running values are computed with a window SUM over each user's days.
+
+        Args:
+            user_id: Only rebuild this user's index (default: all users)
+
+        Returns:
+            Number of index rows written
+        """
+        table = DailySpending.__table__
+        day_total = func.sum(Expense.amount)
+        day_count = func.count(Expense.id)
+        window = {'partition_by': Expense.user_id, 'order_by': Expense.date}
+
+        source = select(
+            Expense.user_id,
+            Expense.date,
+            day_total,
+            day_count,
+            func.sum(day_total).over(**window),
+            func.sum(day_count).over(**window)
+        ).group_by(Expense.user_id, Expense.date)
+
+        clear = delete(table)
+        if user_id is not None:
+            source = source.where(Expense.user_id == user_id)
+            clear = clear.where(table.c.user_id == user_id)
+
+        try:
+            db.session.execute(clear)
+            result = db.session.execute(
+                insert(table).from_select(
+                    ['user_id', 'day', 'total', 'count', 'running_total', 'running_count'],
+                    source
+                )
+            )
+            db.session.commit()
+            return result.rowcount
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f'Failed to rebuild daily index: {str(e)}')
+
+    @staticmethod
+    def range_summary(
+        user_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Tuple[Decimal, int]:
+        """
+        Get the total and number of expenses in an inclusive date range.
+
+        Args:
+            user_id: User ID
+            date_from: First day (None = unbounded)
+            date_to: Last day (None = unbounded)
+
+        Returns:
+            (total, count)
+        """
+        if date_from and date_to and date_from > date_to:
+            return Decimal(0), 0
+
+        columns = [
+            _running_at(user_id, date_to, DailySpending.running_total),
+            _running_at(user_id, date_to, DailySpending.running_count),
+        ]
+        if date_from is not None:
+            before = date_from - timedelta(days=1)
+            columns += [
+                _running_at(user_id, before, DailySpending.running_total),
+                _running_at(user_id, before, DailySpending.running_count),
+            ]
+
+        row = db.session.execute(select(*columns)).one()
+        total, count = _to_decimal(row[0]), int(row[1] or 0)
+        if date_from is not None:
+            total -= _to_decimal(row[2])
+            count -= int(row[3] or 0)
+        return total, count
+
+    @staticmethod
+    def range_totals(user_id: int, ranges: Sequence[Tuple[date, date]]) -> List[Decimal]:
+        """
+        Get totals for several inclusive date ranges in one query.
+
+        Args:
+            user_id: User ID
+            ranges: (date_from, date_to) pairs
+
+        Returns:
+            One total per range, in the same order
+        """
+        if not ranges:
+            return []
+
+        days = sorted({
+            day
+            for date_from, date_to in ranges
+            for day in (date_from - timedelta(days=1), date_to)
+        })
+        values = db.session.execute(select(*[
+            _running_at(user_id, day, DailySpending.running_total) for day in days
+        ])).one()
+        running = {day: _to_decimal(value) for day, value in zip(days, values)}
+
+        return [
+            running[date_to] - running[date_from - timedelta(days=1)]
+            if date_from <= date_to else Decimal(0)
+            for date_from, date_to in ranges
+        ]
+
+    @staticmethod
+    def daily_totals(user_id: int, date_from: date, date_to: date) -> Dict[date, Decimal]:
+        """
+        Get per-day totals in an inclusive date range.
+
+        Args:
+            user_id: User ID
+            date_from: First day
+            date_to: Last day
+
+        Returns:
+            {day: total, ...} for days with spending, oldest first
+        """
+        results = db.session.query(
+            DailySpending.day,
+            DailySpending.total
+        ).filter(
+            DailySpending.user_id == user_id,
+            DailySpending.day >= date_from,
+            DailySpending.day <= date_to
+        ).order_by(DailySpending.day).all()
+
+        return {day: _to_decimal(total) for day, total in results}
+
+    @staticmethod
+    def heatmap(user_id: int, end: Optional[date] = None, days: int = 365) -> Dict[str, Any]:
+        """
+        Get calendar heatmap data for the ``days`` days ending with ``end``.
+
+        Args:
+            user_id: User ID
+            end: Last day shown (defaults to date.today())
+            days: Window length (clamped to 1..MAX_HEATMAP_DAYS)
+
+        Returns:
+            {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD",
+             "days": {"YYYY-MM-DD": float, ...}, "total": float,
+             "max": float, "active_days": int}
+            where "days" only lists days with spending
+        """
+        end = end or date.today()
+        days = min(max(days, 1), MAX_HEATMAP_DAYS)
+        start = end - timedelta(days=days - 1)
+
+        totals = DailyIndexService.daily_totals(user_id, start, end)
+
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': {day.isoformat(): float(total) for day, total in totals.items()},
+            'total': float(sum(totals.values(), Decimal(0))),
+            'max': float(max(totals.values(), default=Decimal(0))),
+            'active_days': len(totals)
+        }
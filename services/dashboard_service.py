@@ -0,0 +1,101 @@
+"""DashboardSnapshot - headline dashboard numbers in two SQL round trips.
+
+The dashboard header needs today's total, the month total, the month's
+category breakdown, the budget, the unread alert count and the user's
+category list. Instead of one query (or full row load) per number, the
+snapshot runs:
+
+    1. One conditional-aggregation GROUP BY over the spending rollup,
+       giving every category the user has used plus this month's total
+       per category.
+    2. One SELECT of scalar subqueries for today's total, the budget
+       setting and the unread alert count.
+
+Methods:
+    load() - Build the snapshot for a user
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, func, select
+
+from models import db, Expense, Setting, Alert, SpendingRollup
+from services.rollup_service import month_key
+
+
+class DashboardSnapshot:
+    """Dashboard summary queries - pure Python, no Flask imports."""
+
+    @staticmethod
+    def load(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Get the dashboard headline numbers for a user.
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            {"today_total": float, "month": "YYYY-MM", "month_total": float,
+             "category_breakdown": {category: float}, "categories": [str],
+             "budget": float, "budget_warning": bool,
+             "remaining_budget": float or None, "unread_alerts": int}
+        """
+        today = today or date.today()
+        month = month_key(today)
+
+        # Round trip 1: all categories + this month's total per category
+        month_amount = func.sum(
+            case((SpendingRollup.month == month, SpendingRollup.total), else_=0)
+        )
+        rows = db.session.query(
+            SpendingRollup.category,
+            month_amount
+        ).filter(
+            SpendingRollup.user_id == user_id
+        ).group_by(SpendingRollup.category).all()
+
+        # Round trip 2: today's total, budget setting and unread alerts
+        today_total = select(
+            func.coalesce(func.sum(Expense.amount), 0)
+        ).where(
+            Expense.user_id == user_id,
+            Expense.date == today
+        ).scalar_subquery()
+        budget_value = select(Setting.value).where(
+            Setting.user_id == user_id,
+            Setting.key == 'monthly_budget'
+        ).limit(1).scalar_subquery()
+        unread_alerts = select(func.count(Alert.id)).where(
+            Alert.user_id == user_id,
+            Alert.is_read.is_(False)
+        ).scalar_subquery()
+
+        scalars = db.session.execute(
+            select(today_total, budget_value, unread_alerts)
+        ).one()
+
+        category_breakdown = {
+            category: float(amount)
+            for category, amount in rows
+            if amount
+        }
+        month_total = sum(Decimal(str(amount)) for _, amount in rows if amount)
+
+        try:
+            budget = Decimal(scalars[1]) if scalars[1] else Decimal(0)
+        except InvalidOperation:
+            budget = Decimal(0)
+
+        return {
+            'today_total': float(scalars[0] or 0),
+            'month': month,
+            'month_total': float(month_total),
+            'category_breakdown': category_breakdown,
+            'categories': sorted(category for category, _ in rows),
+            'budget': float(budget),
+            'budget_warning': bool(budget) and month_total > budget,
+            'remaining_budget': float(budget - month_total) if budget else None,
+            'unread_alerts': int(scalars[2] or 0)
+        }
@@ -8,11 +8,115 @@ This service handles:
 
 NO Flask imports. Returns clean Python dicts/lists for routes to format.
 """
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime, date, timedelta, timezone
 from decimal import Decimal
+import base64
+import binascii
+import csv
+import io
+
+from sqlalchemy import and_, insert, or_
 
 from models import db, Expense, User, Alert
+from services.rollup_service import RollupService, month_key
+from services.daily_index_service import DailyIndexService
+from services.baseline_service import BaselineService
+from services.anomaly_service import AnomalyService
+from services.version_service import DataVersionService
+
+# pyarrow is optional - only needed for Parquet/Arrow export and import
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Default number of expenses per listing page
+DEFAULT_PAGE_SIZE = 50
+
+# Rows fetched and written per chunk when streaming exports
+EXPORT_CHUNK_SIZE = 1000
+
+# Column order shared by all export formats
+EXPORT_COLUMNS = ['id', 'date', 'title', 'category', 'amount', 'description']
+
+# Export formats -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def _arrow_schema():
+    """Arrow schema for exported expenses (exact Numeric(12, 2) amounts)."""
+    return pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.date32()),
+        ('title', pa.string()),
+        ('category', pa.string()),
+        ('amount', pa.decimal128(12, 2)),
+        ('description', pa.string()),
+    ])
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back in chunks.
+
+    Tracks the absolute position itself so writers that record offsets
+    (the Parquet footer) stay correct after each chunk is drained.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_cursor(expense_date: date, expense_id: int) -> str:
+    """Encode the (date, id) of the last row on a page as an opaque cursor."""
+    raw = f"{expense_date.isoformat()}|{expense_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_str, id_str = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(id_str)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Invalid pagination cursor')
 
 
 class ExpenseService:
@@ -97,6 +201,152 @@ class ExpenseService:
             db.session.rollback()
             raise Exception(f'Failed to create expense: {str(e)}')
     
+    @staticmethod
+    def create_expenses_bulk(user_id: int, items: List[Dict]) -> Dict:
+        """
+        Create many expenses with one multi-row INSERT in one transaction.
+
+        Items that fail validation are reported and skipped; the rest are
+        inserted together. Rollup deltas for the whole batch are applied in
+        a single upsert on the same transaction.
+
+        Args:
+            user_id: Owner user ID
+            items: Expense dicts with title, category, amount, date and
+                optional description. None marks an item that already
+                failed schema validation (it is reported, not inserted).
+
+        Returns:
+            {"success": bool, "created": int, "failed": int,
+             "results": [{"index": int, "success": bool, "id"|"error": ...}]}
+
+        Raises:
+            ValueError: If the user does not exist
+        """
+        if not db.session.get(User, user_id):
+            raise ValueError('User not found')
+
+        today = date.today()
+        results: List[Dict] = []
+        rows: List[Dict] = []
+        row_indexes: List[int] = []
+
+        for index, item in enumerate(items):
+            if item is None:
+                results.append({'index': index, 'success': False, 'error': 'Invalid expense'})
+                continue
+
+            row, error = ExpenseService._build_row(user_id, item, today)
+            if error:
+                results.append({'index': index, 'success': False, 'error': error})
+                continue
+
+            results.append({'index': index, 'success': True})
+            row_indexes.append(index)
+            rows.append(row)
+
+        if rows:
+            try:
+                ids = ExpenseService._insert_rows(user_id, rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                raise Exception(f'Failed to create expenses: {str(e)}')
+
+            for index, expense_id in zip(row_indexes, ids):
+                results[index]['id'] = expense_id
+
+        created = len(rows)
+        return {
+            'success': created > 0,
+            'created': created,
+            'failed': len(items) - created,
+            'results': results
+        }
+
+    @staticmethod
+    def _build_row(user_id: int, item: Dict, today: date) -> Tuple[Optional[Dict], Optional[str]]:
+        """Normalize and validate one bulk item, returning (row, error)."""
+        title = (item.get('title') or '').strip()
+        category = (item.get('category') or '').strip()
+        try:
+            amount = Decimal(str(item.get('amount', 0)))
+        except ArithmeticError:
+            return None, 'Amount must be a valid number'
+        date_obj = item.get('date') or today
+        if isinstance(date_obj, datetime):
+            date_obj = date_obj.date()
+        elif isinstance(date_obj, str):
+            try:
+                date_obj = date.fromisoformat(date_obj)
+            except ValueError:
+                return None, 'Date must be in YYYY-MM-DD format'
+        description = (item.get('description') or '').strip() or None
+
+        if not title or len(title) > 200:
+            return None, 'Title must be 1-200 characters'
+        if not category:
+            return None, 'Category is required'
+        if not amount.is_finite() or amount <= 0 or amount > Decimal('999999999.99'):
+            return None, 'Amount must be positive and ≤ $999,999,999.99'
+        if amount != amount.quantize(Decimal('0.01')):
+            return None, 'Amount must have at most 2 decimal places'
+        if date_obj > today:
+            return None, 'Expense date cannot be in the future'
+
+        return {
+            'user_id': user_id,
+            'title': title,
+            'category': category,
+            'amount': amount,
+            'date': date_obj,
+            'description': description
+        }, None
+
+    @staticmethod
+    def _insert_rows(user_id: int, rows: List[Dict]) -> List[int]:
+        """
+        Insert validated rows with one multi-row INSERT (no commit).
+
+        Bulk INSERT bypasses the flush hooks and the single-expense anomaly
+        check, so the rollup and daily index deltas, the spending baselines,
+        the anomaly scoring and the data version bump are applied here on
+        the same transaction.
+
+        Returns:
+            New expense IDs in the same order as rows
+        """
+        if db.session.get_bind().dialect.name == 'sqlite':
+            # SQLite cannot batch an ordered RETURNING (it would send one
+            # INSERT per row); one statement assigns rowids in VALUES order
+            ids = sorted(db.session.scalars(insert(Expense).returning(Expense.id), rows).all())
+        else:
+            ids = db.session.scalars(
+                insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+
+        deltas = defaultdict(lambda: [Decimal(0), 0])
+        day_deltas = defaultdict(lambda: [Decimal(0), 0])
+        for row in rows:
+            for delta in (deltas[(user_id, month_key(row['date']), row['category'])],
+                          day_deltas[(user_id, row['date'])]):
+                delta[0] += row['amount']
+                delta[1] += 1
+        RollupService.apply_deltas(db.session.connection(), deltas)
+        DailyIndexService.apply_deltas(db.session.connection(), day_deltas)
+        BaselineService.apply(db.session.connection(), [
+            (expense_id, user_id, row['date'], row['category'], row['amount'])
+            for expense_id, row in zip(ids, rows)
+        ])
+        AnomalyService.apply(db.session.connection(), [
+            (expense_id, user_id, row['date'], row['category'], row['amount'], row['title'])
+            for expense_id, row in zip(ids, rows)
+        ])
+        DataVersionService.bump(db.session, [user_id])
+
+        return ids
+
     @staticmethod
     def update_expense(
         user_id: int,
@@ -231,15 +481,151 @@ class ExpenseService:
         }
     
     @staticmethod
-    def list_expenses(
+    def filtered_query(
         user_id: int,
         date_from: Optional[date] = None,
         date_to: Optional[date] = None,
         category: Optional[str] = None,
         month: Optional[str] = None
+    ):
+        """
+        Build the (unordered) expense query for a user's list filters.
+        
+        Raises:
+            ValueError: If month is not in YYYY-MM format
+        """
+        query = Expense.query.filter_by(user_id=user_id)
+        
+        # Apply month filter
+        if month:
+            try:
+                from datetime import datetime
+                month_date = datetime.strptime(month, '%Y-%m').date()
+            except ValueError:
+                raise ValueError('Month must be in YYYY-MM format')
+            first_day = month_date.replace(day=1)
+            # Calculate last day of month
+            next_month = first_day + timedelta(days=32)
+            last_day = next_month.replace(day=1) - timedelta(days=1)
+            query = query.filter(Expense.date >= first_day, Expense.date <= last_day)
+        
+        # Apply date range filters
+        if date_from:
+            query = query.filter(Expense.date >= date_from)
+        if date_to:
+            query = query.filter(Expense.date <= date_to)
+        
+        # Apply category filter
+        if category and category.lower() != 'all':
+            query = query.filter_by(category=category)
+        
+        return query
+    
+    @staticmethod
+    def paginate_query(query, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Expense], Optional[str]]:
+        """
+        Fetch one keyset page of a filtered expense query, newest first.
+        
+        Rows are ordered by (date, id) descending so the idx_user_date index
+        drives the scan; the cursor encodes the last row of the previous page.
+        
+        Args:
+            query: Expense query (e.g. from filtered_query)
+            cursor: Opaque cursor from a previous page (optional)
+            limit: Page size, or None for all remaining rows
+        
+        Returns:
+            Tuple of (expenses, next_cursor or None)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Expense.date < cursor_date,
+                and_(Expense.date == cursor_date, Expense.id < cursor_id)
+            ))
+        
+        query = query.order_by(Expense.date.desc(), Expense.id.desc())
+        if limit is None:
+            return query.all(), None
+        
+        # Fetch one extra row to learn whether another page exists
+        rows = query.limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].date, rows[-1].id)
+    
+    @staticmethod
+    def summarize_query(query) -> Dict:
+        """
+        Aggregate a filtered expense query in a single GROUP BY statement.
+        
+        Returns:
+            {"total": float, "count": int, "by_category": {"category": float, ...}}
+        """
+        results = query.with_entities(
+            Expense.category,
+            db.func.sum(Expense.amount),
+            db.func.count(Expense.id)
+        ).group_by(Expense.category).all()
+        
+        by_category = {category: float(amount or 0) for category, amount, count in results}
+        
+        return {
+            'total': sum(by_category.values()),
+            'count': sum(count for category, amount, count in results),
+            'by_category': by_category
+        }
+    
+    @staticmethod
+    def summarize_range(
+        user_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        month: Optional[str] = None
+    ) -> Dict:
+        """
+        Total and count of all expenses in a date range, from the daily index.
+        
+        Args:
+            user_id: User ID
+            date_from: Start date (optional)
+            date_to: End date (optional)
+            month: Month YYYY-MM, intersected with the date range (optional)
+        
+        Returns:
+            {"total": float, "count": int, "by_category": {}}
+        """
+        if month:
+            first_day = datetime.strptime(month, '%Y-%m').date()
+            last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            date_from = max(date_from, first_day) if date_from else first_day
+            date_to = min(date_to, last_day) if date_to else last_day
+        
+        total, count = DailyIndexService.range_summary(user_id, date_from, date_to)
+        return {'total': float(total), 'count': count, 'by_category': {}}
+    
+    @staticmethod
+    def list_expenses(
+        user_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        category: Optional[str] = None,
+        month: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = DEFAULT_PAGE_SIZE,
+        include_breakdown: bool = True
     ) -> Dict:
         """
-        List expenses with optional filters.
+        List one page of expenses with optional filters.
+        
+        When the per-category breakdown is not needed and there is no
+        category filter, total/count are answered from the daily prefix-sum
+        index (two lookups) instead of aggregating the matching rows.
         
         Args:
             user_id: User ID
@@ -247,38 +633,30 @@ class ExpenseService:
             date_to: End date (optional)
             category: Filter by category (optional)
             month: Filter by month YYYY-MM (optional)
+            cursor: Opaque cursor returned as next_cursor by the previous page
+            limit: Page size (None returns every matching expense)
+            include_breakdown: Compute by_category (empty dict when False)
         
         Returns:
-            {"success": bool, "expenses": [...], "total": float}
+            {"success": bool, "expenses": [...], "total": float, "count": int,
+             "by_category": {...}, "next_cursor": str or None}
+            where total/count/by_category describe the whole filtered set.
+        
+        Raises:
+            ValueError: If month or cursor is malformed
         """
+        query = ExpenseService.filtered_query(user_id, date_from, date_to, category, month)
+        if cursor:
+            decode_cursor(cursor)
+        if limit is not None and limit < 1:
+            raise ValueError('Limit must be at least 1')
+        
         try:
-            query = Expense.query.filter_by(user_id=user_id)
-            
-            # Apply month filter
-            if month:
-                try:
-                    from datetime import datetime
-                    month_date = datetime.strptime(month, '%Y-%m').date()
-                    first_day = month_date.replace(day=1)
-                    # Calculate last day of month
-                    next_month = first_day + timedelta(days=32)
-                    last_day = next_month.replace(day=1) - timedelta(days=1)
-                    query = query.filter(Expense.date >= first_day, Expense.date <= last_day)
-                except ValueError:
-                    raise ValueError('Month must be in YYYY-MM format')
-            
-            # Apply date range filters
-            if date_from:
-                query = query.filter(Expense.date >= date_from)
-            if date_to:
-                query = query.filter(Expense.date <= date_to)
-            
-            # Apply category filter
-            if category and category.lower() != 'all':
-                query = query.filter_by(category=category)
-            
-            # Execute query and sort
-            expenses = query.order_by(Expense.date.desc()).all()
+            expenses, next_cursor = ExpenseService.paginate_query(query, cursor, limit)
+            if include_breakdown or (category and category.lower() != 'all'):
+                summary = ExpenseService.summarize_query(query)
+            else:
+                summary = ExpenseService.summarize_range(user_id, date_from, date_to, month)
             
             # Format response
             expense_list = [
@@ -295,13 +673,13 @@ class ExpenseService:
                 for e in expenses
             ]
             
-            total_spent = sum(float(e.amount) for e in expenses)
-            
             return {
                 'success': True,
                 'expenses': expense_list,
-                'total': total_spent,
-                'count': len(expense_list)
+                'total': summary['total'],
+                'count': summary['count'],
+                'by_category': summary['by_category'],
+                'next_cursor': next_cursor
             }
         
         except Exception as e:
@@ -320,7 +698,7 @@ class ExpenseService:
     @staticmethod
     def get_month_total(user_id: int, month: Optional[str] = None) -> float:
         """
-        Get total expenses for a month.
+        Get total expenses for a month, read from the spending rollup.
         
         Args:
             user_id: User ID
@@ -335,95 +713,281 @@ class ExpenseService:
         else:
             month_date = date.today()
         
-        first_day = month_date.replace(day=1)
-        next_month = first_day + timedelta(days=32)
-        last_day = next_month.replace(day=1) - timedelta(days=1)
-        
-        result = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.user_id == user_id,
-            Expense.date >= first_day,
-            Expense.date <= last_day
-        ).scalar()
-        
-        return float(result) if result else 0.0
+        total = RollupService.get_month_total(user_id, month_date.strftime('%Y-%m'))
+        return float(total)
     
     @staticmethod
     def get_category_breakdown(user_id: int, month: Optional[str] = None) -> Dict[str, float]:
         """
-        Get spending breakdown by category.
+        Get spending breakdown by category, read from the spending rollup.
         
         Returns:
             {"category1": amount1, "category2": amount2, ...}
         """
-        query = db.session.query(
-            Expense.category,
-            db.func.sum(Expense.amount)
-        ).filter_by(user_id=user_id)
+        month_key = None
         
         # Filter by month if provided
         if month:
             try:
                 from datetime import datetime
-                month_date = datetime.strptime(month, '%Y-%m').date()
+                month_key = datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
             except ValueError:
                 raise ValueError('Month must be in YYYY-MM format')
-            
-            first_day = month_date.replace(day=1)
-            next_month = first_day + timedelta(days=32)
-            last_day = next_month.replace(day=1) - timedelta(days=1)
-            
-            query = query.filter(
-                Expense.date >= first_day,
-                Expense.date <= last_day
-            )
         
-        results = query.group_by(Expense.category).all()
+        totals = RollupService.get_category_totals(user_id, month_key, month_key)
         
         return {
             category: float(amount)
-            for category, amount in results
+            for category, (amount, count) in totals.items()
             if category
         }
     
+    @staticmethod
+    def stream_csv(user_id: int, filters: Dict, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Stream expenses as CSV, one chunk of rows at a time.
+        
+        Rows are fetched with yield_per (a server-side cursor where the
+        driver supports it) and only plain column tuples are loaded, so at
+        most one chunk is held in memory regardless of export size.
+        
+        Args:
+            user_id: Owner user ID
+            filters: date_from, date_to, category and month list filters
+            chunk_size: Rows fetched and written per chunk
+        
+        Returns:
+            Iterator of CSV text chunks, header first
+        
+        Raises:
+            ValueError: If a filter is invalid (raised before streaming starts)
+        """
+        query = ExpenseService.filtered_query(
+            user_id,
+            date_from=filters.get('date_from'),
+            date_to=filters.get('date_to'),
+            category=filters.get('category'),
+            month=filters.get('month')
+        ).with_entities(
+            Expense.id, Expense.date, Expense.title,
+            Expense.category, Expense.amount, Expense.description
+        ).order_by(Expense.date.desc(), Expense.id.desc())
+        
+        rows = query.execution_options(stream_results=True).yield_per(chunk_size)
+        
+        def generate() -> Iterator[str]:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            pending = 1
+            
+            for row in rows:
+                writer.writerow([
+                    row.id,
+                    row.date.isoformat(),
+                    row.title,
+                    row.category,
+                    f"{row.amount:.2f}",
+                    row.description or ''
+                ])
+                pending += 1
+                if pending >= chunk_size:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+                    pending = 0
+            
+            if pending:
+                yield buffer.getvalue()
+        
+        return generate()
+    
     @staticmethod
     def export_to_csv(user_id: int, filters: Dict) -> str:
         """
         Export expenses to CSV format.
         
+        Prefer stream_csv() for HTTP responses; this joins the stream.
+        
         Returns:
             CSV string (rows)
         """
         try:
-            # Get filtered expenses
-            result = ExpenseService.list_expenses(
-                user_id,
-                date_from=filters.get('date_from'),
-                date_to=filters.get('date_to'),
-                category=filters.get('category'),
-                month=filters.get('month')
-            )
-            
-            expenses = result['expenses']
-            
-            # Build CSV
-            import csv
-            import io
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['id', 'date', 'title', 'category', 'amount', 'description'])
+            return ''.join(ExpenseService.stream_csv(user_id, filters))
+        except Exception as e:
+            raise Exception(f'Failed to export expenses: {str(e)}')
+
+    @staticmethod
+    def stream_columnar(
+        user_id: int,
+        filters: Dict,
+        fmt: str = 'parquet',
+        chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> Tuple[Iterator[bytes], str]:
+        """
+        Stream expenses as Parquet (or Arrow IPC) in row-group batches.
+        
+        Each chunk of rows from the query becomes one Parquet row group (or
+        one Arrow record batch) and is flushed to the caller before the next
+        chunk is read. Dates stay Date and amounts stay exact decimal(12, 2).
+        
+        Args:
+            user_id: Owner user ID
+            filters: date_from, date_to, category and month list filters
+            fmt: 'parquet' or 'arrow'; parquet falls back to arrow when
+                pyarrow was built without Parquet support
+            chunk_size: Rows per row group / record batch
+        
+        Returns:
+            Tuple of (byte chunk iterator, format actually used)
+        
+        Raises:
+            ValueError: If pyarrow is missing, fmt is unknown or a filter is invalid
+        """
+        if not HAS_PYARROW:
+            raise ValueError('Parquet/Arrow export requires pyarrow')
+        if fmt not in ('parquet', 'arrow'):
+            raise ValueError(f'Unsupported export format: {fmt}')
+        if fmt == 'parquet' and not HAS_PARQUET:
+            fmt = 'arrow'
+        
+        query = ExpenseService.filtered_query(
+            user_id,
+            date_from=filters.get('date_from'),
+            date_to=filters.get('date_to'),
+            category=filters.get('category'),
+            month=filters.get('month')
+        ).with_entities(
+            Expense.id, Expense.date, Expense.title,
+            Expense.category, Expense.amount, Expense.description
+        ).order_by(Expense.date.desc(), Expense.id.desc())
+        
+        result = db.session.execute(
+            query.statement.execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        schema = _arrow_schema()
+        
+        def generate() -> Iterator[bytes]:
+            sink = _StreamSink()
+            if fmt == 'parquet':
+                writer = pq.ParquetWriter(sink, schema)
+            else:
+                writer = pa.ipc.new_stream(sink, schema)
             
-            for expense in expenses:
-                writer.writerow([
-                    expense['id'],
-                    expense['date'],
-                    expense['title'],
-                    expense['category'],
-                    f"{expense['amount']:.2f}",
-                    expense['description'] or ''
-                ])
+            try:
+                for partition in result.partitions():
+                    columns = list(zip(*partition))
+                    batch = pa.record_batch(
+                        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                        schema=schema
+                    )
+                    if fmt == 'parquet':
+                        writer.write_batch(batch, row_group_size=len(partition))
+                    else:
+                        writer.write_batch(batch)
+                    yield sink.drain()
+            finally:
+                writer.close()
+                result.close()
             
-            return output.getvalue()
+            yield sink.drain()
+        
+        return generate(), fmt
+    
+    @staticmethod
+    def export_stream(user_id: int, filters: Dict, fmt: str = 'csv') -> Tuple[Iterator, str, str]:
+        """
+        Pick the streaming exporter for a format.
+        
+        Args:
+            user_id: Owner user ID
+            filters: date_from, date_to, category and month list filters
+            fmt: 'csv', 'parquet' or 'arrow'
+        
+        Returns:
+            Tuple of (chunk iterator, mimetype, download filename)
+        
+        Raises:
+            ValueError: If the format or a filter is invalid
+        """
+        if fmt == 'csv':
+            stream = ExpenseService.stream_csv(user_id, filters)
+        else:
+            stream, fmt = ExpenseService.stream_columnar(user_id, filters, fmt)
+        
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        return stream, mimetype, f'expenses.{extension}'
+    
+    @staticmethod
+    def import_columnar(user_id: int, source, batch_size: int = EXPORT_CHUNK_SIZE) -> Dict:
+        """
+        Bulk import expenses from a Parquet or Arrow IPC file.
         
+        Record batches are read one at a time and inserted with one
+        multi-row INSERT each; the whole import is a single transaction, so
+        an invalid row rejects the file. Files written by stream_columnar
+        round-trip exactly (the id column is ignored).
+        
+        Args:
+            user_id: Owner user ID
+            source: Path or binary file object with Parquet or Arrow IPC data
+            batch_size: Rows per record batch when reading Parquet
+        
+        Returns:
+            {"success": bool, "imported": int, "message": str}
+        
+        Raises:
+            ValueError: If pyarrow is missing, the file is unreadable or a row is invalid
+        """
+        if not HAS_PYARROW:
+            raise ValueError('Parquet/Arrow import requires pyarrow')
+        if not db.session.get(User, user_id):
+            raise ValueError('User not found')
+        
+        try:
+            data = pa.BufferReader(source.read()) if hasattr(source, 'read') else pa.memory_map(source)
+            magic = data.read(4)
+            data.seek(0)
+            if magic == b'PAR1':
+                if not HAS_PARQUET:
+                    raise ValueError('Parquet import requires pyarrow with Parquet support')
+                batches = pq.ParquetFile(data).iter_batches(batch_size=batch_size)
+            elif magic == b'ARRO':
+                batches = iter(pa.ipc.open_file(data))
+            else:
+                batches = iter(pa.ipc.open_stream(data))
+        except pa.ArrowException as e:
+            raise ValueError(f'Unreadable Parquet/Arrow file: {str(e)}')
+        
+        today = date.today()
+        imported = 0
+        try:
+            for batch in batches:
+                missing = {'date', 'title', 'category', 'amount'} - set(batch.schema.names)
+                if missing:
+                    raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+                
+                rows = []
+                for item in batch.to_pylist():
+                    row, error = ExpenseService._build_row(user_id, item, today)
+                    if error:
+                        raise ValueError(f'Row {imported + len(rows) + 1}: {error}')
+                    rows.append(row)
+                
+                if rows:
+                    ExpenseService._insert_rows(user_id, rows)
+                    imported += len(rows)
+            
+            db.session.commit()
+        except ValueError:
+            db.session.rollback()
+            raise
         except Exception as e:
-            raise Exception(f'Failed to export expenses: {str(e)}')
+            db.session.rollback()
+            raise Exception(f'Failed to import expenses: {str(e)}')
+        
+        return {
+            'success': True,
+            'imported': imported,
+            'message': f'Imported {imported} expenses'
+        }
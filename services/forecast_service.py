@@ -0,0 +1,425 @@
+"""ForecastService - stored next-month spending forecasts.
+
+Fitting ARIMA(1,1,1) (services/ai_service.SpendingForecaster) costs hundreds
+of milliseconds of CPU, but its input - a user's completed monthly totals -
+only changes on a month rollover or an edit to a past month. Fitted
+forecasts are stored in ``spending_forecast`` keyed by (user, series
+version), where the version is a hash of the completed-month series.
+Expenses added in the current month leave it unchanged, so the common write
+path never invalidates a forecast.
+
+Lookups have a latency budget (``FORECAST_LATENCY_BUDGET_MS``):
+    - a stored forecast for the current series version is served as is
+    - otherwise the fit is queued on a small background pool - one fit per
+      user at a time, however many requests ask - and the lookup waits up
+      to the budget for it; if the fit is not done by then, a closed-form
+      trend estimate is served and later lookups pick up the stored fit
+The refresher (``flask refresh-forecasts``, run nightly) refits stored
+forecasts whose series changed, so month rollovers and back-dated edits
+are fitted before the next lookup.
+
+Without statsmodels installed, fits store the closed-form estimate.
+
+Methods:
+    configure() - (Re)build the fit pool and latency budget
+    series() - A user's completed monthly totals and their version
+    estimate() - Closed-form forecast with a residual-based interval
+    get_forecast() - Stored forecast, or an estimate while the fit runs
+    fit() - Fit and store a user's forecast
+    refresh() - Refit stored forecasts whose series changed
+    join() - Wait for queued fits
+    stats() - Lookup, fit and queue metrics
+"""
+import hashlib
+import importlib.util
+import logging
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import nullcontext
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SpendingForecast
+from services.rollup_service import RollupService, month_key, shift_month
+
+# statsmodels/scikit-learn are optional - without them fits store the
+# closed-form estimate. Checked here, imported on the first fit (slow import)
+HAS_ARIMA = all(importlib.util.find_spec(name) is not None for name in ('statsmodels', 'sklearn'))
+
+logger = logging.getLogger(__name__)
+
+# Completed months fed to a fit
+FORECAST_HISTORY_MONTHS = 24
+# Fewer completed months than this yield no forecast
+MIN_HISTORY_MONTHS = 3
+# Recent months used by the closed-form trend
+ESTIMATE_WINDOW_MONTHS = 6
+# Fit timings kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+Series = Tuple[List[str], List[float], str]
+
+
+def _summary_ms(samples) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as mean/p50/p95/max milliseconds."""
+    if not samples:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'mean': round(statistics.fmean(ordered) * 1000, 2),
+        'p50': round(ordered[len(ordered) // 2] * 1000, 2),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _as_result(row: SpendingForecast, cached: bool) -> Dict[str, Any]:
+    """Format a stored forecast as the lookup result."""
+    return {
+        'forecast': float(row.forecast),
+        'lower_bound': float(row.lower_bound),
+        'upper_bound': float(row.upper_bound),
+        'confidence': row.confidence,
+        'month': row.month,
+        'method': row.method,
+        'series_version': row.series_version,
+        'cached': cached,
+        'pending': False,
+        'status': 'success',
+    }
+
+
+class _FitQueue:
+    """Background fit pool with per-user de-duplication and counters."""
+
+    def __init__(
+        self,
+        workers: int = 0,
+        latency_budget_ms: float = 0.0,
+        context: Optional[Callable[[], ContextManager]] = None
+    ):
+        self.workers = max(workers, 0)
+        self.latency_budget = max(latency_budget_ms, 0.0) / 1000
+        self.context = context or nullcontext
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='forecast-fit'
+        ) if self.workers else None
+
+        self._lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.estimates = 0
+        self.fits = 0
+        self.fit_errors = 0
+        self.fit_seconds: List[float] = []
+
+    def submit(self, user_id: int, today: date) -> Future:
+        """Queue a user's fit, or return the one already queued."""
+        with self._lock:
+            future = self.pending.get(user_id)
+            if future is not None:
+                return future
+            if self.executor is None:
+                future = Future()
+                self.pending[user_id] = future
+            else:
+                future = self.executor.submit(self._run, user_id, today)
+                self.pending[user_id] = future
+                return future
+
+        # Inline (workers=0): fit on the caller, inside its app context
+        try:
+            future.set_result(ForecastService.fit(user_id, today))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self.pending.pop(user_id, None)
+        return future
+
+    def _run(self, user_id: int, today: date) -> Dict[str, Any]:
+        try:
+            with self.context():
+                return ForecastService.fit(user_id, today)
+        finally:
+            with self._lock:
+                self.pending.pop(user_id, None)
+
+    def record_fit(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.fits += 1
+            self.fit_errors += 0 if ok else 1
+            self.fit_seconds.append(seconds)
+            del self.fit_seconds[:-LATENCY_SAMPLES]
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def shutdown(self) -> None:
+        """Stop accepting fits; running fits finish in the background."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+_queue = _FitQueue()
+
+
+class ForecastService:
+    """Stored spending forecasts - pure Python, no Flask imports."""
+
+    @staticmethod
+    def configure(
+        workers: int = 0,
+        latency_budget_ms: float = 0.0,
+        context: Optional[Callable[[], ContextManager]] = None
+    ) -> None:
+        """
+        Replace the fit pool and latency budget (called by the app factory).
+
+        Args:
+            workers: Background fit threads (0 = fit inline on the caller)
+            latency_budget_ms: How long a lookup waits for a queued fit
+            context: Factory of the context fits run in (e.g. app.app_context)
+        """
+        global _queue
+        previous, _queue = _queue, _FitQueue(workers, latency_budget_ms, context)
+        previous.shutdown()
+
+    @staticmethod
+    def series(user_id: int, today: Optional[date] = None) -> Series:
+        """
+        Get a user's completed monthly totals and the series version.
+
+        The series runs from the first month with spending in the last
+        FORECAST_HISTORY_MONTHS through last month; months without spending
+        inside it count as 0. The current month is never part of it.
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            (months, totals, version) - version is '' for an empty series
+        """
+        today = today or date.today()
+        last = shift_month(today, -1)
+        first = shift_month(today, -FORECAST_HISTORY_MONTHS)
+        totals = RollupService.get_monthly_range(user_id, month_key(first), month_key(last))
+        if not totals:
+            return [], [], ''
+
+        months = []
+        day = date(*map(int, min(totals).split('-')), 1)
+        while day <= last:
+            months.append(month_key(day))
+            day = shift_month(day, 1)
+
+        values = [float(totals.get(month, Decimal(0))) for month in months]
+        fingerprint = '|'.join(f"{month}={totals.get(month, Decimal(0)):.2f}" for month in months)
+        version = hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+        return months, values, version
+
+    @staticmethod
+    def estimate(values: List[float]) -> Optional[Dict[str, float]]:
+        """
+        Closed-form next-value forecast: least-squares trend over recent months.
+
+        Args:
+            values: Monthly totals, oldest first
+
+        Returns:
+            {"forecast", "lower_bound", "upper_bound", "confidence"}, or None
+            with fewer than MIN_HISTORY_MONTHS values
+        """
+        if len(values) < MIN_HISTORY_MONTHS:
+            return None
+
+        recent = values[-ESTIMATE_WINDOW_MONTHS:]
+        n = len(recent)
+        x_mean = (n - 1) / 2
+        y_mean = sum(recent) / n
+        sxx = sum((x - x_mean) ** 2 for x in range(n))
+        slope = sum((x - x_mean) * (y - y_mean) for x, y in enumerate(recent)) / sxx
+        intercept = y_mean - slope * x_mean
+
+        residuals = [y - (intercept + slope * x) for x, y in enumerate(recent)]
+        spread = math.sqrt(sum(r * r for r in residuals) / max(n - 2, 1))
+        forecast = max(intercept + slope * n, 0.0)
+        margin = 1.96 * spread * math.sqrt(1 + 1 / n + (n - x_mean) ** 2 / sxx)
+        return {
+            'forecast': forecast,
+            'lower_bound': max(forecast - margin, 0.0),
+            'upper_bound': forecast + margin,
+            'confidence': 0.95,
+        }
+
+    @staticmethod
+    def fit(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Fit a user's forecast and store it under the current series version.
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            Forecast result (see get_forecast), or {"forecast": None,
+            "status": "insufficient_data"}
+        """
+        today = today or date.today()
+        months, values, version = ForecastService.series(user_id, today)
+        if len(values) < MIN_HISTORY_MONTHS:
+            return {'forecast': None, 'status': 'insufficient_data'}
+
+        start = time.perf_counter()
+        method, result = 'closed_form', None
+        if HAS_ARIMA:
+            from services.ai_service import SpendingForecaster
+            fitted = SpendingForecaster.forecast_next_month(dict(zip(months, values)))
+            if fitted.get('status') == 'success':
+                method, result = 'arima', fitted
+        if result is None:
+            result = ForecastService.estimate(values)
+        elapsed = time.perf_counter() - start
+        _queue.record_fit(elapsed, method == 'arima' or not HAS_ARIMA)
+
+        row = db.session.get(SpendingForecast, user_id)
+        if row is None:
+            row = SpendingForecast(user_id=user_id)
+            db.session.add(row)
+        row.series_version = version
+        row.month = month_key(today)
+        row.method = method
+        row.forecast = Decimal(str(round(result['forecast'], 2)))
+        row.lower_bound = Decimal(str(round(result['lower_bound'], 2)))
+        row.upper_bound = Decimal(str(round(result['upper_bound'], 2)))
+        row.confidence = result.get('confidence', 0.95)
+        row.history_months = len(values)
+        row.fit_ms = round(elapsed * 1000, 2)
+        row.fitted_at = datetime.now(timezone.utc)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process stored this user's first fit concurrently
+            db.session.rollback()
+        return _as_result(row, cached=False)
+
+    @staticmethod
+    def get_forecast(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Get a user's next-month forecast within the latency budget.
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            {"forecast": float, "lower_bound": float, "upper_bound": float,
+             "confidence": float, "month": "YYYY-MM", "method": "arima" or
+             "closed_form", "series_version": str, "cached": bool,
+             "pending": bool (a fit is still running), "status": "success"}
+            or {"forecast": None, "status": "insufficient_data"}
+        """
+        today = today or date.today()
+        months, values, version = ForecastService.series(user_id, today)
+        if len(values) < MIN_HISTORY_MONTHS:
+            return {'forecast': None, 'status': 'insufficient_data'}
+
+        row = db.session.get(SpendingForecast, user_id)
+        if row is not None and row.series_version == version and row.month == month_key(today):
+            _queue.count('hits')
+            return _as_result(row, cached=True)
+
+        _queue.count('misses')
+        future = _queue.submit(user_id, today)
+        try:
+            result = future.result(timeout=_queue.latency_budget)
+            if result.get('status') == 'success':
+                return result
+        except FutureTimeout:
+            pass
+        except Exception as e:
+            logger.error(f"Forecast fit for user {user_id} failed: {str(e)}")
+
+        _queue.count('estimates')
+        estimate = ForecastService.estimate(values)
+        return dict(
+            estimate,
+            month=month_key(today),
+            method='closed_form',
+            series_version=version,
+            cached=False,
+            pending=not future.done(),
+            status='success'
+        )
+
+    @staticmethod
+    def refresh(today: Optional[date] = None) -> Dict[str, int]:
+        """
+        Refit every stored forecast whose series or month changed.
+
+        Args:
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            {"checked": int, "refitted": int}
+        """
+        today = today or date.today()
+        month = month_key(today)
+        counts = {'checked': 0, 'refitted': 0}
+        stored = db.session.query(
+            SpendingForecast.user_id, SpendingForecast.series_version, SpendingForecast.month
+        ).order_by(SpendingForecast.user_id).all()
+        db.session.commit()
+
+        for user_id, stored_version, stored_month in stored:
+            counts['checked'] += 1
+            _, _, version = ForecastService.series(user_id, today)
+            if version != stored_version or stored_month != month:
+                ForecastService.fit(user_id, today)
+                counts['refitted'] += 1
+        return counts
+
+    @staticmethod
+    def join(timeout: Optional[float] = None) -> None:
+        """Wait for the fits queued so far (tests, CLI)."""
+        with _queue._lock:
+            futures = list(_queue.pending.values())
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """
+        Get forecast metrics for this process.
+
+        Returns:
+            {"arima": bool, "workers", "latency_budget_ms", "queued", "hits",
+             "misses", "estimates", "fits", "fit_errors",
+             "fit_ms": {"mean", "p50", "p95", "max"}}
+        """
+        queue = _queue
+        with queue._lock:
+            return {
+                'arima': HAS_ARIMA,
+                'workers': queue.workers,
+                'latency_budget_ms': queue.latency_budget * 1000,
+                'queued': len(queue.pending),
+                'hits': queue.hits,
+                'misses': queue.misses,
+                'estimates': queue.estimates,
+                'fits': queue.fits,
+                'fit_errors': queue.fit_errors,
+                'fit_ms': _summary_ms(queue.fit_seconds),
+            }
@@ -0,0 +1,284 @@
+"""PasswordService - bounded password hashing with a work factor policy.
+
+Password hashes are deliberately expensive, and a burst of logins used to
+start one hash per request with no limit. Hashes and checks now pass an
+admission limit per process:
+
+    - at most ``workers`` hashes run at once and at most ``queue_limit``
+      more wait; anything beyond that fails fast with HashingBusyError
+      (503 + Retry-After) instead of stacking up behind the burst
+    - ``executor='thread'`` (default) hashes on the calling thread once it
+      holds one of the ``workers`` slots - no hand-off to another thread
+    - ``executor='process'`` runs the hash in a worker process, keeping
+      the CPU work off the web process's cores
+    - ``workers=0`` hashes inline with no limit
+
+The caller still waits for its own hash; what the limit buys is that the
+other requests of the process keep running while a login burst is shed.
+That only matters when one process serves concurrent requests (gthread or
+gevent workers). Sync workers handle one request at a time, so the limit
+never engages there; run them with ``workers=0``.
+
+The work factor is the werkzeug method string (``PASSWORD_HASH_METHOD``,
+e.g. ``pbkdf2:sha256:1000000`` or ``scrypt:32768:8:1``). When a login
+succeeds against a hash made with other parameters, the password is
+rehashed with the current ones - unless logins are already queueing, in
+which case the upgrade waits for a quieter login of the same user.
+
+Methods:
+    configure() - (Re)build the hashing limit and cost policy
+    hash() - Hash a password with the configured method
+    verify() - Check a password against a stored hash
+    needs_rehash() - Whether a stored hash uses other parameters
+    verify_and_update() - Check a user's password, upgrading its hash
+    stats() - Hash latency and queue depth metrics
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from models import db, User
+
+DEFAULT_METHOD = 'pbkdf2:sha256'
+DEFAULT_SALT_LENGTH = 16
+
+# Latency samples kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when the hashing slots and their queue are full."""
+
+
+def _timed_hash(password: str, method: str, salt_length: int) -> Tuple[str, float]:
+    """Hash a password; returns (hash, seconds). Runs admitted."""
+    start = time.perf_counter()
+    value = generate_password_hash(password, method=method, salt_length=salt_length)
+    return value, time.perf_counter() - start
+
+
+def _timed_check(pwhash: str, password: str) -> Tuple[bool, float]:
+    """Check a password; returns (matches, seconds). Runs admitted."""
+    start = time.perf_counter()
+    value = check_password_hash(pwhash, password)
+    return value, time.perf_counter() - start
+
+
+def _summary_ms(samples) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as mean/p50/p95/max milliseconds."""
+    if not samples:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'mean': round(statistics.fmean(ordered) * 1000, 2),
+        'p50': round(ordered[len(ordered) // 2] * 1000, 2),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+
+class _HashPool:
+    """Admission limit (and optional process pool), cost policy and latency counters."""
+
+    def __init__(
+        self,
+        method: str = DEFAULT_METHOD,
+        salt_length: int = DEFAULT_SALT_LENGTH,
+        workers: int = 0,
+        queue_limit: int = 0,
+        executor: str = 'thread'
+    ):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = max(workers, 0)
+        self.queue_limit = max(queue_limit, 0)
+        self.kind = executor if self.workers else 'inline'
+
+        self.executor = None
+        if executor == 'process' and self.workers:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(self.workers) if self.workers else None
+
+        self._lock = threading.Lock()
+        self._method_prefix: Optional[str] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.hash_seconds: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.wait_seconds: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def queued(self) -> int:
+        """Jobs admitted but waiting for a free worker."""
+        if not self.workers:
+            return 0
+        return max(self.in_flight - self.workers, 0)
+
+    @property
+    def method_prefix(self) -> str:
+        """Fully-specified method of the current policy, e.g. 'pbkdf2:sha256:1000000'."""
+        if self._method_prefix is None:
+            value, _ = _timed_hash('', self.method, self.salt_length)
+            self._method_prefix = value.split('$', 1)[0]
+        return self._method_prefix
+
+    def run(self, fn: Callable, *args) -> Any:
+        """
+        Run a timed hashing function once admitted and return its result.
+
+        Thread mode runs it on the calling thread while holding a slot;
+        process mode waits for it on the process pool.
+
+        Raises:
+            HashingBusyError: If workers + queue_limit jobs are already admitted
+        """
+        with self._lock:
+            if self.workers and self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HashingBusyError('Server is busy, please try again shortly')
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        submitted = time.perf_counter()
+        try:
+            if self.executor is not None:
+                value, elapsed = self.executor.submit(fn, *args).result()
+            elif self._slots is not None:
+                with self._slots:
+                    value, elapsed = fn(*args)
+            else:
+                value, elapsed = fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.completed += 1
+            self.hash_seconds.append(elapsed)
+            self.wait_seconds.append(max(time.perf_counter() - submitted - elapsed, 0.0))
+        return value
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running jobs finish in the background."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+_pool = _HashPool()
+
+
+class PasswordService:
+    """Bounded password hashing - pure Python, no Flask imports."""
+
+    @staticmethod
+    def configure(
+        method: str = DEFAULT_METHOD,
+        salt_length: int = DEFAULT_SALT_LENGTH,
+        workers: int = 0,
+        queue_limit: int = 0,
+        executor: str = 'thread'
+    ) -> None:
+        """
+        Replace the hashing limit and cost policy (called by the app factory).
+
+        Args:
+            method: werkzeug hash method including its cost parameters
+            salt_length: Salt length for new hashes
+            workers: Concurrent hashes (0 = no limit)
+            queue_limit: Jobs allowed to wait for a worker
+            executor: 'thread' or 'process'
+        """
+        global _pool
+        previous, _pool = _pool, _HashPool(method, salt_length, workers, queue_limit, executor)
+        previous.shutdown()
+
+    @staticmethod
+    def hash(password: str) -> str:
+        """
+        Hash a password with the configured method.
+
+        Raises:
+            HashingBusyError: If the hashing queue is full
+        """
+        return _pool.run(_timed_hash, password, _pool.method, _pool.salt_length)
+
+    @staticmethod
+    def verify(pwhash: str, password: str) -> bool:
+        """
+        Check a password against a stored hash.
+
+        Raises:
+            HashingBusyError: If the hashing queue is full
+        """
+        return _pool.run(_timed_check, pwhash, password)
+
+    @staticmethod
+    def needs_rehash(pwhash: str) -> bool:
+        """Check whether a stored hash was made with other method/cost parameters."""
+        return pwhash.split('$', 1)[0] != _pool.method_prefix
+
+    @staticmethod
+    def verify_and_update(user: User, password: str) -> bool:
+        """
+        Check a user's password and upgrade an outdated hash.
+
+        The upgrade is skipped while other hashes are queueing, and a failed
+        upgrade never fails the login; either way it is retried next login.
+
+        Args:
+            user: User whose password is checked
+            password: Password supplied at login
+
+        Returns:
+            True if the password matches
+
+        Raises:
+            HashingBusyError: If the hashing queue is full
+        """
+        if not PasswordService.verify(user.password, password):
+            return False
+
+        if PasswordService.needs_rehash(user.password) and not _pool.queued:
+            try:
+                user.password = PasswordService.hash(password)
+                db.session.commit()
+                with _pool._lock:
+                    _pool.rehashed += 1
+            except Exception:
+                db.session.rollback()
+        return True
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """
+        Get password hashing metrics for this process.
+
+        Returns:
+            {"method", "executor", "workers", "queue_limit", "in_flight",
+             "queued", "peak_in_flight", "completed", "rejected", "rehashed",
+             "hash_ms": {"mean", "p50", "p95", "max"}, "wait_ms": {...}}
+            where hash_ms is time spent hashing and wait_ms time spent queued
+        """
+        pool = _pool
+        with pool._lock:
+            return {
+                'method': pool.method,
+                'executor': pool.kind,
+                'workers': pool.workers,
+                'queue_limit': pool.queue_limit,
+                'in_flight': pool.in_flight,
+                'queued': pool.queued,
+                'peak_in_flight': pool.peak_in_flight,
+                'completed': pool.completed,
+                'rejected': pool.rejected,
+                'rehashed': pool.rehashed,
+                'hash_ms': _summary_ms(pool.hash_seconds),
+                'wait_ms': _summary_ms(pool.wait_seconds),
+            }
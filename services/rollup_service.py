@@ -0,0 +1,366 @@
+"""RollupService - incremental per-user monthly/category spending totals.
+
+Every flush that inserts, edits or deletes an Expense is translated into
+(user_id, month, category) deltas that are upserted into the
+``spending_rollup`` table on the same connection, i.e. inside the same
+transaction as the expense write itself. Read paths (month totals, category
+breakdowns, monthly trends) then aggregate a few rollup rows instead of the
+user's entire expense history. The same deltas, keyed by day, maintain the
+daily prefix-sum index (see services/daily_index_service.py).
+
+Methods:
+    register_listeners() - Hook rollup maintenance into SQLAlchemy flushes
+    apply_deltas() - Upsert (amount, count) deltas into the rollup table
+    rebuild() - Recompute rollups from raw expenses (backfill/repair)
+    get_month_total() - Total spent by a user in one month
+    get_monthly_totals() - Totals for a set of months
+    get_monthly_range() - Totals per month over a month range
+    get_category_totals() - Per-category totals for a month range
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, Expense, SpendingRollup, User
+from services.daily_index_service import DailyIndexService
+
+RollupKey = Tuple[int, str, str]
+
+# Expense attributes that determine which rollup bucket a row lands in
+_TRACKED_ATTRS = ('user_id', 'date', 'category', 'amount')
+_OLD_ROWS_KEY = 'rollup_old_rows'
+
+
+def month_key(day: date) -> str:
+    """Return the YYYY-MM rollup bucket for a date."""
+    return f"{day.year}-{day.month:02d}"
+
+
+def shift_month(day: date, months: int) -> date:
+    """Return the first day of the month ``months`` calendar months from ``day``."""
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_keys(end: date, months: int) -> List[str]:
+    """Return the YYYY-MM keys of the ``months`` calendar months ending with ``end``'s month."""
+    return [month_key(shift_month(end, offset)) for offset in range(-(months - 1), 1)]
+
+
+def month_bucket(column, dialect_name: str):
+    """
+    Build a SQL expression that truncates a date column to 'YYYY-MM'.
+
+    Args:
+        column: Date column or expression
+        dialect_name: Name of the database dialect ('sqlite', 'postgresql', ...)
+
+    Returns:
+        SQL expression producing the month key as a string
+    """
+    if dialect_name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    if dialect_name in ('mysql', 'mariadb'):
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def _to_decimal(value) -> Decimal:
+    """Convert an amount (Decimal, float, int or str) to Decimal."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _is_rollup_change(expense: Expense) -> bool:
+    """Check whether a dirty expense changed any bucket-relevant attribute."""
+    return any(get_history(expense, attr).has_changes() for attr in _TRACKED_ATTRS)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    """Snapshot stored bucket values of expenses about to be edited or deleted."""
+    ids = [
+        obj.id for obj in session.deleted
+        if isinstance(obj, Expense) and obj.id is not None
+    ]
+    ids.extend(
+        obj.id for obj in session.dirty
+        if isinstance(obj, Expense) and obj.id is not None and _is_rollup_change(obj)
+    )
+    if not ids:
+        return
+
+    with session.no_autoflush:
+        rows = session.execute(
+            select(Expense.id, Expense.user_id, Expense.date, Expense.category, Expense.amount)
+            .where(Expense.id.in_(ids))
+        ).all()
+
+    old_rows = session.info.setdefault(_OLD_ROWS_KEY, {})
+    for row in rows:
+        old_rows.setdefault(row.id, (row.user_id, row.date, row.category, row.amount))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    """Translate the flushed expense changes into rollup and daily index deltas."""
+    old_rows = session.info.pop(_OLD_ROWS_KEY, {})
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    deltas: Dict[RollupKey, List] = defaultdict(lambda: [Decimal(0), 0])
+    day_deltas: Dict[Tuple[int, date], List] = defaultdict(lambda: [Decimal(0), 0])
+
+    def add(user_id, day, category, amount, sign):
+        if user_id is None or day is None or category is None or amount is None:
+            return
+        if user_id in deleted_users:
+            return  # Rollup rows go away with the user
+        for delta in (deltas[(user_id, month_key(day), category)], day_deltas[(user_id, day)]):
+            delta[0] += _to_decimal(amount) * sign
+            delta[1] += sign
+
+    for user_id, day, category, amount in old_rows.values():
+        add(user_id, day, category, amount, -1)
+
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Expense) or obj in session.deleted:
+            continue
+        if obj in session.dirty and obj.id not in old_rows:
+            continue  # Untracked attribute edit (title, receipt, ...)
+        add(obj.user_id, obj.date, obj.category, obj.amount, 1)
+
+    RollupService.apply_deltas(session.connection(), deltas)
+    DailyIndexService.apply_deltas(session.connection(), day_deltas)
+
+
+def _after_soft_rollback(session: Session, previous_transaction) -> None:
+    """Drop any snapshot left behind by a failed flush."""
+    session.info.pop(_OLD_ROWS_KEY, None)
+
+
+class RollupService:
+    """Spending rollup maintenance and queries - pure Python, no Flask imports."""
+
+    @staticmethod
+    def register_listeners() -> None:
+        """
+        Attach rollup maintenance to every SQLAlchemy session flush.
+
+        Safe to call more than once (e.g. one call per app created in tests).
+        """
+        for name, listener in (
+            ('before_flush', _before_flush),
+            ('after_flush', _after_flush),
+            ('after_soft_rollback', _after_soft_rollback),
+        ):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    @staticmethod
+    def apply_deltas(connection, deltas: Dict[RollupKey, List]) -> None:
+        """
+        Upsert (amount, count) deltas into the rollup table.
+
+        Uses a single INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL
+        so concurrent writers increment atomically; other dialects fall back
+        to UPDATE-then-INSERT. Buckets whose count drops to zero are pruned.
+
+        Args:
+            connection: SQLAlchemy connection bound to the current transaction
+            deltas: Mapping of (user_id, month, category) -> [amount, count]
+        """
+        rows = [
+            {'user_id': user_id, 'month': month, 'category': category,
+             'total': amount, 'count': count}
+            for (user_id, month, category), (amount, count) in deltas.items()
+            if amount or count
+        ]
+        if not rows:
+            return
+
+        table = SpendingRollup.__table__
+        dialect_name = connection.dialect.name
+
+        if dialect_name in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite_insert if dialect_name == 'sqlite' else pg_insert
+            stmt = dialect_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.month, table.c.category],
+                set_={
+                    'total': table.c.total + stmt.excluded.total,
+                    'count': table.c.count + stmt.excluded.count,
+                }
+            )
+            connection.execute(stmt)
+        else:
+            for row in rows:
+                result = connection.execute(
+                    update(table)
+                    .where(
+                        table.c.user_id == row['user_id'],
+                        table.c.month == row['month'],
+                        table.c.category == row['category']
+                    )
+                    .values(total=table.c.total + row['total'], count=table.c.count + row['count'])
+                )
+                if result.rowcount == 0:
+                    connection.execute(insert(table).values(**row))
+
+        touched_users = {row['user_id'] for row in rows if row['count'] < 0}
+        if touched_users:
+            connection.execute(
+                delete(table).where(
+                    table.c.user_id.in_(touched_users),
+                    table.c.count <= 0
+                )
+            )
+
+    @staticmethod
+    def rebuild(user_id: Optional[int] = None) -> int:
+        """
+        Recompute rollups from raw expenses in one INSERT ... SELECT.
+
+        Args:
+            user_id: Only rebuild this user's rollups (default: all users)
+
+        Returns:
+            Number of rollup rows written
+        """
+        table = SpendingRollup.__table__
+        dialect_name = db.session.get_bind().dialect.name
+        bucket = month_bucket(Expense.date, dialect_name)
+
+        source = select(
+            Expense.user_id,
+            bucket,
+            Expense.category,
+            func.sum(Expense.amount),
+            func.count(Expense.id)
+        ).group_by(Expense.user_id, bucket, Expense.category)
+
+        clear = delete(table)
+        if user_id is not None:
+            source = source.where(Expense.user_id == user_id)
+            clear = clear.where(table.c.user_id == user_id)
+
+        try:
+            db.session.execute(clear)
+            result = db.session.execute(
+                insert(table).from_select(
+                    ['user_id', 'month', 'category', 'total', 'count'], source
+                )
+            )
+            db.session.commit()
+            return result.rowcount
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f'Failed to rebuild rollups: {str(e)}')
+
+    @staticmethod
+    def get_month_total(user_id: int, month: str) -> Decimal:
+        """
+        Get total spending for a user in one month.
+
+        Args:
+            user_id: User ID
+            month: Month in YYYY-MM format
+        """
+        result = db.session.query(func.sum(SpendingRollup.total)).filter(
+            SpendingRollup.user_id == user_id,
+            SpendingRollup.month == month
+        ).scalar()
+        return _to_decimal(result) if result is not None else Decimal(0)
+
+    @staticmethod
+    def get_monthly_totals(user_id: int, months: Iterable[str]) -> Dict[str, Decimal]:
+        """
+        Get total spending per month for the requested months.
+
+        Args:
+            user_id: User ID
+            months: Month keys in YYYY-MM format
+
+        Returns:
+            {"YYYY-MM": total, ...} for months that have spending
+        """
+        months = list(months)
+        if not months:
+            return {}
+
+        results = db.session.query(
+            SpendingRollup.month,
+            func.sum(SpendingRollup.total)
+        ).filter(
+            SpendingRollup.user_id == user_id,
+            SpendingRollup.month.in_(months)
+        ).group_by(SpendingRollup.month).all()
+
+        return {month: _to_decimal(total) for month, total in results}
+
+    @staticmethod
+    def get_monthly_range(user_id: int, month_from: str, month_to: str) -> Dict[str, Decimal]:
+        """
+        Get total spending per month over an inclusive month range.
+        
+        One range scan + GROUP BY on the rollup's month bucket, so the cost
+        does not grow with an IN list of month keys for multi-year windows.
+        
+        Args:
+            user_id: User ID
+            month_from: First month (YYYY-MM)
+            month_to: Last month (YYYY-MM)
+        
+        Returns:
+            {"YYYY-MM": total, ...} for months that have spending
+        """
+        results = db.session.query(
+            SpendingRollup.month,
+            func.sum(SpendingRollup.total)
+        ).filter(
+            SpendingRollup.user_id == user_id,
+            SpendingRollup.month >= month_from,
+            SpendingRollup.month <= month_to
+        ).group_by(SpendingRollup.month).all()
+        
+        return {month: _to_decimal(total) for month, total in results}
+    
+    @staticmethod
+    def get_category_totals(
+        user_id: int,
+        month_from: Optional[str] = None,
+        month_to: Optional[str] = None
+    ) -> Dict[str, Tuple[Decimal, int]]:
+        """
+        Get per-category totals and counts over an inclusive month range.
+
+        Args:
+            user_id: User ID
+            month_from: First month (YYYY-MM), unbounded if None
+            month_to: Last month (YYYY-MM), unbounded if None
+
+        Returns:
+            {"category": (total, count), ...}
+        """
+        query = db.session.query(
+            SpendingRollup.category,
+            func.sum(SpendingRollup.total),
+            func.sum(SpendingRollup.count)
+        ).filter(SpendingRollup.user_id == user_id)
+
+        if month_from:
+            query = query.filter(SpendingRollup.month >= month_from)
+        if month_to:
+            query = query.filter(SpendingRollup.month <= month_to)
+
+        results = query.group_by(SpendingRollup.category).all()
+
+        return {
+            category: (_to_decimal(total), int(count))
+            for category, total, count in results
+        }
+
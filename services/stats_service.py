@@ -0,0 +1,153 @@
+"""StatsService - headline spending statistics in one aggregate query each.
+
+Both statistics blocks are computed in the database instead of loading
+expense rows:
+
+    - spending(): SUM/AVG/MIN/MAX/COUNT over a date window.
+    - quick(): today / this month / this year / last 30 days totals plus the
+      month's transaction count, as CASE-based conditional sums over the one
+      date range that covers every bucket. ``CASE WHEN`` is used rather than
+      ``FILTER (WHERE ...)`` so the same SQL runs on SQLite, PostgreSQL and
+      MySQL.
+
+Results are returned as typed, immutable stats objects; ``as_dict()`` gives
+the JSON/template shape used by the routes.
+
+Methods:
+    spending() - Summary statistics for expenses on or after a date
+    quick() - Dashboard quick stats around a reference date
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import case, func
+
+from models import db, Expense
+
+# Days covered by the quick stats daily average
+DAILY_AVERAGE_DAYS = 30
+
+
+def _to_decimal(value) -> Decimal:
+    """Convert an aggregate result (None, Decimal, float or int) to Decimal."""
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+class SpendingStats(NamedTuple):
+    """Summary statistics for a set of expenses."""
+    total: Decimal
+    average: Decimal
+    highest: Decimal
+    lowest: Decimal
+    count: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stats as {"total", "average", "highest", "lowest", "count"}."""
+        return {
+            'total': float(self.total),
+            'average': float(self.average),
+            'highest': float(self.highest),
+            'lowest': float(self.lowest),
+            'count': self.count
+        }
+
+
+class QuickStats(NamedTuple):
+    """Quick dashboard statistics around a reference date."""
+    today: Decimal
+    this_month: Decimal
+    this_year: Decimal
+    daily_average: Decimal
+    expense_count: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stats rounded to cents, keyed like the insights template."""
+        return {
+            'today': round(float(self.today), 2),
+            'this_month': round(float(self.this_month), 2),
+            'this_year': round(float(self.this_year), 2),
+            'daily_average': round(float(self.daily_average), 2),
+            'expense_count': self.expense_count
+        }
+
+
+class StatsService:
+    """Aggregate spending statistics - pure Python, no Flask imports."""
+
+    @staticmethod
+    def spending(user_id: int, since: date) -> SpendingStats:
+        """
+        Get summary statistics for a user's expenses dated on or after ``since``.
+
+        Args:
+            user_id: User ID
+            since: First date included
+
+        Returns:
+            SpendingStats (all zero when there are no expenses)
+        """
+        row = db.session.query(
+            func.sum(Expense.amount),
+            func.max(Expense.amount),
+            func.min(Expense.amount),
+            func.count(Expense.id)
+        ).filter(
+            Expense.user_id == user_id,
+            Expense.date >= since
+        ).one()
+
+        total = _to_decimal(row[0])
+        count = int(row[3] or 0)
+        return SpendingStats(
+            total=total,
+            average=total / count if count else Decimal(0),
+            highest=_to_decimal(row[1]),
+            lowest=_to_decimal(row[2]),
+            count=count
+        )
+
+    @staticmethod
+    def quick(user_id: int, today: Optional[date] = None) -> QuickStats:
+        """
+        Get today / month / year / 30-day totals for a user in one query.
+
+        Args:
+            user_id: User ID
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            QuickStats; daily_average is the last DAILY_AVERAGE_DAYS days' total
+            divided by DAILY_AVERAGE_DAYS
+        """
+        today = today or date.today()
+        month_start = today.replace(day=1)
+        year_start = today.replace(month=1, day=1)
+        window_start = today - timedelta(days=DAILY_AVERAGE_DAYS)
+
+        def bucket_sum(condition):
+            return func.sum(case((condition, Expense.amount), else_=0))
+
+        row = db.session.query(
+            bucket_sum(Expense.date == today),
+            bucket_sum(Expense.date >= month_start),
+            bucket_sum(Expense.date >= year_start),
+            bucket_sum(Expense.date >= window_start),
+            func.count(case((Expense.date >= month_start, Expense.id)))
+        ).filter(
+            Expense.user_id == user_id,
+            Expense.date >= min(year_start, window_start),
+            Expense.date <= today
+        ).one()
+
+        return QuickStats(
+            today=_to_decimal(row[0]),
+            this_month=_to_decimal(row[1]),
+            this_year=_to_decimal(row[2]),
+            daily_average=_to_decimal(row[3]) / DAILY_AVERAGE_DAYS,
+            expense_count=int(row[4] or 0)
+        )
@@ -0,0 +1,118 @@
+"""MonthlySummaryService - month-end summary numbers for a range of users.
+
+The monthly summary email needs each user's month total, budget and top
+category. Instead of three lookups (and a full expense load) per user, a
+chunk of users is summarized with two set-based queries:
+
+    1. Users in the ID range LEFT JOINed to their 'monthly_budget' setting.
+    2. One GROUP BY (user, category) over the spending rollup for the month
+       and ID range; the month total and top category of every user are
+       picked from its rows.
+
+Methods:
+    summaries() - Summaries of the users in an ID range
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, func
+
+from models import db, User, Setting, SpendingRollup
+
+
+class MonthlySummary(NamedTuple):
+    """One user's spending summary for a month."""
+    user_id: int
+    username: str
+    email: str
+    total: Decimal
+    budget: Decimal
+    top_category: Optional[str]
+    top_amount: Decimal
+
+    @property
+    def percentage(self) -> float:
+        """Budget used in percent (0 without a budget)."""
+        return round(float(self.total / self.budget * 100), 1) if self.budget > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the summary as the template's {"total", "budget", ...} shape."""
+        return {
+            'username': self.username,
+            'total': float(self.total),
+            'budget': float(self.budget),
+            'percentage': self.percentage,
+            'top_category': self.top_category,
+            'top_amount': float(self.top_amount),
+        }
+
+
+def _parse_budget(value: Optional[str]) -> Decimal:
+    """Parse a 'monthly_budget' setting; missing or invalid values are 0."""
+    try:
+        budget = Decimal(value) if value else Decimal(0)
+    except InvalidOperation:
+        return Decimal(0)
+    return budget if budget.is_finite() else Decimal(0)
+
+
+class MonthlySummaryService:
+    """Monthly summary queries - pure Python, no Flask imports."""
+
+    @staticmethod
+    def summaries(month: str, first_user_id: int, last_user_id: int) -> List[MonthlySummary]:
+        """
+        Summarize a month for the users with an email in an ID range.
+
+        Args:
+            month: Month in YYYY-MM format
+            first_user_id: First user ID of the range (inclusive)
+            last_user_id: Last user ID of the range (inclusive)
+
+        Returns:
+            MonthlySummary per user, in user ID order (users without
+            spending have a zero total and no top category)
+        """
+        in_range = User.id.between(first_user_id, last_user_id)
+
+        users = db.session.query(
+            User.id, User.username, User.email, Setting.value
+        ).outerjoin(
+            Setting, and_(Setting.user_id == User.id, Setting.key == 'monthly_budget')
+        ).filter(
+            in_range,
+            User.email.isnot(None),
+            User.email != ''
+        ).order_by(User.id).all()
+
+        rows = db.session.query(
+            SpendingRollup.user_id,
+            SpendingRollup.category,
+            func.sum(SpendingRollup.total)
+        ).filter(
+            SpendingRollup.user_id.between(first_user_id, last_user_id),
+            SpendingRollup.month == month
+        ).group_by(SpendingRollup.user_id, SpendingRollup.category).all()
+
+        totals: Dict[int, Decimal] = {}
+        top: Dict[int, tuple] = {}
+        for user_id, category, amount in rows:
+            amount = Decimal(str(amount or 0))
+            totals[user_id] = totals.get(user_id, Decimal(0)) + amount
+            # Ties go to the alphabetically first category, so runs are repeatable
+            best = top.get(user_id)
+            if best is None or amount > best[1] or (amount == best[1] and category < best[0]):
+                top[user_id] = (category, amount)
+
+        return [
+            MonthlySummary(
+                user_id=user_id,
+                username=username,
+                email=email,
+                total=totals.get(user_id, Decimal(0)),
+                budget=_parse_budget(budget_value),
+                top_category=top[user_id][0] if user_id in top else None,
+                top_amount=top[user_id][1] if user_id in top else Decimal(0),
+            )
+            for user_id, username, email, budget_value in users
+        ]
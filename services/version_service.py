@@ -0,0 +1,104 @@
+"""DataVersionService - per-user data version counter for conditional GETs.
+
+``User.data_version`` is a monotonic counter bumped whenever any of the
+user's expenses, settings or alerts change. Read endpoints derive a weak
+ETag from it, so a client polling an unchanged resource can be answered
+with 304 Not Modified straight from the (already loaded) user row, without
+running the resource's queries.
+
+ORM writes are picked up by a session flush hook; bulk Core statements
+(multi-row INSERTs, set-based DELETEs) bypass the hooks, so their callers
+call bump() on the same transaction. Bumps made through a Session are also
+recorded in ``session.info[BUMPED_USERS_KEY]`` so caches holding a user's
+version (see principal_cache.py) can be refreshed once the transaction
+commits.
+
+Methods:
+    register_listeners() - Bump versions on every flush touching user data
+    bump() - Increment the data version of some users
+    etag() - Weak ETag value for a user's data version
+"""
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, scoped_session
+
+from models import User, Expense, Setting, Alert
+
+# Models whose rows belong to one user and feed that user's read endpoints
+_VERSIONED_MODELS = (Expense, Setting, Alert)
+
+# session.info key collecting the users bumped in the current transaction
+BUMPED_USERS_KEY = 'bumped_user_ids'
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    """Bump the data version of every user whose data was flushed."""
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    user_ids = set()
+
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, _VERSIONED_MODELS):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, _VERSIONED_MODELS) and session.is_modified(obj):
+            user_ids.add(obj.user_id)
+
+    DataVersionService.bump(session, user_ids - deleted_users)
+
+
+class DataVersionService:
+    """Per-user data versions - pure Python, no Flask imports."""
+
+    @staticmethod
+    def register_listeners() -> None:
+        """
+        Attach data version bumps to every SQLAlchemy session flush.
+
+        Safe to call more than once (e.g. one call per app created in tests).
+        """
+        if not event.contains(Session, 'after_flush', _after_flush):
+            event.listen(Session, 'after_flush', _after_flush)
+
+    @staticmethod
+    def bump(connection, user_ids: Iterable[int]) -> None:
+        """
+        Increment the data version of the given users in one UPDATE.
+
+        Args:
+            connection: SQLAlchemy connection or session bound to the current transaction
+            user_ids: Users whose data changed
+        """
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        if isinstance(connection, (Session, scoped_session)):
+            connection.info.setdefault(BUMPED_USERS_KEY, set()).update(user_ids)
+
+        table = User.__table__
+        connection.execute(
+            update(table)
+            .where(table.c.id.in_(user_ids))
+            .values(data_version=table.c.data_version + 1)
+        )
+
+    @staticmethod
+    def etag(user_id: int, version: int, today: Optional[date] = None) -> str:
+        """
+        Build the (unquoted) weak ETag value for a user's data version.
+
+        The date is part of the tag because "today" and "this month" figures
+        change at midnight even when no data was written.
+
+        Args:
+            user_id: User ID
+            version: User.data_version
+            today: Reference date (defaults to date.today())
+
+        Returns:
+            ETag value such as "u7.v42.20261018"
+        """
+        today = today or date.today()
+        return f"u{user_id}.v{version or 0}.{today:%Y%m%d}"
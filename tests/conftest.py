@@ -24,3 +24,90 @@ def client(tmp_path, monkeypatch):
             from app import db
             db.create_all()
         yield client
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_cache():
+    # Each test recreates the in-memory DB and user IDs repeat, so cached
+    # principals/responses from a previous test must not leak into the next
+    from response_cache import cache
+    with flask_app.app_context():
+        cache.clear()
+    yield
+
+
+class SMTPSink:
+    """Minimal local SMTP server that records delivered messages."""
+
+    def __init__(self):
+        import socketserver
+        import threading
+
+        sink = self
+        self.messages = []
+        self.connections = 0
+        self.reject = set()  # recipients answered with a temporary failure
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f'{line}\r\n'.encode())
+
+            def handle(self):
+                sink.connections += 1
+                self.reply('220 sink ready')
+                recipients = []
+                while True:
+                    line = self.rfile.readline().decode(errors='replace').strip()
+                    if not line:
+                        return
+                    command = line[:4].upper()
+                    if command == 'EHLO':
+                        self.reply('250-sink')
+                        self.reply('250 AUTH PLAIN')
+                    elif command == 'HELO':
+                        self.reply('250 sink')
+                    elif command == 'AUTH':
+                        self.reply('235 ok')
+                    elif command == 'MAIL':
+                        recipients = []
+                        self.reply('250 ok')
+                    elif command == 'RCPT':
+                        address = line.split(':', 1)[1].strip().strip('<>')
+                        if address in sink.reject:
+                            self.reply('451 try again later')
+                        else:
+                            recipients.append(address)
+                            self.reply('250 ok')
+                    elif command == 'DATA':
+                        self.reply('354 end with .')
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline().decode(errors='replace')
+                            if chunk.rstrip('\r\n') == '.':
+                                break
+                            data.append(chunk)
+                        sink.messages.append({'to': recipients, 'data': ''.join(data)})
+                        self.reply('250 queued')
+                    elif command == 'QUIT':
+                        self.reply('221 bye')
+                        return
+                    else:
+                        self.reply('250 ok')
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def smtp_sink():
+    """Local SMTP sink; point MAIL_SERVER/MAIL_PORT at sink.host/sink.port."""
+    sink = SMTPSink()
+    yield sink
+    sink.close()
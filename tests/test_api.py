@@ -66,6 +66,21 @@ class TestAuthAPI:
         assert response.status_code == 201
         data = json.loads(response.data)
         assert 'message' in data or 'success' in data
+    
+    def test_login_is_shed_when_hashing_is_saturated(self, client, test_user, monkeypatch):
+        """A full password hashing queue answers 503 with Retry-After"""
+        from services.password_service import PasswordService, HashingBusyError
+        
+        def saturated(user, password):
+            raise HashingBusyError('Server is busy, please try again shortly')
+        
+        monkeypatch.setattr(PasswordService, 'verify_and_update', saturated)
+        response = client.post('/api/auth/login',
+            json={'username': 'testuser', 'password': 'testpass123'}
+        )
+        
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
 
 
 class TestExpenseAPI:
@@ -98,10 +113,53 @@ class TestExpenseAPI:
         
         assert response.status_code == 200
         data = json.loads(response.data)
-        assert isinstance(data, list)
-        assert len(data) == 1
-        assert data[0]['title'] == 'Test expense'
-        assert data[0]['amount'] == 25.0
+        assert isinstance(data['items'], list)
+        assert len(data['items']) == 1
+        assert data['items'][0]['title'] == 'Test expense'
+        assert data['items'][0]['amount'] == 25.0
+        assert data['count'] == 1
+        assert data['total_amount'] == 25.0
+        assert data['next_cursor'] is None
+    
+    def test_get_expenses_cursor_pagination(self, client, test_user, jwt_token):
+        """GET /api/expenses pages through history with next_cursor"""
+        today = date.today()
+        db.session.add_all([
+            Expense(user_id=test_user.id, title=f'E{i}', amount=10.0,
+                    date=today - timedelta(days=i % 2), category='Food')
+            for i in range(5)
+        ])
+        db.session.commit()
+        
+        seen = []
+        cursor = None
+        while True:
+            query = {'limit': 2}
+            if cursor:
+                query['cursor'] = cursor
+            response = client.get('/api/expenses', query_string=query,
+                headers={'Authorization': f'Bearer {jwt_token}'}
+            )
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert data['count'] == 5
+            assert data['total_amount'] == 50.0
+            seen.extend(item['id'] for item in data['items'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        
+        assert len(seen) == len(set(seen)) == 5
+        dates = [db.session.get(Expense, i).date for i in seen]
+        assert dates == sorted(dates, reverse=True)
+    
+    def test_get_expenses_invalid_cursor(self, client, test_user, jwt_token):
+        """GET /api/expenses rejects a malformed cursor"""
+        response = client.get('/api/expenses?cursor=not-a-cursor',
+            headers={'Authorization': f'Bearer {jwt_token}'}
+        )
+        
+        assert response.status_code == 400
     
     def test_get_expenses_invalid_token(self, client):
         """GET /api/expenses rejects invalid token"""
@@ -241,6 +299,546 @@ class TestExpenseAPI:
         assert response.status_code == 403
 
 
+class TestBatchExpenseAPI:
+    """Test bulk expense ingestion endpoint"""
+    
+    def _batch(self, count, **overrides):
+        item = {
+            'title': 'Synced',
+            'amount': '12.34',
+            'category': 'Food',
+            'date': date.today().isoformat()
+        }
+        item.update(overrides)
+        return {'expenses': [dict(item, title=f'Synced {i}') for i in range(count)]}
+    
+    def test_batch_requires_token(self, client):
+        """POST /api/expenses/batch requires JWT token"""
+        response = client.post('/api/expenses/batch', json=self._batch(1))
+        assert response.status_code == 401
+    
+    def test_batch_creates_all(self, client, test_user, jwt_token):
+        """Valid batch is inserted and rolled up in one go"""
+        response = client.post('/api/expenses/batch',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json=self._batch(5)
+        )
+        
+        assert response.status_code == 201
+        data = json.loads(response.data)
+        assert data['created'] == 5
+        assert data['failed'] == 0
+        assert [r['index'] for r in data['results']] == list(range(5))
+        
+        ids = [r['id'] for r in data['results']]
+        titles = {e.id: e.title for e in Expense.query.filter(Expense.id.in_(ids))}
+        assert [titles[i] for i in ids] == [f'Synced {i}' for i in range(5)]
+        
+        from services.rollup_service import RollupService, month_key
+        assert str(RollupService.get_month_total(test_user.id, month_key(date.today()))) == '61.70'
+    
+    def test_batch_scores_unusual_expenses(self, client, test_user, jwt_token):
+        """Batched expenses are scored: each outlier alerts and the models count them"""
+        from models import Alert, AnomalyModel
+        headers = {'Authorization': f'Bearer {jwt_token}'}
+        response = client.post('/api/expenses/batch', headers=headers, json=self._batch(12))
+        assert response.status_code == 201
+        assert db.session.get(AnomalyModel, (test_user.id, 'Food')).samples == 12
+        
+        payload = self._batch(1)
+        payload['expenses'] += [dict(payload['expenses'][0], title='Banquet', amount='500.00'),
+                                dict(payload['expenses'][0], title='Gala', amount='600.00')]
+        response = client.post('/api/expenses/batch', headers=headers, json=payload)
+        assert response.status_code == 201
+        
+        ids = [r['id'] for r in json.loads(response.data)['results']]
+        alerts = Alert.query.filter(Alert.user_id == test_user.id).order_by(Alert.id).all()
+        assert [alert.alert_type for alert in alerts] == [f'unusual_expense:{ids[1]}', f'unusual_expense:{ids[2]}']
+        model = db.session.get(AnomalyModel, (test_user.id, 'Food'))
+        db.session.refresh(model)
+        assert (model.samples, model.pending) == (12, 3)
+    
+    def test_batch_partial_failure(self, client, test_user, jwt_token):
+        """Invalid items are reported per index, valid ones still inserted"""
+        payload = self._batch(3)
+        payload['expenses'][1]['amount'] = -5
+        payload['expenses'][2]['date'] = (date.today() + timedelta(days=3)).isoformat()
+        
+        response = client.post('/api/expenses/batch',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json=payload
+        )
+        
+        assert response.status_code == 207
+        data = json.loads(response.data)
+        assert data['created'] == 1
+        assert data['results'][0]['success'] is True
+        assert data['results'][1]['success'] is False
+        assert 'amount' in data['results'][1]['error']
+        assert 'future' in data['results'][2]['error']
+        assert Expense.query.count() == 1
+    
+    def test_batch_rejects_bad_envelope(self, client, test_user, jwt_token):
+        """Empty or oversized batches are rejected"""
+        for payload in ({'expenses': []}, self._batch(101), {}):
+            response = client.post('/api/expenses/batch',
+                headers={'Authorization': f'Bearer {jwt_token}'},
+                json=payload
+            )
+            assert response.status_code == 400
+    
+    def test_batch_triggers_budget_alert_once(self, client, test_user, jwt_token):
+        """Budget check runs once for the whole batch"""
+        from models import Setting
+        db.session.add(Setting(user_id=test_user.id, key='monthly_budget', value='100'))
+        db.session.commit()
+        
+        response = client.post('/api/expenses/batch',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json=self._batch(10)
+        )
+        
+        assert response.status_code == 201
+        assert Alert.query.filter_by(user_id=test_user.id, alert_type='budget_exceeded').count() == 1
+    
+    def test_batch_is_one_multi_row_insert(self, client, test_user, jwt_token):
+        """The whole batch is written with one INSERT and rolled up exactly"""
+        from sqlalchemy import event
+        from services.rollup_service import RollupService, month_key
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO expense '):
+                statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.post('/api/expenses/batch',
+                headers={'Authorization': f'Bearer {jwt_token}'},
+                json=self._batch(100)
+            )
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        
+        assert response.status_code == 201
+        assert len(statements) == 1
+        assert Expense.query.count() == 100
+        assert str(RollupService.get_month_total(test_user.id, month_key(date.today()))) == '1234.00'
+    
+    def test_batch_keeps_submitted_categories(self, client, test_user, jwt_token):
+        """Batch categories are stored as submitted, like POST /api/expenses"""
+        payload = self._batch(1)
+        payload['expenses'] += [dict(payload['expenses'][0], category='Groceries'),
+                                dict(payload['expenses'][0], category='Travel')]
+        response = client.post('/api/expenses/batch',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json=payload
+        )
+        assert response.status_code == 201
+        ids = [r['id'] for r in json.loads(response.data)['results']]
+        categories = {e.id: e.category for e in Expense.query.filter(Expense.id.in_(ids))}
+        assert [categories[i] for i in ids] == ['Food', 'Groceries', 'Travel']
+        
+        payload['expenses'][0]['category'] = ''
+        response = client.post('/api/expenses/batch',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json=payload
+        )
+        assert response.status_code == 207
+        assert 'category' in json.loads(response.data)['results'][0]['error']
+
+
+class TestColumnarExportAPI:
+    """Test Parquet/Arrow export and import endpoints"""
+    
+    def test_export_invalid_format(self, client, test_user, jwt_token):
+        """Unknown export formats are rejected"""
+        response = client.get('/api/expenses/export?format=xlsx',
+            headers={'Authorization': f'Bearer {jwt_token}'}
+        )
+        assert response.status_code == 400
+    
+    def test_parquet_export_then_import(self, client, test_user, jwt_token):
+        """Parquet export can be re-imported through the API"""
+        pytest.importorskip('pyarrow')
+        db.session.add(Expense(user_id=test_user.id, title='Rent', amount=1234.56,
+                               date=date.today(), category='Bills'))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {jwt_token}'}
+        
+        response = client.get('/api/expenses/export?format=parquet', headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/vnd.apache.parquet'
+        data = response.get_data()
+        assert data[:4] == b'PAR1'
+        
+        response = client.post('/api/expenses/import', headers=headers, data=data)
+        assert response.status_code == 201
+        assert json.loads(response.data)['imported'] == 1
+        amounts = [str(e.amount) for e in Expense.query.filter_by(title='Rent')]
+        assert amounts == ['1234.56', '1234.56']
+    
+    def test_import_garbage_rejected(self, client, test_user, jwt_token):
+        """Unreadable import files return 400"""
+        pytest.importorskip('pyarrow')
+        response = client.post('/api/expenses/import',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            data=b'not an arrow file'
+        )
+        assert response.status_code == 400
+
+
+class TestDashboardStatsAPI:
+    """Test dashboard stats endpoint"""
+    
+    def test_dashboard_stats(self, client, test_user, jwt_token):
+        """GET /api/dashboard/stats returns the snapshot numbers"""
+        from models import Setting
+        db.session.add(Setting(user_id=test_user.id, key='monthly_budget', value='100'))
+        db.session.add(Expense(user_id=test_user.id, title='Lunch', amount=120.0,
+                               date=date.today(), category='Food'))
+        db.session.commit()
+        
+        response = client.get('/api/dashboard/stats',
+            headers={'Authorization': f'Bearer {jwt_token}'}
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['today_total'] == 120.0
+        assert data['month_total'] == 120.0
+        assert data['budget'] == 100.0
+        assert data['budget_warning'] is True
+        assert data['remaining_budget'] == -20.0
+        assert data['category_breakdown'] == {'Food': 120.0}
+        assert data['unread_alerts'] == 0
+
+
+
+class TestConditionalGetAPI:
+    """Test ETag / If-None-Match handling on token_required GET routes"""
+    
+    def _get(self, client, token, url, etag=None):
+        headers = {'Authorization': f'Bearer {token}'}
+        if etag:
+            headers['If-None-Match'] = etag
+        return client.get(url, headers=headers)
+    
+    def test_unchanged_data_returns_304(self, client, test_user, jwt_token):
+        """Repeating a GET with the returned ETag answers 304 without a body"""
+        first = self._get(client, jwt_token, '/api/dashboard/stats')
+        etag = first.headers['ETag']
+        assert first.status_code == 200
+        assert etag.startswith('W/')
+        assert 'no-cache' in first.headers['Cache-Control']
+        
+        second = self._get(client, jwt_token, '/api/dashboard/stats', etag)
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == etag
+    
+    def test_expense_write_changes_etag(self, client, test_user, jwt_token):
+        """Creating an expense bumps the data version and invalidates the ETag"""
+        etag = self._get(client, jwt_token, '/api/expenses').headers['ETag']
+        
+        client.post('/api/expenses',
+            headers={'Authorization': f'Bearer {jwt_token}'},
+            json={'title': 'Coffee', 'category': 'Food', 'amount': 4.5,
+                  'date': date.today().isoformat()}
+        )
+        
+        response = self._get(client, jwt_token, '/api/expenses', etag)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert json.loads(response.data)['count'] == 1
+    
+    def test_alert_and_setting_writes_change_etag(self, client, test_user, jwt_token):
+        """Alert and setting writes also bump the data version"""
+        from models import Setting
+        etag = self._get(client, jwt_token, '/api/alerts/unread').headers['ETag']
+        
+        db.session.add(Alert(user_id=test_user.id, alert_type='budget_warning',
+                             title='Warning', message='80%', triggered_month='2026-03'))
+        db.session.commit()
+        alert_etag = self._get(client, jwt_token, '/api/alerts/unread', etag).headers['ETag']
+        assert alert_etag != etag
+        
+        db.session.add(Setting(user_id=test_user.id, key='monthly_budget', value='500'))
+        db.session.commit()
+        assert self._get(client, jwt_token, '/api/alerts/unread', alert_etag).status_code == 200
+    
+    def test_other_users_writes_keep_etag(self, client, test_user, jwt_token):
+        """Another user's writes do not invalidate this user's ETag"""
+        other = User(username='otheruser', email='other@example.com',
+                     password=generate_password_hash('otherpass123'))
+        db.session.add(other)
+        db.session.commit()
+        etag = self._get(client, jwt_token, '/api/analytics/stats').headers['ETag']
+        
+        db.session.add(Expense(user_id=other.id, title='Other', amount=9.0,
+                               date=date.today(), category='Food'))
+        db.session.commit()
+        
+        assert self._get(client, jwt_token, '/api/analytics/stats', etag).status_code == 304
+    
+    def test_admin_listing_is_exempt(self, client, test_user):
+        """Admin GETs span all users and are never tagged"""
+        test_user.role = 'admin'
+        db.session.commit()
+        token = jwt.encode(
+            {'user_id': test_user.id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+            JWT_SECRET, algorithm='HS256'
+        )
+        response = self._get(client, token, '/api/admin/stats')
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+
+class TestResponseCache:
+    """Test the versioned analytics response cache"""
+    
+    def _get(self, client, token, url):
+        return client.get(url, headers={'Authorization': f'Bearer {token}'})
+    
+    def test_repeat_request_is_served_from_cache(self, client, test_user, jwt_token):
+        """A repeated analytics GET is a cache hit and runs no analytics query"""
+        from sqlalchemy import event
+        from response_cache import cache, cache_stats, reset_cache_stats
+        cache.clear()
+        reset_cache_stats()
+        db.session.add(Expense(user_id=test_user.id, title='E1', amount=10.0,
+                               date=date.today(), category='Food'))
+        db.session.commit()
+        
+        first = self._get(client, jwt_token, '/api/analytics/stats')
+        statements = []
+        
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            second = self._get(client, jwt_token, '/api/analytics/stats')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert len(statements) <= 1  # at most the token_required user lookup
+        stats = cache_stats()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+    
+    def test_write_invalidates_by_version(self, client, test_user, jwt_token):
+        """A write bumps the data version so the next GET misses and recomputes"""
+        from response_cache import cache
+        cache.clear()
+        assert json.loads(self._get(client, jwt_token, '/api/analytics/stats').data)['count'] == 0
+        
+        db.session.add(Expense(user_id=test_user.id, title='E1', amount=10.0,
+                               date=date.today(), category='Food'))
+        db.session.commit()
+        
+        assert json.loads(self._get(client, jwt_token, '/api/analytics/stats').data)['count'] == 1
+    
+    def test_params_are_part_of_key(self, client, test_user, jwt_token):
+        """Different query parameters are cached separately"""
+        from response_cache import cache
+        cache.clear()
+        six = json.loads(self._get(client, jwt_token, '/api/analytics/trends?months=6').data)
+        three = json.loads(self._get(client, jwt_token, '/api/analytics/trends?months=3').data)
+        assert len(six) == 6
+        assert len(three) == 3
+    
+    def test_lru_eviction_and_ttl(self):
+        """The in-process backend evicts least recently used entries and expired ones"""
+        import time
+        from response_cache import LRUCache
+        lru = LRUCache(threshold=2, default_timeout=300)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        assert lru.get('a') == 1  # a is now most recently used
+        lru.set('c', 3)
+        assert lru.get('b') is None
+        assert lru.get('a') == 1 and lru.get('c') == 3
+        
+        lru.set('short', 4, timeout=0.01)
+        time.sleep(0.02)
+        assert lru.get('short') is None
+    
+    def test_redis_backend_with_local_stand_in(self):
+        """RedisCache config works with a redis-compatible client"""
+        from flask import Flask
+        from flask_caching import Cache
+        
+        class StandInRedis:
+            """Dict-backed stand-in for the redis client calls RedisCache makes"""
+            def __init__(self):
+                self.data = {}
+            
+            def get(self, name):
+                return self.data.get(name)
+            
+            def setex(self, name, time, value):
+                self.data[name] = value
+                return True
+            
+            def set(self, name, value, **kwargs):
+                self.data[name] = value
+                return True
+        
+        redis_app = Flask(__name__)
+        stand_in = StandInRedis()
+        redis_app.config.update(CACHE_TYPE='RedisCache', CACHE_REDIS_HOST=stand_in,
+                                CACHE_KEY_PREFIX='test:')
+        redis_cache = Cache(redis_app)
+        
+        with redis_app.app_context():
+            redis_cache.set('resp:key', (b'{"total": 1}', 'application/json'))
+            assert redis_cache.get('resp:key') == (b'{"total": 1}', 'application/json')
+        assert list(stand_in.data) == ['test:resp:key']
+
+
+class TestRateLimiting:
+    """Test per-user rate limit keys, shared storage fast path and 429 handling"""
+    
+    def test_key_is_user_for_valid_token(self, client, test_user, jwt_token):
+        """Authenticated requests are keyed by user, anonymous ones by address"""
+        from rate_limit import rate_limit_key
+        with app.test_request_context(headers={'Authorization': f'Bearer {jwt_token}'}):
+            assert rate_limit_key() == f'user:{test_user.id}'
+        with app.test_request_context(headers={'Authorization': 'Bearer forged.token.value'}):
+            assert rate_limit_key().startswith('ip:')
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.7'}):
+            assert rate_limit_key() == 'ip:10.0.0.7'
+    
+    def test_fast_path_batches_shared_increments(self):
+        """Hits are counted locally and flushed to shared storage in batches"""
+        from rate_limit import LocalFastPathStorage
+        storage = LocalFastPathStorage('local+memory://', max_pending=3, sync_interval=60)
+        
+        counts = [storage.incr('k', 60) for _ in range(5)]
+        assert counts == [1, 2, 3, 4, 5]
+        assert storage.shared.get('k') == 4  # window start + one flush of 3
+        assert storage.get('k') == 5
+    
+    def test_workers_share_counts(self):
+        """Two workers on one shared store see each other's flushed hits"""
+        from rate_limit import LocalFastPathStorage
+        worker_a = LocalFastPathStorage('local+memory://', max_pending=2, sync_interval=60)
+        worker_b = LocalFastPathStorage('local+memory://', max_pending=2, sync_interval=60)
+        worker_b.shared = worker_a.shared
+        
+        for _ in range(3):
+            worker_a.incr('k', 60)
+        assert worker_b.incr('k', 60) == 4
+
+    def test_expired_windows_and_locks_are_pruned(self):
+        """Keys whose window expired do not keep a window or lock around"""
+        from rate_limit import LocalFastPathStorage
+        storage = LocalFastPathStorage('local+memory://', max_pending=3, sync_interval=60)
+        storage.incr('old', 60)
+        storage.incr('live', 60)
+        storage.get('unseen')
+    
+        storage._windows['old'].expires_at = 0
+        storage._pruned_at = 0
+        storage.incr('new', 60)
+    
+        assert set(storage._windows) == {'live', 'new'}
+        assert set(storage._locks) == {'live', 'new'}
+    
+        storage.clear('live')
+        assert set(storage._locks) == {'new'}
+        storage.reset()
+        assert not storage._windows and not storage._locks
+    
+    def test_exceeded_limit_returns_retry_after(self, client):
+        """The 429 handler reports when the client may retry"""
+        from rate_limit import limiter
+        limiter.reset()
+        try:
+            for _ in range(5):
+                client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+            response = client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+        finally:
+            limiter.reset()
+        
+        assert response.status_code == 429
+        data = json.loads(response.data)
+        assert isinstance(data['retry_after'], int)
+        assert response.headers['Retry-After'] == str(data['retry_after'])
+
+
+class TestPrincipalCache:
+    """Test the cached authenticated principal and its invalidation"""
+    
+    @staticmethod
+    def _count_user_lookups():
+        from sqlalchemy import event
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith('SELECT') and 'FROM user' in statement:
+                statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', count)
+        return statements, lambda: event.remove(db.engine, 'before_cursor_execute', count)
+    
+    def test_repeat_request_skips_user_lookup(self, client, test_user, jwt_token):
+        """Only the first authenticated request loads the user row"""
+        headers = {'Authorization': f'Bearer {jwt_token}'}
+        statements, stop = self._count_user_lookups()
+        try:
+            client.get('/api/alerts', headers=headers)
+            first = len(statements)
+            response = client.get('/api/alerts', headers=headers)
+        finally:
+            stop()
+        
+        assert response.status_code == 200
+        assert first == 1
+        assert len(statements) == 1
+    
+    def test_role_change_is_seen_immediately(self, client, test_user, jwt_token):
+        """Promoting a user evicts their cached principal"""
+        headers = {'Authorization': f'Bearer {jwt_token}'}
+        assert client.get('/api/admin/users', headers=headers).status_code == 403
+        
+        test_user.role = 'admin'
+        db.session.commit()
+        
+        assert client.get('/api/admin/users', headers=headers).status_code == 200
+    
+    def test_password_change_revokes_tokens(self, client, test_user):
+        """Tokens issued before a password change are rejected"""
+        response = client.post('/api/auth/login',
+            json={'username': 'testuser', 'password': 'testpass123'}
+        )
+        headers = {'Authorization': f'Bearer {json.loads(response.data)["token"]}'}
+        assert client.get('/api/alerts', headers=headers).status_code == 200
+        
+        # What AuthService.reset_password does alongside the new hash
+        test_user.password = generate_password_hash('N3w-Passw0rd!xyz')
+        test_user.token_version += 1
+        db.session.commit()
+        
+        response = client.get('/api/alerts', headers=headers)
+        assert response.status_code == 401
+        assert json.loads(response.data)['message'] == 'Token has been revoked'
+    
+    def test_deleted_user_is_rejected(self, client, test_user, jwt_token):
+        """A deleted user's cached principal is evicted with the account"""
+        from repositories import user_repo
+        headers = {'Authorization': f'Bearer {jwt_token}'}
+        assert client.get('/api/alerts', headers=headers).status_code == 200
+        
+        user_repo.delete_with_data(test_user.id)
+        
+        response = client.get('/api/alerts', headers=headers)
+        assert response.status_code == 401
+        assert json.loads(response.data)['message'] == 'User not found'
+
+
 class TestAlertAPI:
     """Test alert API endpoints"""
     
@@ -350,6 +948,31 @@ class TestAnalyticsAPI:
         assert data['average'] == 20.0
         assert data['count'] == 3
 
+    
+    def test_heatmap(self, client, test_user, jwt_token):
+        """GET /api/analytics/heatmap returns daily totals for the window"""
+        db.session.add(Expense(user_id=test_user.id, title='Lunch', amount=12.5,
+                               date=date.today(), category='Food'))
+        db.session.add(Expense(user_id=test_user.id, title='Old', amount=99.0,
+                               date=date.today() - timedelta(days=400), category='Food'))
+        db.session.commit()
+        
+        response = client.get('/api/analytics/heatmap',
+            headers={'Authorization': f'Bearer {jwt_token}'}
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['end'] == date.today().isoformat()
+        assert data['days'] == {date.today().isoformat(): 12.5}
+        assert data['active_days'] == 1
+    
+    def test_heatmap_invalid_end(self, client, jwt_token):
+        """GET /api/analytics/heatmap rejects a malformed end date"""
+        response = client.get('/api/analytics/heatmap?end=2026-13-01',
+            headers={'Authorization': f'Bearer {jwt_token}'}
+        )
+        assert response.status_code == 400
 
 class TestAdminAPI:
     """Test admin API endpoints"""
@@ -422,6 +1045,40 @@ class TestAdminAPI:
         
         promoted = User.query.get(test_user.id)
         assert promoted.role == 'admin'
+    
+    def test_delete_user_reports_counts(self, client, test_user):
+        """Admin delete-user purges data set-based and reports counts"""
+        admin = User(
+            username='admin',
+            email='admin@test.com',
+            password=generate_password_hash('pass'),
+            role='admin'
+        )
+        db.session.add(admin)
+        for i in range(3):
+            db.session.add(Expense(user_id=test_user.id, title=f'E{i}', amount=5.0,
+                                   date=date.today(), category='Food'))
+        db.session.commit()
+        user_id = test_user.id
+        
+        admin_token = jwt.encode(
+            {
+                'user_id': admin.id,
+                'exp': datetime.utcnow() + timedelta(hours=24)
+            },
+            JWT_SECRET,
+            algorithm='HS256'
+        )
+        
+        response = client.post(f'/api/admin/delete-user/{user_id}',
+            headers={'Authorization': f'Bearer {admin_token}'}
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['deleted']['expenses'] == 3
+        assert data['deleted']['users'] == 1
+        assert Expense.query.filter_by(user_id=user_id).count() == 0
 
 
 class TestFileUploadAPI:
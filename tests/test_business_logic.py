@@ -13,6 +13,7 @@ from analytics_service import (
     get_monthly_trends, get_category_breakdown, 
     get_spending_statistics, get_highest_spending_categories
 )
+from insights_service import compute_insights, get_insights
 from werkzeug.security import generate_password_hash
 
 
@@ -340,6 +341,33 @@ class TestAnalytics:
         current_month_key = today.strftime("%Y-%m")
         assert trends[current_month_key] == 100.0
     
+    def test_monthly_trends_exact_months(self, client, app_context, test_user):
+        """Monthly trends covers consecutive calendar months, zero-filled"""
+        from services.rollup_service import shift_month
+        today = date.today()
+        two_years_ago = shift_month(today, -24)
+        db.session.add(Expense(
+            user_id=test_user.id,
+            title='Old',
+            amount=42.5,
+            date=two_years_ago,
+            category='Food'
+        ))
+        db.session.commit()
+        
+        trends = get_monthly_trends(test_user.id, 36)
+        keys = list(trends.keys())
+        
+        assert len(keys) == 36
+        assert len(set(keys)) == 36
+        assert keys[-1] == today.strftime("%Y-%m")
+        assert keys == sorted(keys)
+        for prev, cur in zip(keys, keys[1:]):
+            prev_year, prev_month = map(int, prev.split('-'))
+            assert cur == (f"{prev_year + 1}-01" if prev_month == 12 else f"{prev_year}-{prev_month + 1:02d}")
+        assert trends[two_years_ago.strftime("%Y-%m")] == 42.5
+        assert sum(trends.values()) == 42.5
+    
     def test_category_breakdown(self, client, app_context, test_user):
         """Category breakdown totals by category"""
         expenses = [
@@ -470,3 +498,70 @@ class TestExpenseOperations:
         user1_expenses = Expense.query.filter_by(user_id=user1.id).all()
         assert len(user1_expenses) == 1
         assert user1_expenses[0].title == 'U1 expense'
+
+
+class TestInsights:
+    """Test the single-pass insights engine"""
+    
+    def test_compute_insights_single_pass(self):
+        """All insights are derived from one list of rows"""
+        today = date(2025, 12, 17)  # Wednesday
+        rows = [
+            (date(2025, 12, 15), 'Food', Decimal('30.00')),    # this week
+            (date(2025, 12, 17), 'Rent', Decimal('900.00')),   # this week
+            (date(2025, 12, 10), 'Food', Decimal('20.00')),    # last week
+            (date(2025, 12, 2), 'Food', Decimal('10.00')),
+            (date(2025, 11, 20), 'Travel', Decimal('40.00')),  # last month
+        ]
+        
+        result = compute_insights(rows, today)
+        
+        wow = result['week_comparison']
+        assert wow['this_week'] == 930.0
+        assert wow['last_week'] == 20.0
+        assert wow['direction'] == 'up'
+        
+        assert list(result['categories']) == ['Rent', 'Food']
+        assert result['categories']['Food']['amount'] == 60.0
+        assert result['categories']['Rent']['rank'] == 1
+        
+        forecast = result['forecast']
+        assert forecast['spent_so_far'] == 960.0
+        assert forecast['days_in_month'] == 31
+        assert forecast['days_into_month'] == 17
+    
+    def test_get_insights_resolves_titles(self, client, app_context, test_user):
+        """get_insights returns messages and titled anomalies"""
+        today = date.today()
+        for days_ago in range(1, 8):
+            db.session.add(Expense(user_id=test_user.id, title='Lunch', amount=10,
+                                   date=today - timedelta(days=days_ago), category='Food'))
+        db.session.add(Expense(user_id=test_user.id, title='Laptop', amount=500,
+                               date=today, category='Electronics'))
+        db.session.commit()
+        
+        result = get_insights(test_user.id)
+        
+        assert result['anomalies'][0]['title'] == 'Laptop'
+        assert any(i['title'] == 'Large Expense Detected' for i in result['insights'])
+        assert set(result) >= {'week_comparison', 'categories', 'forecast', 'insights'}
+    
+    def test_dashboard_shows_stored_flags(self, client, app_context, test_user):
+        """The dashboard lists the flagged expenses of the anomaly window"""
+        today = date.today()
+        for days_ago in range(1, 8):
+            db.session.add(Expense(user_id=test_user.id, title='Lunch', amount=10,
+                                   date=today - timedelta(days=days_ago), category='Food'))
+        db.session.commit()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(test_user.id)
+        
+        assert 'Unusual Expenses' not in client.get('/').data.decode()
+        
+        db.session.add(Expense(user_id=test_user.id, title='Laptop', amount=500,
+                               date=today, category='Electronics'))
+        db.session.commit()
+        page = client.get('/').data.decode()
+        
+        assert 'Unusual Expenses' in page
+        assert 'Laptop' in page
@@ -10,8 +10,18 @@ from pydantic import ValidationError
 from werkzeug.security import generate_password_hash
 
 from app import create_app
-from models import db, User, Expense, Setting, Alert
-from services import AuthService, ExpenseService, BudgetService
+from models import (
+    db, User, Expense, Setting, Alert, SpendingRollup, DailySpending, SpendingForecast, CategoryForecast
+)
+from services import (
+    AuthService, ExpenseService, BudgetService, DashboardSnapshot, StatsService, PasswordService,
+    ForecastService, CategoryForecastService, AnomalyService, BaselineService, ActivityScanService
+)
+from services.anomaly_service import AMOUNT_Z_MIN, REFIT_MIN_NEW
+from services.forecast_service import HAS_ARIMA
+from services.rollup_service import RollupService
+from services.daily_index_service import DailyIndexService
+from services.version_service import DataVersionService
 from services.validators import (
     LoginRequest, RegisterRequest, ExpenseCreateRequest,
     ExpenseUpdateRequest, ExpenseFilterRequest, BudgetSetRequest
@@ -353,6 +363,71 @@ class TestExpenseService:
             )
             assert 'id,date,title' in result  # CSV header
             assert 'Groceries' in result
+    
+    def test_stream_csv_yields_chunks(self, app, test_user, test_expenses):
+        """Streaming export should emit bounded chunks matching the full CSV."""
+        with app.app_context():
+            chunks = list(ExpenseService.stream_csv(test_user.id, {}, chunk_size=2))
+            assert len(chunks) == 2  # header + 1 row, then 2 rows
+            assert chunks[0].startswith('id,date,title')
+            assert ''.join(chunks) == ExpenseService.export_to_csv(test_user.id, {})
+            assert ''.join(chunks).count('\n') == 4
+    
+    def test_stream_csv_invalid_filter_raises_early(self, app, test_user):
+        """Invalid filters should fail before any bytes are streamed."""
+        with app.app_context():
+            with pytest.raises(ValueError):
+                ExpenseService.stream_csv(test_user.id, {'month': 'not-a-month'})
+    
+    @pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+    def test_columnar_export_import_roundtrip(self, app, test_user, test_expenses, fmt):
+        """Parquet/Arrow export should round-trip with exact types."""
+        pa = pytest.importorskip('pyarrow')
+        import io
+        with app.app_context():
+            stream, used = ExpenseService.stream_columnar(test_user.id, {}, fmt, chunk_size=2)
+            data = b''.join(stream)
+            assert used == fmt
+            
+            reader = pa.ipc.open_stream(data) if fmt == 'arrow' else None
+            if reader is not None:
+                table = reader.read_all()
+            else:
+                import pyarrow.parquet as pq
+                parquet = pq.ParquetFile(io.BytesIO(data))
+                assert parquet.metadata.num_row_groups == 2
+                table = parquet.read()
+            assert str(table.schema.field('amount').type) == 'decimal128(12, 2)'
+            assert str(table.schema.field('date').type) == 'date32[day]'
+            assert Decimal('50.00') in table.column('amount').to_pylist()
+            
+            other = User(username='importer', email='importer@example.com',
+                         password=generate_password_hash('TestPass123!'))
+            db.session.add(other)
+            db.session.commit()
+            
+            result = ExpenseService.import_columnar(other.id, io.BytesIO(data))
+            assert result['imported'] == 3
+            assert ExpenseService.get_month_total(other.id) == ExpenseService.get_month_total(test_user.id)
+    
+    def test_columnar_import_rejects_invalid_rows(self, app, test_user):
+        """An invalid row should reject the whole import."""
+        pa = pytest.importorskip('pyarrow')
+        import io
+        with app.app_context():
+            table = pa.table({
+                'date': [date.today(), date.today()],
+                'title': ['Ok', 'Too precise'],
+                'category': ['Food', 'Food'],
+                'amount': [Decimal('1.50'), Decimal('1.505')],
+            })
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            
+            with pytest.raises(ValueError, match='Row 2'):
+                ExpenseService.import_columnar(test_user.id, io.BytesIO(sink.getvalue()))
+            assert Expense.query.filter_by(user_id=test_user.id).count() == 0
 
 
 # ============ BUDGET SERVICE TESTS ============
@@ -425,6 +500,170 @@ class TestBudgetService:
             )
             assert result['success'] == True
             assert result['alert_created'] == True
+    
+    def test_evaluate_alerts_from_month_total(self, app, test_user):
+        """Crossing 80% and then 100% raises each alert exactly once."""
+        with app.app_context():
+            BudgetService.set_budget(test_user.id, 100.00)
+            for amount, expected in ((50, None), (35, 'budget_warning'), (5, None), (20, 'budget_exceeded')):
+                ExpenseService.create_expense(test_user.id, 'Spend', 'Food', amount, date.today())
+                alert = BudgetService.evaluate_alerts(test_user.id)
+                assert (alert.alert_type if alert else None) == expected
+            
+            assert BudgetService.evaluate_alerts(test_user.id) is None
+            assert BudgetService.month_status(test_user.id, date.today().strftime('%Y-%m')) == (
+                Decimal(100), Decimal(110)
+            )
+            assert Alert.query.filter_by(user_id=test_user.id).count() == 2
+    
+    def test_upsert_alert_is_idempotent(self, app, test_user):
+        """A second insert for the same user, month and type is a no-op."""
+        with app.app_context():
+            first = BudgetService.upsert_alert(test_user.id, '2026-09', 'budget_warning', 'W', '80%', 'warning')
+            second = BudgetService.upsert_alert(test_user.id, '2026-09', 'budget_warning', 'W', '80%', 'warning')
+            db.session.commit()
+            
+            assert first is not None and second is None
+            assert Alert.query.filter_by(user_id=test_user.id).count() == 1
+    
+    def test_concurrent_evaluations_raise_one_alert(self, app, test_user):
+        """Evaluations racing on several threads never duplicate the alert."""
+        import threading
+        with app.app_context():
+            BudgetService.set_budget(test_user.id, 100.00)
+            ExpenseService.create_expense(test_user.id, 'Spend', 'Food', 150, date.today())
+        
+        barrier = threading.Barrier(4)
+        raised = []
+        
+        def evaluate():
+            with app.app_context():
+                barrier.wait()
+                raised.append(BudgetService.evaluate_alerts(test_user.id) is not None)
+        
+        threads = [threading.Thread(target=evaluate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        with app.app_context():
+            assert raised.count(True) == 1
+            assert Alert.query.filter_by(user_id=test_user.id, alert_type='budget_exceeded').count() == 1
+    
+    def test_sweep_raises_missing_alerts(self, app, test_user):
+        """The sweep raises alerts for budgets crossed without a per-write check."""
+        with app.app_context():
+            users = [test_user.id]
+            for i in range(3):
+                user = User(username=f'sweep{i}', email=f'sweep{i}@example.com',
+                            password='pbkdf2:sha256:1$' + 'x' * 64)
+                db.session.add(user)
+                db.session.flush()
+                users.append(user.id)
+            for user_id, budget, spent in zip(users, ('100', '100', '100', 'abc'), (50, 90, 120, 500)):
+                db.session.add(Setting(user_id=user_id, key='monthly_budget', value=budget))
+                db.session.add(SpendingRollup(user_id=user_id, month='2026-09', category='Food',
+                                              total=Decimal(spent), count=1))
+            db.session.commit()
+            BudgetService.upsert_alert(users[2], '2026-09', 'budget_warning', 'W', '90%', 'warning')
+            db.session.commit()
+            
+            result = BudgetService.sweep_alerts('2026-09')
+            assert result == {'month': '2026-09', 'scanned': 4, 'raised': 2, 'warnings': 1, 'exceeded': 1}
+            assert {(a.user_id, a.alert_type) for a in Alert.query.filter_by(triggered_month='2026-09')} == {
+                (users[1], 'budget_warning'), (users[2], 'budget_warning'), (users[2], 'budget_exceeded')
+            }
+            
+            assert BudgetService.sweep_alerts('2026-09')['raised'] == 0
+
+
+# ============ PASSWORD HASHING TESTS ============
+
+class TestPasswordService:
+    """Test bounded password hashing and the work factor policy."""
+    
+    @staticmethod
+    def _restore(app):
+        PasswordService.configure(
+            method=app.config['PASSWORD_HASH_METHOD'],
+            workers=app.config['PASSWORD_HASH_WORKERS'],
+            queue_limit=app.config['PASSWORD_HASH_QUEUE_LIMIT']
+        )
+    
+    def test_hash_and_verify_on_pool(self, app):
+        """Hashes made on the pool verify and are counted in stats."""
+        PasswordService.configure(method='pbkdf2:sha256:1000', workers=2, queue_limit=2)
+        try:
+            password_hash = PasswordService.hash('CorrectHorse99!')
+            assert password_hash.startswith('pbkdf2:sha256:1000$')
+            assert PasswordService.verify(password_hash, 'CorrectHorse99!')
+            assert not PasswordService.verify(password_hash, 'wrong')
+            
+            stats = PasswordService.stats()
+            assert stats['executor'] == 'thread'
+            assert stats['completed'] == 3
+            assert stats['in_flight'] == 0
+            assert stats['hash_ms']['max'] > 0
+        finally:
+            self._restore(app)
+    
+    def test_login_upgrades_outdated_hash(self, app, test_user):
+        """A successful login rehashes a password made with another work factor."""
+        with app.app_context():
+            user = db.session.get(User, test_user.id)
+            user.password = generate_password_hash('TestPass123!', method='pbkdf2:sha256:1000')
+            db.session.commit()
+            
+            PasswordService.configure(method='pbkdf2:sha256:2000', workers=1, queue_limit=1)
+            try:
+                assert PasswordService.needs_rehash(user.password)
+                AuthService.login('testuser', 'TestPass123!')
+                
+                user = db.session.get(User, test_user.id)
+                assert user.password.startswith('pbkdf2:sha256:2000$')
+                assert not PasswordService.needs_rehash(user.password)
+                assert PasswordService.stats()['rehashed'] == 1
+                AuthService.login('testuser', 'TestPass123!')
+                assert PasswordService.stats()['rehashed'] == 1
+            finally:
+                self._restore(app)
+    
+    def test_thread_mode_hashes_on_calling_thread(self):
+        """Admitted jobs run on the caller's thread; no hand-off to another one."""
+        import threading
+        from services.password_service import _HashPool
+        pool = _HashPool(workers=2, queue_limit=1)
+        try:
+            assert pool.executor is None
+            assert pool.run(lambda: (threading.current_thread(), 0.0)) is threading.current_thread()
+        finally:
+            pool.shutdown()
+    
+    def test_full_queue_fails_fast(self):
+        """Jobs beyond workers + queue_limit are rejected, not queued."""
+        import threading
+        from services.password_service import _HashPool, HashingBusyError
+        pool = _HashPool(workers=1, queue_limit=0)
+        started, release = threading.Event(), threading.Event()
+        
+        def blocking_job():
+            started.set()
+            release.wait(5)
+            return None, 0.0
+        
+        worker = threading.Thread(target=pool.run, args=(blocking_job,))
+        worker.start()
+        try:
+            started.wait(5)
+            with pytest.raises(HashingBusyError):
+                pool.run(blocking_job)
+            assert pool.rejected == 1
+        finally:
+            release.set()
+            worker.join()
+            pool.shutdown()
+        assert pool.in_flight == 0
 
 
 # ============ REPOSITORY TESTS ============
@@ -483,6 +722,1073 @@ class TestRepositories:
                 'USD'
             )
             assert setting.value == 'USD'
+    
+    def test_expense_repo_delete_user_expenses_chunked(self, app, test_user, test_expenses):
+        """Chunked set-based delete should remove all rows and rollups."""
+        with app.app_context():
+            count = expense_repo.delete_user_expenses(test_user.id, chunk_size=2)
+            assert count == 3
+            assert Expense.query.filter_by(user_id=test_user.id).count() == 0
+            assert SpendingRollup.query.filter_by(user_id=test_user.id).count() == 0
+    
+    def test_user_repo_delete_with_data(self, app, test_user_with_budget, test_expenses):
+        """Deleting a user should purge their data and report row counts."""
+        with app.app_context():
+            user_id = test_user_with_budget.id
+            db.session.add(Alert(user_id=user_id, alert_type='budget_warning',
+                                 title='Warning', message='80%', triggered_month='2026-01'))
+            db.session.commit()
+            
+            deleted = user_repo.delete_with_data(user_id, chunk_size=2)
+            assert deleted == {'expenses': 3, 'settings': 1, 'alerts': 1, 'users': 1}
+            assert db.session.get(User, user_id) is None
+            assert Setting.query.filter_by(user_id=user_id).count() == 0
+    
+    def test_user_repo_delete_with_data_resumes_after_failure(self, app, monkeypatch,
+                                                              test_user_with_budget, test_expenses):
+        """A deletion failing after the expenses leaves the rest intact and is finished on resume."""
+        import repositories
+        from models import JobCheckpoint
+        with app.app_context():
+            user_id = test_user_with_budget.id
+            
+            def fail(user_id):
+                raise RuntimeError('connection lost')
+            
+            with monkeypatch.context() as patch:
+                patch.setattr(repositories, '_delete_derived', fail)
+                with pytest.raises(RuntimeError):
+                    user_repo.delete_with_data(user_id, chunk_size=2)
+            
+            assert Expense.query.filter_by(user_id=user_id).count() == 0
+            assert db.session.get(User, user_id) is not None
+            assert Setting.query.filter_by(user_id=user_id).count() == 1
+            assert db.session.get(JobCheckpoint, f'delete-user:{user_id}').completed_at is None
+            
+            assert user_repo.resume_deletions() == [user_id]
+            assert db.session.get(User, user_id) is None
+            assert Setting.query.filter_by(user_id=user_id).count() == 0
+            assert SpendingRollup.query.filter_by(user_id=user_id).count() == 0
+            assert user_repo.resume_deletions() == []
+    
+    def test_alert_repo_delete_monthly_alerts(self, app, test_user):
+        """Monthly alert delete should only touch the given month."""
+        with app.app_context():
+            for alert_type, month in (('budget_warning', '2026-01'), ('budget_exceeded', '2026-01'),
+                                      ('budget_warning', '2026-02')):
+                db.session.add(Alert(user_id=test_user.id, alert_type=alert_type,
+                                     title='Warning', message='80%', triggered_month=month))
+            db.session.commit()
+            
+            assert alert_repo.delete_monthly_alerts(test_user.id, '2026-01') == 2
+            assert Alert.query.filter_by(user_id=test_user.id).count() == 1
+
+
+# ============ ROLLUP TESTS ============
+
+class TestRollupService:
+    """Test incremental spending rollups."""
+    
+    def _rollups(self, user_id):
+        return {
+            (r.month, r.category): (float(r.total), r.count)
+            for r in SpendingRollup.query.filter_by(user_id=user_id).all()
+        }
+    
+    def test_rollup_tracks_inserts(self, app, test_user, test_expenses):
+        """Expenses added through the ORM should be rolled up on commit."""
+        with app.app_context():
+            month = date.today().strftime('%Y-%m')
+            rollups = self._rollups(test_user.id)
+            assert rollups[(month, 'Food')] == (50.00, 1)
+            assert RollupService.get_month_total(test_user.id, month) == Decimal('105.00')
+    
+    def test_rollup_tracks_service_update_and_delete(self, app, test_user):
+        """Moving an expense between buckets and deleting it should keep rollups exact."""
+        with app.app_context():
+            today = date.today()
+            last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+            created = ExpenseService.create_expense(
+                user_id=test_user.id, title='Lunch', category='Food',
+                amount=15.00, date_obj=today
+            )
+            expense_id = created['expense']['id']
+            
+            ExpenseService.update_expense(
+                user_id=test_user.id, expense_id=expense_id,
+                category='Dining', amount=20.00, date_obj=last_month
+            )
+            rollups = self._rollups(test_user.id)
+            assert (today.strftime('%Y-%m'), 'Food') not in rollups
+            assert rollups[(last_month.strftime('%Y-%m'), 'Dining')] == (20.00, 1)
+            
+            ExpenseService.delete_expense(user_id=test_user.id, expense_id=expense_id)
+            assert self._rollups(test_user.id) == {}
+    
+    def test_rollup_ignores_untracked_edits(self, app, test_user, test_expenses):
+        """Editing only the title should not change rollups."""
+        with app.app_context():
+            before = self._rollups(test_user.id)
+            expense = db.session.get(Expense, test_expenses[0].id)
+            expense.title = 'Renamed'
+            db.session.commit()
+            assert self._rollups(test_user.id) == before
+    
+    def test_rebuild_matches_incremental(self, app, test_user, test_expenses):
+        """Rebuilding from raw expenses should reproduce the incremental rollups."""
+        with app.app_context():
+            before = self._rollups(test_user.id)
+            db.session.query(SpendingRollup).delete()
+            db.session.commit()
+            
+            rows = RollupService.rebuild()
+            assert rows == 3
+            assert self._rollups(test_user.id) == before
+
+
+
+# ============ DAILY INDEX TESTS ============
+
+class TestDailyIndexService:
+    """Test the daily prefix-sum spending index."""
+    
+    def _index(self, user_id):
+        return [
+            (r.day, float(r.total), r.count, float(r.running_total), r.running_count)
+            for r in DailySpending.query.filter_by(user_id=user_id).order_by(DailySpending.day)
+        ]
+    
+    def _add(self, user_id, day, amount):
+        expense = Expense(user_id=user_id, date=day, title='Item', category='Food', amount=amount)
+        db.session.add(expense)
+        db.session.commit()
+        return expense
+    
+    def test_apply_deltas_locks_users_first(self, app, test_user):
+        """Users are locked before the index is touched, so concurrent writers serialize."""
+        from sqlalchemy import event
+        with app.app_context():
+            statements = []
+            engine = db.engine
+            
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(' '.join(statement.split()))
+            
+            event.listen(engine, 'before_cursor_execute', record)
+            try:
+                DailyIndexService.apply_deltas(
+                    db.session.connection(), {(test_user.id, date(2026, 3, 1)): [Decimal('5.00'), 1]}
+                )
+            finally:
+                event.remove(engine, 'before_cursor_execute', record)
+            db.session.commit()
+            
+            assert statements[0].startswith('SELECT user.id FROM user WHERE user.id IN')
+            assert 'daily_spending' in statements[1]
+            assert self._index(test_user.id) == [(date(2026, 3, 1), 5.00, 1, 5.00, 1)]
+    
+    def test_backdated_insert_shifts_later_days(self, app, test_user):
+        """Inserting before existing days should shift their running totals."""
+        with app.app_context():
+            self._add(test_user.id, date(2026, 3, 10), 10.00)
+            self._add(test_user.id, date(2026, 3, 20), 20.00)
+            self._add(test_user.id, date(2026, 3, 1), 5.00)
+            
+            assert self._index(test_user.id) == [
+                (date(2026, 3, 1), 5.00, 1, 5.00, 1),
+                (date(2026, 3, 10), 10.00, 1, 15.00, 2),
+                (date(2026, 3, 20), 20.00, 1, 35.00, 3),
+            ]
+            total, count = DailyIndexService.range_summary(
+                test_user.id, date(2026, 3, 2), date(2026, 3, 31)
+            )
+            assert (total, count) == (Decimal('30.00'), 2)
+    
+    def test_edit_and_delete_keep_index_exact(self, app, test_user):
+        """Moving an expense to another day and deleting it should keep prefix sums exact."""
+        with app.app_context():
+            self._add(test_user.id, date(2026, 3, 5), 10.00)
+            moved = self._add(test_user.id, date(2026, 3, 25), 40.00)
+            
+            moved.date = date(2026, 3, 1)
+            moved.amount = 30.00
+            db.session.commit()
+            assert self._index(test_user.id) == [
+                (date(2026, 3, 1), 30.00, 1, 30.00, 1),
+                (date(2026, 3, 5), 10.00, 1, 40.00, 2),
+            ]
+            
+            db.session.delete(moved)
+            db.session.commit()
+            assert self._index(test_user.id) == [(date(2026, 3, 5), 10.00, 1, 10.00, 1)]
+    
+    def test_bulk_insert_updates_index(self, app, test_user):
+        """Bulk-created expenses bypass the flush hooks but must still be indexed."""
+        with app.app_context():
+            self._add(test_user.id, date(2026, 3, 15), 1.00)
+            ExpenseService.create_expenses_bulk(test_user.id, [
+                {'title': 'A', 'category': 'Food', 'amount': '2.00', 'date': '2026-03-20'},
+                {'title': 'B', 'category': 'Food', 'amount': '3.00', 'date': '2026-03-10'},
+                {'title': 'C', 'category': 'Food', 'amount': '4.00', 'date': '2026-03-20'},
+            ])
+            assert self._index(test_user.id) == [
+                (date(2026, 3, 10), 3.00, 1, 3.00, 1),
+                (date(2026, 3, 15), 1.00, 1, 4.00, 2),
+                (date(2026, 3, 20), 6.00, 2, 10.00, 4),
+            ]
+    
+    def test_range_totals_single_query(self, app, test_user):
+        """Several range totals should come from one SELECT."""
+        from sqlalchemy import event
+        with app.app_context():
+            self._add(test_user.id, date(2026, 2, 27), 7.00)
+            self._add(test_user.id, date(2026, 3, 2), 11.00)
+            statements = []
+            
+            def count(conn, cursor, statement, *args):
+                statements.append(statement)
+            
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                totals = DailyIndexService.range_totals(test_user.id, [
+                    (date(2026, 3, 1), date(2026, 3, 31)),
+                    (date(2026, 2, 1), date(2026, 2, 28)),
+                    (date(2026, 4, 1), date(2026, 4, 30)),
+                ])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            assert totals == [Decimal('11.00'), Decimal('7.00'), Decimal('0')]
+            assert len(statements) == 1
+    
+    def test_rebuild_matches_incremental(self, app, test_user, test_expenses):
+        """Rebuilding from raw expenses should reproduce the incremental index."""
+        with app.app_context():
+            self._add(test_user.id, date.today() - timedelta(days=40), 12.00)
+            before = self._index(test_user.id)
+            db.session.query(DailySpending).delete()
+            db.session.commit()
+            
+            DailyIndexService.rebuild(test_user.id)
+            assert self._index(test_user.id) == before
+    
+    def test_heatmap(self, app, test_user):
+        """Heatmap should list only active days inside the window."""
+        with app.app_context():
+            self._add(test_user.id, date(2026, 3, 1), 5.00)
+            self._add(test_user.id, date(2026, 3, 3), 9.00)
+            self._add(test_user.id, date(2025, 1, 1), 100.00)
+            
+            heatmap = DailyIndexService.heatmap(test_user.id, end=date(2026, 3, 31))
+            assert heatmap['start'] == '2025-04-01'
+            assert heatmap['days'] == {'2026-03-01': 5.00, '2026-03-03': 9.00}
+            assert heatmap['total'] == 14.00
+            assert heatmap['max'] == 9.00
+            assert heatmap['active_days'] == 2
+
+
+# ============ DATA VERSION TESTS ============
+
+class TestDataVersionService:
+    """Test per-user data version bumps."""
+    
+    def _version(self, user_id):
+        return db.session.query(User.data_version).filter_by(id=user_id).scalar()
+    
+    def test_orm_writes_bump_version(self, app, test_user):
+        """Flushing expense, setting or alert changes should bump the owner's version."""
+        with app.app_context():
+            start = self._version(test_user.id)
+            created = ExpenseService.create_expense(
+                user_id=test_user.id, title='Lunch', category='Food',
+                amount=15.00, date_obj=date.today()
+            )
+            assert self._version(test_user.id) == start + 1
+            
+            BudgetService.set_budget(test_user.id, 300)
+            ExpenseService.delete_expense(test_user.id, created['expense']['id'])
+            assert self._version(test_user.id) == start + 3
+    
+    def test_bulk_insert_bumps_version(self, app, test_user):
+        """Bulk inserts bypass the flush hook but must still bump the version."""
+        with app.app_context():
+            start = self._version(test_user.id)
+            ExpenseService.create_expenses_bulk(test_user.id, [
+                {'title': 'A', 'category': 'Food', 'amount': '2.00', 'date': '2026-03-20'},
+                {'title': 'B', 'category': 'Food', 'amount': '3.00', 'date': '2026-03-10'},
+            ])
+            assert self._version(test_user.id) > start
+    
+    def test_etag_includes_date(self):
+        """ETags change at midnight even without writes."""
+        first = DataVersionService.etag(7, 42, date(2026, 10, 18))
+        assert first == 'u7.v42.20261018'
+        assert DataVersionService.etag(7, 42, date(2026, 10, 19)) != first
+
+# ============ DASHBOARD SNAPSHOT TESTS ============
+
+class TestDashboardSnapshot:
+    """Test DashboardSnapshot queries."""
+    
+    def _add(self, user_id, day, category, amount):
+        db.session.add(Expense(user_id=user_id, date=day, title='Item',
+                               category=category, amount=amount))
+    
+    def test_snapshot_values(self, app, test_user_with_budget):
+        """Snapshot should aggregate today, month, categories, budget and alerts."""
+        with app.app_context():
+            user_id = test_user_with_budget.id
+            ref = date(2026, 3, 15)
+            self._add(user_id, ref, 'Food', 40.25)
+            self._add(user_id, date(2026, 3, 2), 'Food', 10.00)
+            self._add(user_id, date(2026, 3, 3), 'Rent', 900.00)
+            self._add(user_id, date(2026, 2, 27), 'Travel', 120.00)
+            db.session.add(Alert(user_id=user_id, alert_type='budget_warning',
+                                 title='Warning', message='80%', triggered_month='2026-03'))
+            db.session.add(Alert(user_id=user_id, alert_type='budget_warning', is_read=True,
+                                 title='Warning', message='80%', triggered_month='2026-02'))
+            db.session.commit()
+            
+            snapshot = DashboardSnapshot.load(user_id, today=ref)
+            assert snapshot['today_total'] == 40.25
+            assert snapshot['month'] == '2026-03'
+            assert snapshot['month_total'] == 950.25
+            assert snapshot['category_breakdown'] == {'Food': 50.25, 'Rent': 900.00}
+            assert snapshot['categories'] == ['Food', 'Rent', 'Travel']
+            assert snapshot['budget'] == 1000.00
+            assert snapshot['budget_warning'] is False
+            assert snapshot['remaining_budget'] == pytest.approx(49.75)
+            assert snapshot['unread_alerts'] == 1
+    
+    def test_snapshot_empty_user(self, app, test_user):
+        """Snapshot for a new user should be all zeros."""
+        with app.app_context():
+            snapshot = DashboardSnapshot.load(test_user.id)
+            assert snapshot['month_total'] == 0
+            assert snapshot['categories'] == []
+            assert snapshot['budget'] == 0
+            assert snapshot['remaining_budget'] is None
+            assert snapshot['unread_alerts'] == 0
+    
+    def test_snapshot_uses_two_queries(self, app, test_user, test_expenses):
+        """Snapshot should need at most two SQL round trips."""
+        from sqlalchemy import event
+        with app.app_context():
+            statements = []
+            
+            def count(conn, cursor, statement, *args):
+                statements.append(statement)
+            
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                DashboardSnapshot.load(test_user.id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            assert len(statements) <= 2
+
+
+
+class TestStatsService:
+    """Test StatsService aggregate queries."""
+    
+    def _add(self, user_id, day, amount):
+        db.session.add(Expense(user_id=user_id, date=day, title='Item',
+                               category='Food', amount=amount))
+    
+    def test_spending_stats(self, app, test_user):
+        """Spending stats should aggregate only expenses in the window."""
+        with app.app_context():
+            self._add(test_user.id, date(2026, 3, 1), 10.00)
+            self._add(test_user.id, date(2026, 3, 9), 25.50)
+            self._add(test_user.id, date(2026, 2, 28), 500.00)
+            db.session.commit()
+            
+            stats = StatsService.spending(test_user.id, date(2026, 3, 1))
+            assert stats.total == Decimal('35.50')
+            assert stats.average == Decimal('17.75')
+            assert stats.highest == Decimal('25.50')
+            assert stats.lowest == Decimal('10.00')
+            assert stats.count == 2
+            assert stats.as_dict()['average'] == 17.75
+    
+    def test_spending_stats_empty(self, app, test_user):
+        """Spending stats with no expenses should be all zeros."""
+        with app.app_context():
+            stats = StatsService.spending(test_user.id, date(2026, 3, 1))
+            assert stats.as_dict() == {
+                'total': 0, 'average': 0, 'highest': 0, 'lowest': 0, 'count': 0
+            }
+    
+    def test_quick_stats_buckets(self, app, test_user):
+        """Quick stats should split one scan into today/month/year/30-day buckets."""
+        with app.app_context():
+            ref = date(2026, 3, 15)
+            self._add(test_user.id, ref, 12.00)
+            self._add(test_user.id, date(2026, 3, 2), 18.00)
+            self._add(test_user.id, date(2026, 2, 20), 30.00)
+            self._add(test_user.id, date(2026, 1, 5), 100.00)
+            self._add(test_user.id, date(2025, 12, 31), 999.00)
+            self._add(test_user.id, date(2026, 3, 16), 77.00)
+            db.session.commit()
+            
+            stats = StatsService.quick(test_user.id, today=ref)
+            assert stats.today == Decimal('12.00')
+            assert stats.this_month == Decimal('30.00')
+            assert stats.this_year == Decimal('160.00')
+            assert stats.daily_average == Decimal('2.00')
+            assert stats.expense_count == 2
+    
+    def test_quick_stats_single_query(self, app, test_user, test_expenses):
+        """Quick stats should need exactly one SQL round trip."""
+        from sqlalchemy import event
+        with app.app_context():
+            statements = []
+            
+            def count(conn, cursor, statement, *args):
+                statements.append(statement)
+            
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                StatsService.quick(test_user.id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            assert len(statements) == 1
+
+# ============ EMAIL OUTBOX TESTS ============
+
+class TestEmailOutbox:
+    """Test queued email delivery against a local SMTP sink."""
+    
+    @staticmethod
+    def _use_sink(app, sink):
+        from email_service import mail
+        app.config.update(
+            MAIL_SERVER=sink.host, MAIL_PORT=sink.port,
+            MAIL_USERNAME='sink', MAIL_PASSWORD='sink',
+            MAIL_USE_TLS=False, MAIL_SUPPRESS_SEND=False
+        )
+        mail.init_app(app)
+    
+    def test_request_only_queues(self, app, smtp_sink):
+        """Registration writes to the outbox; the worker delivers it."""
+        from email_service import deliver_outbox
+        from models import EmailOutbox
+        self._use_sink(app, smtp_sink)
+        with app.app_context():
+            AuthService.register('newuser', 'new@example.com', 'SecurePass123!')
+            
+            row = EmailOutbox.query.one()
+            assert (row.kind, row.status, row.recipient) == ('welcome', 'pending', 'new@example.com')
+            assert smtp_sink.messages == []
+            
+            assert deliver_outbox() == {'sent': 1, 'retrying': 0, 'failed': 0}
+            assert smtp_sink.messages[0]['to'] == ['new@example.com']
+            assert db.session.get(EmailOutbox, row.id).status == 'sent'
+    
+    def test_batch_uses_one_connection(self, app, smtp_sink):
+        """A batch is delivered over a single SMTP connection."""
+        from email_service import deliver_outbox, send_username_recovery_email
+        self._use_sink(app, smtp_sink)
+        with app.app_context():
+            for i in range(3):
+                send_username_recovery_email(f'user{i}@example.com', f'user{i}')
+            
+            assert deliver_outbox()['sent'] == 3
+            assert len(smtp_sink.messages) == 3
+            assert smtp_sink.connections == 1
+    
+    def test_failed_delivery_retries_with_backoff(self, app, smtp_sink):
+        """A refused message is retried after the backoff, not before."""
+        from email_service import deliver_outbox, outbox_retry_delay, send_welcome_email
+        from models import EmailOutbox
+        self._use_sink(app, smtp_sink)
+        smtp_sink.reject.add('late@example.com')
+        with app.app_context():
+            send_welcome_email('late@example.com', 'late')
+            now = datetime.utcnow() + timedelta(seconds=1)
+            
+            assert deliver_outbox(now=now)['retrying'] == 1
+            row = EmailOutbox.query.one()
+            assert row.attempts == 1
+            assert row.next_attempt_at == now + outbox_retry_delay(1)
+            assert outbox_retry_delay(2) == 2 * outbox_retry_delay(1)
+            
+            smtp_sink.reject.clear()
+            assert deliver_outbox(now=now + timedelta(seconds=1))['sent'] == 0
+            assert deliver_outbox(now=row.next_attempt_at)['sent'] == 1
+            assert EmailOutbox.query.one().attempts == 2
+    
+    def test_delivered_alert_is_marked_sent(self, app, test_user, smtp_sink):
+        """Alert emails mark the alert as sent once delivered."""
+        from email_service import deliver_outbox, send_alert_email
+        self._use_sink(app, smtp_sink)
+        with app.app_context():
+            alert = Alert(user_id=test_user.id, alert_type='budget_warning', title='80% used',
+                          message='Spent: $80.00 of $100.00', severity='warning')
+            db.session.add(alert)
+            db.session.commit()
+            
+            assert send_alert_email(test_user.id, alert.id)
+            assert not db.session.get(Alert, alert.id).is_sent
+            
+            deliver_outbox()
+            assert db.session.get(Alert, alert.id).is_sent
+    
+    def test_unreachable_server_keeps_messages(self, app, smtp_sink):
+        """Connection failures leave messages queued for a later retry."""
+        from email_service import deliver_outbox, send_welcome_email
+        from models import EmailOutbox
+        self._use_sink(app, smtp_sink)
+        smtp_sink.close()
+        with app.app_context():
+            send_welcome_email('new@example.com', 'new')
+            
+            assert deliver_outbox() == {'sent': 0, 'retrying': 1, 'failed': 0}
+            row = EmailOutbox.query.one()
+            assert row.status == 'pending'
+            assert row.last_error
+
+
+class TestMonthlySummaries:
+    """Test the checkpointed month-end summary job."""
+    
+    MONTH = '2026-09'
+    
+    @staticmethod
+    def _users(spending):
+        """Create one user per entry of [(budget, {category: amount})]; returns their IDs."""
+        ids = []
+        for i, (budget, amounts) in enumerate(spending):
+            user = User(username=f'summary{i}', email=f'summary{i}@example.com', password='pbkdf2:sha256:1$' + 'x' * 64)
+            db.session.add(user)
+            db.session.flush()
+            if budget is not None:
+                db.session.add(Setting(user_id=user.id, key='monthly_budget', value=budget))
+            for category, amount in amounts.items():
+                db.session.add(SpendingRollup(user_id=user.id, month=TestMonthlySummaries.MONTH,
+                                              category=category, total=Decimal(amount), count=1))
+            ids.append(user.id)
+        db.session.commit()
+        return ids
+    
+    def test_summaries_are_set_based(self, app):
+        """Totals, budgets and top categories come from the chunk queries."""
+        from services import MonthlySummaryService
+        with app.app_context():
+            ids = self._users([
+                ('200', {'Food': '50.00', 'Rent': '120.00'}),
+                ('not a number', {}),
+            ])
+            
+            first, second = MonthlySummaryService.summaries(self.MONTH, ids[0], ids[-1])
+            assert (first.total, first.budget, first.top_category) == (Decimal('170.00'), Decimal(200), 'Rent')
+            assert first.percentage == 85.0
+            assert (second.total, second.budget, second.top_category) == (0, 0, None)
+    
+    def test_interrupted_run_resumes_without_duplicates(self, app, monkeypatch):
+        """A failed chunk is retried on the next run; committed chunks are not redone."""
+        from email_service import queue_monthly_summaries
+        from models import EmailOutbox, JobCheckpoint
+        from services.summary_service import MonthlySummaryService
+        with app.app_context():
+            ids = self._users([('100', {'Food': '10.00'})] * 5)
+            
+            original = MonthlySummaryService.summaries
+            calls = []
+            def flaky(month, first_user_id, last_user_id):
+                calls.append(first_user_id)
+                if len(calls) == 2:
+                    raise RuntimeError('worker killed')
+                return original(month, first_user_id, last_user_id)
+            monkeypatch.setattr(MonthlySummaryService, 'summaries', staticmethod(flaky))
+            
+            with pytest.raises(RuntimeError):
+                queue_monthly_summaries(self.MONTH, batch_size=2)
+            assert EmailOutbox.query.count() == 2
+            
+            counts = queue_monthly_summaries(self.MONTH, batch_size=2)
+            assert counts == {'users': 3, 'queued': 3, 'resumed_from': ids[1], 'completed': 1}
+            assert sorted(row.recipient for row in EmailOutbox.query) == [
+                f'summary{i}@example.com' for i in range(5)
+            ]
+            assert db.session.get(JobCheckpoint, f'monthly-summary:{self.MONTH}').processed == 5
+            
+            assert queue_monthly_summaries(self.MONTH)['queued'] == 0
+            assert queue_monthly_summaries(self.MONTH, restart=True)['queued'] == 5
+    
+    def test_template_is_compiled_once(self, app):
+        """Rendering many summaries reuses one compiled template."""
+        from email_service import MONTHLY_SUMMARY_TEMPLATE, compiled_template, queue_monthly_summaries
+        from models import EmailOutbox
+        with app.app_context():
+            self._users([('100', {'Food <b>': '25.00'})] * 3)
+            compiled_template.cache_clear()
+            
+            queue_monthly_summaries(self.MONTH)
+            info = compiled_template.cache_info()
+            assert (info.misses, info.hits) == (1, 2)
+            assert compiled_template(MONTHLY_SUMMARY_TEMPLATE) is compiled_template(MONTHLY_SUMMARY_TEMPLATE)
+            html = EmailOutbox.query.first().html
+            assert '$25.00' in html and 'Food &lt;b&gt;' in html
+    
+    def test_concurrent_senders_split_the_outbox(self, app, smtp_sink):
+        """Each sender delivers its own partition over its own connection."""
+        from email_service import queue_monthly_summaries, run_email_worker
+        from models import EmailOutbox
+        TestEmailOutbox._use_sink(app, smtp_sink)
+        with app.app_context():
+            self._users([('100', {'Food': '10.00'})] * 6)
+            queue_monthly_summaries(self.MONTH)
+            
+            totals = run_email_worker(batch_size=2, concurrency=3, drain=True)
+            assert totals == {'sent': 6, 'retrying': 0, 'failed': 0}
+            assert sorted(address for message in smtp_sink.messages for address in message['to']) == [
+                f'summary{i}@example.com' for i in range(6)
+            ]
+            assert smtp_sink.connections == 3
+            assert EmailOutbox.query.filter_by(status='sent').count() == 6
+
+
+# ============ FORECAST TESTS ============
+
+class TestForecastService:
+    """Test stored forecasts, series versions and the latency budget."""
+    
+    TODAY = date(2026, 10, 15)
+    
+    @staticmethod
+    def _restore(app):
+        ForecastService.configure(
+            workers=app.config['FORECAST_FIT_WORKERS'],
+            latency_budget_ms=app.config['FORECAST_LATENCY_BUDGET_MS'],
+            context=app.app_context
+        )
+    
+    @staticmethod
+    def _seed(user_id, totals):
+        for month, total in totals.items():
+            db.session.add(SpendingRollup(user_id=user_id, month=month, category='Food',
+                                          total=Decimal(total), count=1))
+        db.session.commit()
+    
+    def test_series_version_ignores_current_month(self, app, test_user):
+        """Current-month spending keeps the version; back-dated edits change it."""
+        with app.app_context():
+            self._seed(test_user.id, {'2026-06': '100', '2026-07': '120', '2026-09': '140'})
+            months, values, version = ForecastService.series(test_user.id, self.TODAY)
+            assert months == ['2026-06', '2026-07', '2026-08', '2026-09']
+            assert values == [100.0, 120.0, 0.0, 140.0]
+            
+            self._seed(test_user.id, {'2026-10': '500'})
+            assert ForecastService.series(test_user.id, self.TODAY)[2] == version
+            
+            self._seed(test_user.id, {'2026-08': '90'})
+            assert ForecastService.series(test_user.id, self.TODAY)[2] != version
+    
+    def test_estimate_follows_trend(self):
+        """The closed-form estimate extends a linear series."""
+        result = ForecastService.estimate([100.0, 200.0, 300.0, 400.0])
+        assert result['forecast'] == pytest.approx(500.0)
+        assert result['lower_bound'] == pytest.approx(500.0)
+        assert ForecastService.estimate([100.0, 200.0]) is None
+    
+    def test_insufficient_history(self, app, test_user):
+        """Fewer than three completed months give no forecast."""
+        with app.app_context():
+            self._seed(test_user.id, {'2026-08': '100', '2026-09': '120'})
+            result = ForecastService.get_forecast(test_user.id, self.TODAY)
+            assert result == {'forecast': None, 'status': 'insufficient_data'}
+    
+    def test_inline_fit_is_stored_and_reused(self, app, test_user):
+        """A miss fits and stores the forecast; the next lookup is served from it."""
+        with app.app_context():
+            ForecastService.configure(workers=0)
+            try:
+                self._seed(test_user.id, {'2026-05': '100', '2026-06': '110', '2026-07': '120',
+                                          '2026-08': '130', '2026-09': '140'})
+                first = ForecastService.get_forecast(test_user.id, self.TODAY)
+                assert first['cached'] is False
+                assert first['method'] == ('arima' if HAS_ARIMA else 'closed_form')
+                
+                second = ForecastService.get_forecast(test_user.id, self.TODAY)
+                assert second['cached'] is True
+                assert second['forecast'] == first['forecast']
+                assert ForecastService.stats()['fits'] == 1
+            finally:
+                self._restore(app)
+    
+    def test_slow_fit_serves_estimate(self, app, test_user):
+        """Past the latency budget the estimate is served and the fit lands later."""
+        with app.app_context():
+            ForecastService.configure(workers=1, latency_budget_ms=0, context=app.app_context)
+            try:
+                self._seed(test_user.id, {'2026-06': '100', '2026-07': '200', '2026-08': '300',
+                                          '2026-09': '400'})
+                first = ForecastService.get_forecast(test_user.id, self.TODAY)
+                assert first['method'] == 'closed_form'
+                assert first['cached'] is False
+                assert first['forecast'] == pytest.approx(500.0)
+                
+                ForecastService.join(timeout=30)
+                db.session.expire_all()
+                assert ForecastService.get_forecast(test_user.id, self.TODAY)['cached'] is True
+            finally:
+                self._restore(app)
+    
+    def test_refresh_refits_stale_forecasts(self, app, test_user):
+        """The refresher only refits forecasts whose series or month moved."""
+        with app.app_context():
+            ForecastService.configure(workers=0)
+            try:
+                self._seed(test_user.id, {'2026-07': '100', '2026-08': '120', '2026-09': '140'})
+                ForecastService.fit(test_user.id, self.TODAY)
+                assert ForecastService.refresh(self.TODAY) == {'checked': 1, 'refitted': 0}
+                
+                self._seed(test_user.id, {'2026-10': '160'})
+                assert ForecastService.refresh(date(2026, 11, 2)) == {'checked': 1, 'refitted': 1}
+                assert db.session.get(SpendingForecast, test_user.id).month == '2026-11'
+            finally:
+                self._restore(app)
+
+
+class TestCategoryForecastService:
+    """Test the vectorized smoothing kernel and the batch category forecasts."""
+    
+    TODAY = date(2026, 10, 15)
+    
+    def test_kernel_fits_series_independently(self):
+        """Each matrix row is fitted on its own months only."""
+        import numpy as np
+        from services.category_forecast_service import smooth_forecasts
+        
+        values = np.array([
+            [50.0] * 12,
+            [0.0] * 6 + [80.0] * 6,
+            [10.0 * m for m in range(1, 13)],
+        ])
+        fitted = smooth_forecasts(values, np.array([0, 6, 0]))
+        assert fitted['forecast'][0] == pytest.approx(50.0)
+        assert fitted['upper_bound'][0] == pytest.approx(50.0)
+        assert fitted['forecast'][1] == pytest.approx(80.0)
+        assert 120.0 < fitted['forecast'][2] < 135.0
+        assert fitted['lower_bound'][2] <= fitted['forecast'][2] <= fitted['upper_bound'][2]
+    
+    @staticmethod
+    def _seed_users(count):
+        users = []
+        for i in range(count):
+            user = User(username=f'forecast{i}', email=f'forecast{i}@example.com',
+                        password='pbkdf2:sha256:1$' + 'x' * 64)
+            db.session.add(user)
+            db.session.flush()
+            for month in ('2026-06', '2026-07', '2026-08', '2026-09'):
+                db.session.add(SpendingRollup(user_id=user.id, month=month, category='Food',
+                                              total=Decimal('100') * (i + 1), count=1))
+            db.session.add(SpendingRollup(user_id=user.id, month='2026-09', category='Travel',
+                                          total=Decimal('500'), count=1))
+            users.append(user.id)
+        db.session.commit()
+        return users
+    
+    def test_forecast_users_skips_short_series(self, app):
+        """Categories with fewer than three months of history are not forecast."""
+        with app.app_context():
+            users = self._seed_users(2)
+            rows = CategoryForecastService.forecast_users(users[0], users[-1], self.TODAY)
+            assert [(row['user_id'], row['category']) for row in rows] == [(users[0], 'Food'), (users[1], 'Food')]
+            assert rows[1]['forecast'] == Decimal('200.00')
+            assert rows[1]['month'] == '2026-10'
+            assert rows[1]['history_months'] == 4
+    
+    def test_refresh_all_stores_and_resumes(self, app):
+        """The batch job stores every user's forecasts in checkpointed chunks."""
+        from models import JobCheckpoint
+        with app.app_context():
+            users = self._seed_users(3)
+            
+            assert CategoryForecastService.get_forecasts(users[0], self.TODAY)['source'] == 'live'
+            
+            counts = CategoryForecastService.refresh_all(self.TODAY, batch_size=2)
+            assert counts['users'] == 3
+            assert counts['series'] == 3
+            assert counts['completed'] == 1
+            assert CategoryForecast.query.count() == 3
+            assert db.session.get(JobCheckpoint, 'category-forecast:2026-10-15').processed == 3
+            
+            assert CategoryForecastService.refresh_all(self.TODAY)['users'] == 0
+            
+            result = CategoryForecastService.get_forecasts(users[2], self.TODAY)
+            assert result['source'] == 'batch'
+            assert result['month'] == '2026-10'
+            assert result['categories']['Food']['forecast'] == 300.0
+            assert result['total']['forecast'] == 300.0
+
+
+# ============ ANOMALY MODEL TESTS ============
+
+class TestAnomalyService:
+    """Test persisted anomaly models, insert-time scoring and refits."""
+    
+    @staticmethod
+    def _history(user_id, count=12, category='Food'):
+        start = date.today() - timedelta(days=3 * count)
+        for i in range(count):
+            db.session.add(Expense(user_id=user_id, date=start + timedelta(days=3 * i), title='Lunch',
+                                   category=category, amount=Decimal('12.00') + i % 3))
+        db.session.commit()
+    
+    @staticmethod
+    def _add(user_id, amount, category='Food'):
+        expense = Expense(user_id=user_id, date=date.today(), title='Item',
+                          category=category, amount=Decimal(amount))
+        db.session.add(expense)
+        db.session.commit()
+        return expense
+    
+    def test_score_flags_large_amounts_only(self):
+        """Scoring is arithmetic on the stored model; it needs enough history."""
+        from models import AnomalyModel
+        model = AnomalyModel(user_id=1, category='Food', samples=20, log_median=2.6, log_mad=0.1,
+                             weekday_counts='3,3,3,3,3,3,2', gap_median=3.0, last_date=date(2026, 10, 10))
+        models = {'Food': model}
+        
+        normal = AnomalyService.score(models, 'Food', Decimal('13.00'), date(2026, 10, 13))
+        assert normal['unusual'] is False
+        assert normal['days_since'] == 3
+        
+        large = AnomalyService.score(models, 'Food', Decimal('250.00'), date(2026, 10, 13))
+        assert large['unusual'] is True
+        assert large['amount_z'] > AMOUNT_Z_MIN
+        
+        model.samples = 5
+        assert AnomalyService.score(models, 'Food', Decimal('250.00'), date(2026, 10, 13)) is None
+    
+    def test_observe_raises_unusual_expense_alert(self, app, test_user):
+        """An outlier is alerted at insert time against the persisted models."""
+        from models import AnomalyModel
+        with app.app_context():
+            self._history(test_user.id)
+            assert AnomalyService.observe(self._add(test_user.id, '13.00')) is None
+            assert {m.category for m in AnomalyModel.query.filter_by(user_id=test_user.id)} == {'Food', '*'}
+            
+            big = self._add(test_user.id, '400.00')
+            result = AnomalyService.observe(big)
+            assert result['unusual'] is True
+            alert = db.session.get(Alert, result['alert_id'])
+            assert alert.alert_type == f'unusual_expense:{big.id}'
+            
+            result = AnomalyService.observe(self._add(test_user.id, '12.50'))
+            assert result['unusual'] is False
+            assert AnomalyService.stats()['score_us']['max'] > 0
+            
+            # Every unusual expense gets its own alert, even within one month
+            assert AnomalyService.observe(self._add(test_user.id, '450.00'))['alert_id'] is not None
+            assert AnomalyService.observe(big)['alert_id'] is None
+            assert Alert.query.filter(Alert.alert_type.like('unusual_expense:%')).count() == 2
+    
+    def test_refit_race_keeps_alert_and_counters(self, app, test_user, monkeypatch):
+        """A refit losing a model-creation race does not roll back the alert."""
+        from models import AnomalyModel
+        with app.app_context():
+            self._history(test_user.id)
+            AnomalyService.observe(self._add(test_user.id, '13.00'))
+            db.session.execute(
+                AnomalyModel.__table__.update()
+                .where(AnomalyModel.user_id == test_user.id, AnomalyModel.category == 'Food')
+                .values(pending=REFIT_MIN_NEW)
+            )
+            db.session.commit()
+            
+            def racing_fit(user_id, category):
+                # Another worker created the model first
+                db.session.execute(
+                    AnomalyModel.__table__.insert().values(user_id=user_id, category=category, samples=0)
+                )
+            
+            monkeypatch.setattr(AnomalyService, 'fit', racing_fit)
+            big = self._add(test_user.id, '400.00')
+            result = AnomalyService.observe(big)
+            db.session.expire_all()
+            
+            alert = db.session.get(Alert, result['alert_id'])
+            assert alert.alert_type == f'unusual_expense:{big.id}'
+            assert db.session.get(AnomalyModel, (test_user.id, 'Food')).pending == REFIT_MIN_NEW + 1
+            assert db.session.get(AnomalyModel, (test_user.id, '*')).pending == 1
+    
+    def test_models_refit_after_enough_new_expenses(self, app, test_user):
+        """Inserts only bump the pending counter until a refit is due."""
+        from models import AnomalyModel
+        with app.app_context():
+            self._history(test_user.id, count=20)
+            AnomalyService.observe(self._add(test_user.id, '13.00'))
+            fitted = db.session.get(AnomalyModel, (test_user.id, 'Food')).samples
+            assert fitted == 21
+            
+            for _ in range(REFIT_MIN_NEW - 1):
+                AnomalyService.observe(self._add(test_user.id, '13.00'))
+            model = db.session.get(AnomalyModel, (test_user.id, 'Food'))
+            db.session.refresh(model)
+            assert (model.samples, model.pending) == (fitted, REFIT_MIN_NEW - 1)
+            
+            AnomalyService.observe(self._add(test_user.id, '13.00'))
+            db.session.refresh(model)
+            assert (model.samples, model.pending) == (fitted + REFIT_MIN_NEW, 0)
+
+
+class TestBaselineService:
+    """Test streaming category baselines and the flags stored on write."""
+    
+    def test_baseline_flags_outliers_not_recurring_payments(self):
+        """Recurring large amounts become the baseline; outliers are flagged."""
+        from services.baseline_service import Baseline
+        groceries = Baseline(1, 'Food')
+        for amount in (40, 55, 38, 61, 47, 52, 44, 58):
+            groceries.add(float(amount))
+        assert BaselineService.evaluate(groceries, Decimal('50.00')) is None
+        flag = BaselineService.evaluate(groceries, Decimal('900.00'))
+        assert flag['severity'] == 'high'
+        assert flag['percentile'] == 1.0
+        
+        rent = Baseline(1, 'Rent')
+        for _ in range(6):
+            rent.add(1500.0)
+        assert BaselineService.evaluate(rent, Decimal('1500.00')) is None
+        assert BaselineService.evaluate(Baseline(1, 'Travel'), Decimal('900.00')) is None
+    
+    def test_sketch_percentile_and_bucket_cap(self):
+        """The quantile sketch tracks ranks within its accuracy and stays bounded."""
+        from services.baseline_service import Baseline, SKETCH_MAX_BUCKETS
+        baseline = Baseline(1, 'Misc')
+        for amount in range(1, 1001):
+            baseline.add(float(amount))
+        assert baseline.percentile(500.0) == pytest.approx(0.5, abs=0.03)
+        assert baseline.percentile(950.0) == pytest.approx(0.95, abs=0.03)
+        assert len(baseline.buckets) <= SKETCH_MAX_BUCKETS
+    
+    def test_flags_follow_expense_writes(self, app, test_user):
+        """Flags are stored on insert, re-evaluated on edit and dropped on delete."""
+        from models import ExpenseFlag, SpendingBaseline
+        with app.app_context():
+            today = date.today()
+            for i in range(8):
+                db.session.add(Expense(user_id=test_user.id, date=today - timedelta(days=i + 1),
+                                       title='Lunch', category='Food', amount=Decimal('12.00') + i))
+            db.session.commit()
+            assert db.session.get(SpendingBaseline, (test_user.id, 'Food')).count == 8
+            assert db.session.get(SpendingBaseline, (test_user.id, '*')).count == 8
+            
+            big = Expense(user_id=test_user.id, date=today, title='Banquet', category='Food',
+                          amount=Decimal('450.00'))
+            db.session.add(big)
+            db.session.commit()
+            flag = db.session.get(ExpenseFlag, big.id)
+            assert flag.severity == 'high'
+            
+            anomalies = BaselineService.recent_flags(test_user.id, today - timedelta(days=30), today)
+            assert [a['title'] for a in anomalies] == ['Banquet']
+            
+            big.amount = Decimal('14.00')
+            db.session.commit()
+            assert db.session.get(ExpenseFlag, big.id) is None
+            
+            big.amount = Decimal('450.00')
+            db.session.commit()
+            db.session.delete(big)
+            db.session.commit()
+            assert ExpenseFlag.query.count() == 0
+    
+    def test_bulk_insert_updates_baselines(self, app, test_user):
+        """Bulk-created expenses go through the same baselines and flags."""
+        from models import ExpenseFlag, SpendingBaseline
+        with app.app_context():
+            today = date.today().isoformat()
+            items = [{'title': 'Taxi', 'category': 'Transport', 'amount': 20 + i, 'date': today}
+                     for i in range(6)]
+            items.append({'title': 'Flight', 'category': 'Transport', 'amount': 800, 'date': today})
+            result = ExpenseService.create_expenses_bulk(test_user.id, items)
+            assert result['created'] == 7
+            assert db.session.get(SpendingBaseline, (test_user.id, 'Transport')).count == 7
+            assert [flag.amount for flag in ExpenseFlag.query.all()] == [Decimal('800.00')]
+
+
+# ============ ACTIVITY SCAN TESTS ============
+
+class TestActivityScanService:
+    """Test the columnar activity scoring and the nightly scan."""
+    
+    TODAY = date(2026, 10, 15)
+    
+    def test_score_chunk_groups_by_user_and_category(self):
+        """Outliers are scored against the other expenses of their user and category."""
+        import json
+        import numpy as np
+        from services.activity_service import Columns, score_chunk
+        
+        today = self.TODAY.toordinal()
+        amounts = [40.0, 55.0, 38.0, 61.0, 47.0, 52.0, 900.0] + [900.0] * 7
+        columns = Columns(
+            user_id=np.array([1] * 7 + [2] * 7),
+            expense_id=np.arange(1, 15),
+            day=np.array([today - 50 + 7 * i for i in range(7)] * 2),
+            category=np.array([0] * 7 + [1] * 7),
+            amount=np.array(amounts),
+            categories=['Food', 'Rent'],
+        )
+        first, second = score_chunk(columns, today)
+        assert first['user_id'] == 1
+        assert first['unusual_count'] == 1
+        assert json.loads(first['unusual'])[0]['expense_id'] == 7
+        assert first['top_category'] == 'Food'
+        assert [item['type'] for item in json.loads(first['insights'])][0] == 'unusual_expenses'
+        assert second['unusual_count'] == 0
+        assert second['change_percent'] == pytest.approx(33.3)
+    
+    @staticmethod
+    def _seed(today):
+        from models import UserActivity
+        users = []
+        for i in range(3):
+            user = User(username=f'activity{i}', email=f'activity{i}@example.com',
+                        password='pbkdf2:sha256:1$' + 'x' * 64)
+            db.session.add(user)
+            db.session.flush()
+            users.append(user.id)
+        for i in range(10):
+            db.session.add(Expense(user_id=users[0], date=today - timedelta(days=5 * i + 1),
+                                   title='Lunch', category='Food', amount=Decimal('40.00') + i))
+        db.session.add(Expense(user_id=users[0], date=today - timedelta(days=2),
+                               title='Banquet', category='Food', amount=Decimal('900.00')))
+        db.session.add(Expense(user_id=users[1], date=today - timedelta(days=70),
+                               title='Books', category='Education', amount=Decimal('30.00')))
+        db.session.add(UserActivity(user_id=users[2], day=today - timedelta(days=1)))
+        db.session.commit()
+        return users
+    
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_stores_results_and_resumes(self, app, workers):
+        """The scan scores active users, drops stale rows and resumes from its checkpoint."""
+        from models import JobCheckpoint, UserActivity
+        with app.app_context():
+            users = self._seed(self.TODAY)
+            
+            counts = ActivityScanService.run(self.TODAY, workers=workers, batch_size=2)
+            assert counts['users'] == 3
+            assert counts['scored'] == 2
+            assert counts['unusual'] == 1
+            assert counts['completed'] == 1
+            assert db.session.get(JobCheckpoint, 'activity-scan:2026-10-15').processed == 3
+            assert db.session.get(UserActivity, users[2]) is None
+            
+            assert ActivityScanService.run(self.TODAY, workers=workers)['users'] == 0
+            
+            activity = ActivityScanService.get_activity(users[0])
+            assert activity['date'] == '2026-10-15'
+            assert activity['unusual_count'] == 1
+            assert activity['unusual'][0]['amount'] == 900.0
+            assert activity['insights'][0]['severity'] == 'high'
+            
+            quiet = ActivityScanService.get_activity(users[1])
+            assert quiet['spent'] == 0.0
+            assert quiet['insights'] == []
 
 
 # ============ INTEGRATION TESTS ============
@@ -5,6 +5,9 @@ from decimal import Decimal
 import calendar
 from flask_login import current_user
 from models import Setting, Expense, Alert, db
+from services.rollup_service import RollupService
+from services.budget_service import BudgetService
+from services.anomaly_service import AnomalyService
 
 
 def get_setting(key: str, user_id: Optional[int] = None) -> Optional[str]:
@@ -102,13 +105,7 @@ def calculate_month_total(user_id: Optional[int] = None) -> float:
     if user_id is None:
         user_id = current_user.id
     today = date.today()
-    month_expenses = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= date(today.year, today.month, 1),
-        Expense.date <= date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
-    ).all()
-    total = sum((e.amount for e in month_expenses), Decimal(0))
-    return float(total)
+    return float(RollupService.get_month_total(user_id, f"{today.year}-{today.month:02d}"))
 
 
 def get_monthly_budget(user_id: Optional[int] = None) -> Tuple[float, bool]:
@@ -167,7 +164,8 @@ def check_budget_and_create_alerts(user_id: int) -> Optional[Alert]:
     
     Creates alerts when spending exceeds 80% of budget (warning)
     or exceeds budget amount (danger). Only creates one alert per
-    month per alert type.
+    month per alert type, even under concurrent writes (see
+    BudgetService.evaluate_alerts).
     
     Args:
         user_id: User ID
@@ -175,76 +173,26 @@ def check_budget_and_create_alerts(user_id: int) -> Optional[Alert]:
     Returns:
         Created Alert object, or None if no alert was created
     """
-    from datetime import datetime
+    return BudgetService.evaluate_alerts(user_id)
+
+
+def check_unusual_expense(expense: Expense) -> Optional[Alert]:
+    """
+    Score a newly created expense against the user's anomaly models.
     
-    today = date.today()
-    current_month: str = f"{today.year}-{today.month:02d}"
+    Raises the expense's own 'unusual_expense:<id>' alert when it stands
+    out (see AnomalyService.observe).
     
-    # Get user's budget
-    budget_setting = Setting.query.filter_by(user_id=user_id, key='monthly_budget').first()
-    if not budget_setting:
-        return None
+    Args:
+        expense: The expense just created
     
-    try:
-        budget = float(budget_setting.value)
-    except (ValueError, TypeError):
+    Returns:
+        Created Alert object, or None if no alert was created
+    """
+    result = AnomalyService.observe(expense)
+    if not result or result['alert_id'] is None:
         return None
-    
-    # Calculate current month's total
-    month_expenses = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.date >= date(today.year, today.month, 1),
-        Expense.date <= date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
-    ).all()
-    month_total: float = float(sum((e.amount for e in month_expenses), Decimal(0)))
-    
-    # Check for existing alert for this month
-    existing_alert = Alert.query.filter_by(
-        user_id=user_id,
-        triggered_month=current_month,
-        alert_type='budget_exceeded'
-    ).first()
-    
-    if month_total > budget:
-        # Budget exceeded
-        if not existing_alert:
-            exceeded_by: float = month_total - budget
-            percentage: float = (month_total / budget - 1) * 100
-            alert = Alert(
-                user_id=user_id,
-                alert_type='budget_exceeded',
-                title='Budget Exceeded! 🚨',
-                message=f'You\'ve spent ${month_total:.2f}, exceeding your ${budget:.2f} budget by ${exceeded_by:.2f} ({percentage:.1f}%)',
-                severity='danger',
-                triggered_month=current_month
-            )
-            db.session.add(alert)
-            db.session.commit()
-            return alert
-    elif month_total > budget * 0.8:
-        # Warning: approaching budget (80%)
-        warning_alert = Alert.query.filter_by(
-            user_id=user_id,
-            triggered_month=current_month,
-            alert_type='budget_warning'
-        ).first()
-        
-        if not warning_alert:
-            remaining: float = budget - month_total
-            percentage_used: float = (month_total / budget) * 100
-            alert = Alert(
-                user_id=user_id,
-                alert_type='budget_warning',
-                title='Budget Warning ⚠️',
-                message=f'You\'ve spent ${month_total:.2f} of your ${budget:.2f} budget ({percentage_used:.1f}%). Only ${remaining:.2f} remaining.',
-                severity='warning',
-                triggered_month=current_month
-            )
-            db.session.add(alert)
-            db.session.commit()
-            return alert
-    
-    return None
+    return db.session.get(Alert, result['alert_id'])
 
 
 def get_active_alerts(user_id: int) -> List[Alert]: